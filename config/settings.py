@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -78,13 +80,30 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Baza data/ papkasida: web va worker konteynerlari papkani birga ulaydi
+# (WAL rejimidagi -wal/-shm fayllari ham umumiy bo'lishi kerak)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': BASE_DIR / 'data' / 'db.sqlite3',
+        'OPTIONS': {
+            # Band bo'lsa shuncha soniya kutadi ("database is locked" o'rniga)
+            'timeout': 20,
+            # Tranzaksiya boshidayoq yozish qulfi - o'qishdan yozishga o'tishda kutmasdan xato bermaydi
+            # (select_for_update() SQLite da ishlamaydi - yozuvchilar shu qulf bilan navbatlanadi)
+            'transaction_mode': 'IMMEDIATE',
+            # WAL - o'qish yozishni kutmaydi (worker uzoq yozganda ham sahifalar ochiladi)
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        },
     }
 }
 
+# Eski joydagi baza ko'chirilmagan bo'lsa migrate bo'sh baza yaratib yubormasin
+if (BASE_DIR / 'db.sqlite3').exists() and not DATABASES['default']['NAME'].exists():
+    raise ImproperlyConfigured(
+        "Baza data/ papkasiga ko'chirilmagan: mv db.sqlite3 data/db.sqlite3"
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,3 +156,11 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Revizor tovar qidiruvi: 'fts' - SQLite FTS5 jadvali, 'memory' - har bir jarayon
+# xotirasidagi indeks, 'db' - LIKE so'rovi
+PRODUCT_SEARCH = 'fts'
+
+# Umumiy natijalar sahifasi keshi (statistika, hisobda yo'q tovarlar) - jarayon
+# ichida, chegarasi qatorlar sonida
+COMBINED_CACHE_MAX_ROWS = 200_000
@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
@@ -5,9 +6,18 @@ from django.urls import reverse
 from django.utils import timezone
 from .models import (
     User, Warehouse, Product, Inventory,
-    Revision, RevisionAssignment, RevisionItem,
-    RevisionResult, UnaccountedItem
+    Revision, RevisionAssignment, RevisionItem, RevisionTotal,
+    RevisionResult, UnaccountedItem, BackgroundJob, ProductMatchReview, ProductAlias, ImportRun
 )
+from .reconciliation import (
+    calculate_many_revision_results, mark_dirty, sync_revision_totals
+)
+from .combined import refresh_combined_results
+from .jobs import enqueue_combined_refresh
+from .matching import normalize_name
+from .nomenclature import bump_catalog_version
+from .fts import index_products
+from .inventory import bump_inventory_version
 
 
 @admin.register(User)
@@ -56,6 +66,20 @@ class ProductAdmin(admin.ModelAdmin):
     ordering = ['code']
     list_per_page = 50
 
+    # Qidiruv indekslari nomenklatura versiyasi bo'yicha yangilanadi (FTS - o'chirishda trigger)
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        index_products([obj])
+        bump_catalog_version()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_catalog_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog_version()
+
 
 class InventoryInline(admin.TabularInline):
     model = Inventory
@@ -76,6 +100,32 @@ class InventoryAdmin(admin.ModelAdmin):
     def quantity_display(self, obj):
         return format_html('<b>{}</b>', obj.quantity)
 
+    def save_model(self, request, obj, form, change):
+        old = Inventory.objects.filter(pk=obj.pk).values_list('warehouse_id', 'product_id').first()
+        super().save_model(request, obj, form, change)
+        if old:
+            self._mark_changed(*old)
+        self._mark_changed(obj.warehouse_id, obj.product_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._mark_changed(obj.warehouse_id, obj.product_id)
+
+    def delete_queryset(self, request, queryset):
+        changed = list(queryset.values_list('warehouse_id', 'product_id').distinct())
+        super().delete_queryset(request, queryset)
+        for warehouse_id, product_id in changed:
+            self._mark_changed(warehouse_id, product_id)
+
+    def _mark_changed(self, warehouse_id, product_id):
+        """Tugallangan reviziyalarda tovarni qayta hisoblash uchun belgilash"""
+        revision_ids = Revision.objects.filter(
+            warehouse_id=warehouse_id, status='completed'
+        ).values_list('id', flat=True)
+        mark_dirty(list(revision_ids), [product_id])
+        bump_inventory_version(warehouse_id)
+        enqueue_combined_refresh(warehouse_id)
+
     quantity_display.short_description = 'Qoldiq'
 
 
@@ -146,84 +196,26 @@ class RevisionAdmin(admin.ModelAdmin):
 
     @admin.action(description="Reviziyani tugatish")
     def complete_revision(self, request, queryset):
+        warehouse_ids = set(queryset.filter(status='in_progress').values_list('warehouse_id', flat=True))
         updated = queryset.filter(status='in_progress').update(
             status='completed',
             completed_at=timezone.now()
         )
+        for warehouse_id in warehouse_ids:
+            enqueue_combined_refresh(warehouse_id)
         self.message_user(request, f"{updated} ta reviziya tugallandi.")
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Inline orqali o'zgargan yozuvlar - jamilar va o'zgargan tovarlar
+        sync_revision_totals(form.instance)
+
     @admin.action(description="Natijalarni hisoblash")
     def calculate_results(self, request, queryset):
-        for revision in queryset:
-            self.calculate_revision_results(revision)
-        self.message_user(request, f"{queryset.count()} ta reviziya natijalari hisoblandi.")
-
-    def calculate_revision_results(self, revision):
-        """Reviziya natijalarini hisoblash"""
-        from django.db.models import Sum
-
-        # Avvalgi natijalarni tozalash
-        RevisionResult.objects.filter(revision=revision).delete()
-        UnaccountedItem.objects.filter(revision=revision).delete()
-
-        # 1C dagi tovarlar (kutilgan)
-        inventory_items = Inventory.objects.filter(warehouse=revision.warehouse)
-
-        # Revizorlar kiritgan tovarlar
-        revision_items = RevisionItem.objects.filter(revision=revision)
-
-        # Har bir 1C tovar uchun natija
-        for inv in inventory_items:
-            # Revizorlar shu tovarni qancha sanadi
-            actual = revision_items.filter(
-                product=inv.product,
-                series=inv.series,
-                expiry_date=inv.expiry_date
-            ).aggregate(total=Sum('quantity'))['total'] or 0
-
-            result, created = RevisionResult.objects.get_or_create(
-                revision=revision,
-                product=inv.product,
-                series=inv.series,
-                expiry_date=inv.expiry_date,
-                defaults={
-                    'expected_quantity': inv.quantity,
-                    'actual_quantity': actual,
-                }
-            )
-            if not created:
-                result.expected_quantity = inv.quantity
-                result.actual_quantity = actual
-
-            result.calculate()
-
-            # Revizorlarni qo'shish
-            revizors = revision_items.filter(
-                product=inv.product,
-                series=inv.series,
-                expiry_date=inv.expiry_date
-            ).values_list('revizor', flat=True).distinct()
-            result.revizors.set(revizors)
-
-        # Hisobda yo'q tovarlar (1C da yo'q, revizor kiritgan)
-        for item in revision_items:
-            exists_in_inventory = inventory_items.filter(
-                product=item.product,
-                series=item.series,
-                expiry_date=item.expiry_date
-            ).exists()
-
-            if not exists_in_inventory:
-                UnaccountedItem.objects.get_or_create(
-                    revision=revision,
-                    product=item.product,
-                    series=item.series,
-                    expiry_date=item.expiry_date,
-                    defaults={
-                        'quantity': item.quantity,
-                        'revizor': item.revizor,
-                    }
-                )
+        count = calculate_many_revision_results(queryset)
+        for warehouse_id in set(queryset.values_list('warehouse_id', flat=True)):
+            refresh_combined_results(warehouse_id)
+        self.message_user(request, f"{count} ta reviziya natijalari hisoblandi.")
 
 
 @admin.register(RevisionAssignment)
@@ -257,6 +249,35 @@ class RevisionItemAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     list_per_page = 50
 
+    def save_model(self, request, obj, form, change):
+        old = RevisionItem.objects.filter(pk=obj.pk).values_list('revision_id', 'product_id').first()
+        super().save_model(request, obj, form, change)
+        # Boshqa reviziyaga/tovarga ko'chirilgan bo'lsa - eskisi ham yangilanadi
+        if old and old[0] != obj.revision_id:
+            sync_revision_totals(Revision.objects.get(pk=old[0]), [old[1]])
+        sync_revision_totals(obj.revision, [obj.product_id] + ([old[1]] if old else []))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        sync_revision_totals(obj.revision, [obj.product_id])
+
+    def delete_queryset(self, request, queryset):
+        changed = {}
+        for revision_id, product_id in queryset.values_list('revision_id', 'product_id').distinct():
+            changed.setdefault(revision_id, set()).add(product_id)
+        super().delete_queryset(request, queryset)
+        for revision in Revision.objects.filter(pk__in=changed):
+            sync_revision_totals(revision, changed[revision.pk])
+
+
+@admin.register(RevisionTotal)
+class RevisionTotalAdmin(admin.ModelAdmin):
+    list_display = ['product', 'quantity', 'revision', 'updated_at']
+    list_filter = ['revision']
+    search_fields = ['product__name', 'product__code']
+    ordering = ['-updated_at']
+    list_per_page = 50
+
 
 @admin.register(RevisionResult)
 class RevisionResultAdmin(admin.ModelAdmin):
@@ -306,6 +327,61 @@ class UnaccountedItemAdmin(admin.ModelAdmin):
     list_per_page = 50
 
 
+class ProductAliasForm(forms.ModelForm):
+    class Meta:
+        model = ProductAlias
+        fields = ['name', 'product']
+
+    def clean_name(self):
+        # Importer normallashtirilgan nom bo'yicha qidiradi
+        return normalize_name(self.cleaned_data['name'])
+
+
+@admin.register(ProductAlias)
+class ProductAliasAdmin(admin.ModelAdmin):
+    form = ProductAliasForm
+    list_display = ['name', 'product', 'created_by', 'created_at']
+    search_fields = ['name', 'product__name', 'product__code']
+    autocomplete_fields = ['product']
+    readonly_fields = ['created_by']
+    ordering = ['name']
+    list_per_page = 50
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(ProductMatchReview)
+class ProductMatchReviewAdmin(admin.ModelAdmin):
+    list_display = ['source_name', 'warehouse', 'quantity', 'score', 'product', 'status', 'created_at']
+    list_filter = ['status', 'warehouse', 'created_at']
+    search_fields = ['source_name', 'manufacturer']
+    autocomplete_fields = ['product']
+    ordering = ['-created_at']
+    list_per_page = 50
+
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'kind', 'status', 'warehouse', 'rows_read', 'matched', 'unmatched', 'duration', 'created_at']
+    list_filter = ['kind', 'status', 'warehouse', 'created_at']
+    search_fields = ['file_name', 'file_hash']
+    readonly_fields = ['file_hash', 'report', 'timings']
+    ordering = ['-created_at']
+    list_per_page = 50
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'revision', 'warehouse', 'stage', 'processed', 'total', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status', 'created_at']
+    readonly_fields = ['started_at', 'heartbeat_at', 'finished_at', 'options', 'result']
+    ordering = ['-created_at']
+    list_per_page = 50
+
+
 # Admin site sozlamalari
 admin.site.site_header = "Sklad Reviziya Tizimi"
 admin.site.site_title = "Reviziya Admin"
@@ -0,0 +1,349 @@
+"""
+Ombor bo'yicha umumiy natijalar (barcha tugallangan reviziyalar)
+
+Umumiy natijalar sahifasi har safar 1C qoldig'i va barcha revizor yozuvlarini
+Python'da qayta jamlamasligi uchun natijalar CombinedResult jadvalida tayyor
+saqlanadi. Jadval reviziya tugaganda (natijalar hisoblangach) va 1C qoldig'i
+o'zgarganda yangilanadi. Revizor filtri uchun CombinedRevizorCount jadvali.
+
+Yangilash GROUP BY so'rovlari va paketli yozuv bilan, bitta tranzaksiyada.
+
+Sahifa va eksport uchun combined_queryset(): status, filtr, qidiruv, tartib
+va sahifalash to'liq SQL da bajariladi - sahifa faqat joriy qatorlarni,
+eksport esa qatorlarni oqim bilan o'qiydi.
+
+Butun ombor bo'yicha hisoblanadigan qismlar (statistika kartalari, hisobda
+yo'q tovarlar) jarayon ichidagi LRU keshda: kalit - (ombor, filtrlar,
+versiya), versiya - Warehouse.combined_refreshed_at (jadval har safar
+yangilanganda o'zgaradi). Sahifalash va CSV eksport ularni qayta hisoblamaydi.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DecimalField, Exists, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    User, Warehouse, Revision, RevisionItem,
+    CombinedResult, CombinedRevizorCount
+)
+from .reconciliation import BATCH_SIZE, ZERO, load_inventory
+
+
+# Sahifadagi tartib: avval kamlar, keyin ortiqlar, keyin sanalmagan, oxirida to'g'ri
+STATUS_ORDER = {
+    'shortage': 0,
+    'excess': 1,
+    'not_counted': 2,
+    'correct': 3,
+}
+
+
+def combined_status(expected, actual):
+    """Umumiy natija statusi (1C da yo'q tovar - 'unaccounted')"""
+    if expected is None:
+        return 'unaccounted'
+    if actual == 0:
+        return 'not_counted'
+
+    difference = actual - expected
+    if difference == 0:
+        return 'correct'
+    elif difference < 0:
+        return 'shortage'
+    return 'excess'
+
+
+class DatasetCache:
+    """
+    Hajmi cheklangan LRU kesh
+
+    Hajm qatorlar soni bilan o'lchanadi (max_rows); chegaradan oshsa eng
+    uzoq ishlatilmagan yozuvlar chiqarib tashlanadi.
+    """
+
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        self.rows = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, rows):
+        if rows > self.max_rows:
+            return
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.rows -= old[1]
+            self._data[key] = (value, rows)
+            self.rows += rows
+
+            while self.rows > self.max_rows:
+                _, (_, evicted_rows) = self._data.popitem(last=False)
+                self.rows -= evicted_rows
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.rows = 0
+
+
+dataset_cache = DatasetCache(getattr(settings, 'COMBINED_CACHE_MAX_ROWS', 200_000))
+
+
+def cached_dataset(warehouse, name, params, load):
+    """
+    load() natijasi (ro'yxat yoki dict) keshdan; kalit - (ombor, name, params, versiya)
+
+    Natija o'zgartirilmasligi kerak - bir nechta so'rov bitta obyektni oladi.
+    """
+    if warehouse.combined_refreshed_at is None:
+        return load()
+
+    key = (warehouse.pk, name, params, warehouse.combined_refreshed_at)
+    value = dataset_cache.get(key)
+    if value is None:
+        value = load()
+        dataset_cache.set(key, value, max(len(value), 1))
+    return value
+
+
+def refresh_combined_results(warehouse_id, batch_size=BATCH_SIZE):
+    """
+    Ombor umumiy natijalarini qayta yig'ish
+
+    Qaytaradi: yozilgan natijalar soni
+    """
+    revisions = Revision.objects.filter(warehouse_id=warehouse_id, status='completed').values('pk')
+    expected_by_product, batches = load_inventory(warehouse_id)
+
+    # 1C partiyalari (JSON uchun)
+    batches_by_product = defaultdict(list)
+    for product_id, series, expiry_date, quantity in batches:
+        batches_by_product[product_id].append({
+            'series': series or '',
+            'expiry_date': expiry_date.isoformat() if expiry_date else None,
+            'quantity': str(quantity),
+        })
+
+    # Revizor + tovar bo'yicha jami (GROUP BY)
+    counts = list(
+        RevisionItem.objects
+        .filter(revision__in=revisions)
+        .values_list('product_id', 'revizor_id')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+
+    names = {
+        pk: full_name or username
+        for pk, full_name, username in User.objects.filter(
+            pk__in={revizor_id for _, revizor_id, _ in counts}
+        ).values_list('pk', 'full_name', 'username')
+    }
+
+    actual_by_product = defaultdict(lambda: ZERO)
+    names_by_product = defaultdict(set)
+    for product_id, revizor_id, total in counts:
+        actual_by_product[product_id] += total
+        names_by_product[product_id].add(names[revizor_id])
+
+    results = []
+    for product_id in expected_by_product.keys() | actual_by_product.keys():
+        expected = expected_by_product.get(product_id)
+        actual = actual_by_product.get(product_id, ZERO)
+        results.append(CombinedResult(
+            warehouse_id=warehouse_id,
+            product_id=product_id,
+            expected_quantity=expected or ZERO,
+            actual_quantity=actual,
+            difference=actual - (expected or ZERO),
+            status=combined_status(expected, actual),
+            revizors=', '.join(sorted(names_by_product.get(product_id, ()))),
+            batches=batches_by_product.get(product_id, []),
+        ))
+
+    revizor_counts = [
+        CombinedRevizorCount(
+            warehouse_id=warehouse_id,
+            product_id=product_id,
+            revizor_id=revizor_id,
+            quantity=total,
+        )
+        for product_id, revizor_id, total in counts
+    ]
+
+    with transaction.atomic():
+        # Bog'langan jadval va signal yo'q - delete() bitta DELETE so'rovi
+        CombinedResult.objects.filter(warehouse_id=warehouse_id).delete()
+        CombinedRevizorCount.objects.filter(warehouse_id=warehouse_id).delete()
+        CombinedResult.objects.bulk_create(results, batch_size=batch_size)
+        CombinedRevizorCount.objects.bulk_create(revizor_counts, batch_size=batch_size)
+        Warehouse.objects.filter(pk=warehouse_id).update(combined_refreshed_at=timezone.now())
+
+    return len(results)
+
+
+def ensure_combined_results(warehouse):
+    """Jadval eskirgan (yoki hali yig'ilmagan) bo'lsa - joyida yangilash"""
+    if warehouse.combined_refreshed_at is None:
+        refresh_combined_results(warehouse.pk)
+        warehouse.refresh_from_db(fields=['combined_refreshed_at'])
+
+
+def combined_queryset(warehouse, revizor_id=None, status='', search=''):
+    """
+    Sahifa uchun umumiy natijalar (1C dagi tovarlar) - SQL annotatsiyalari bilan
+
+    actual - sanalgan miqdor (revizor filtri bo'lsa - shu revizorniki)
+    current_status - status (revizor filtri bo'yicha qayta aniqlanadi)
+    status_order - tartib: kam, ko'p, sanalmagan, to'g'ri
+    """
+    ensure_combined_results(warehouse)
+
+    queryset = (
+        CombinedResult.objects
+        .filter(warehouse=warehouse)
+        .exclude(status='unaccounted')
+        .select_related('product')
+    )
+
+    if revizor_id:
+        counted = CombinedRevizorCount.objects.filter(
+            warehouse=warehouse, revizor_id=revizor_id, product_id=OuterRef('product_id')
+        )
+        queryset = queryset.annotate(
+            actual=Coalesce(
+                Subquery(counted.values('quantity')[:1]),
+                Value(ZERO),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+            revizor_counted=Exists(counted),
+        )
+    else:
+        queryset = queryset.annotate(actual=F('actual_quantity'))
+
+    queryset = queryset.annotate(
+        current_status=Case(
+            When(actual=0, then=Value('not_counted')),
+            When(actual=F('expected_quantity'), then=Value('correct')),
+            When(actual__lt=F('expected_quantity'), then=Value('shortage')),
+            default=Value('excess'),
+        ),
+    ).annotate(
+        status_order=Case(
+            *[When(current_status=key, then=Value(order)) for key, order in STATUS_ORDER.items()],
+            output_field=IntegerField(),
+        ),
+    )
+
+    if status:
+        queryset = queryset.filter(current_status=status)
+    if search:
+        queryset = queryset.filter(search_q(search))
+
+    return queryset.order_by('status_order', 'product__name', 'pk')
+
+
+def combined_stats(queryset):
+    """Statistika kartalari - bitta aggregate so'rov"""
+    return queryset.order_by().aggregate(
+        total=Count('pk'),
+        **{key: Count('pk', filter=Q(current_status=key)) for key in STATUS_ORDER}
+    )
+
+
+def combined_row(row, revizor_name=None):
+    """combined_queryset() qatorini shablon / eksport formatiga o'tkazish"""
+    if revizor_name is None:
+        revizors = row.revizors
+    else:
+        revizors = revizor_name if row.revizor_counted else ''
+
+    batches = _inventory_items(row.batches)
+    return {
+        'product': row.product,
+        'expected_quantity': row.expected_quantity,
+        'actual_quantity': row.actual,
+        'difference': row.actual - row.expected_quantity,
+        'status': row.current_status,
+        'revizors': revizors,
+        # 1C tartibida (eksportda birinchi partiya)
+        'batches': batches,
+        # Srok bo'yicha saralangan (sahifa uchun)
+        'inventory_items': sorted(batches, key=lambda x: x['expiry_date'] or date(2099, 1, 1)),
+    }
+
+
+def combined_rows(rows, revizor_name=None):
+    """Joriy sahifa qatorlari"""
+    return [combined_row(row, revizor_name) for row in rows]
+
+
+def combined_unaccounted(warehouse, revizor_id=None, revizor_name=''):
+    """Hisobda yo'q tovarlar (1C da yo'q, revizor sanagan)"""
+    rows = (
+        CombinedResult.objects
+        .filter(warehouse=warehouse, status='unaccounted')
+        .select_related('product')
+        .order_by('product__name')
+    )
+    if not revizor_id:
+        return [
+            {'product': row.product, 'quantity': row.actual_quantity, 'revizors': row.revizors}
+            for row in rows
+        ]
+
+    counts = CombinedRevizorCount.objects.filter(
+        warehouse=warehouse, revizor_id=revizor_id, product_id=OuterRef('product_id')
+    )
+    rows = rows.annotate(quantity=Subquery(counts.values('quantity')[:1])).filter(quantity__isnull=False)
+    return [
+        {'product': row.product, 'quantity': row.quantity, 'revizors': revizor_name}
+        for row in rows
+    ]
+
+
+def search_q(search):
+    """
+    Nom / kod / ishlab chiqaruvchi bo'yicha qidiruv
+
+    SQLite LIKE faqat lotin harflarida registrni e'tiborsiz qoldiradi, shuning
+    uchun kirill nomlar uchun so'rovning bir nechta yozilishi tekshiriladi.
+    """
+    q = Q()
+    for variant in {search, search.lower(), search.upper(), search.capitalize()}:
+        q |= (
+            Q(product__name__icontains=variant) |
+            Q(product__code__icontains=variant) |
+            Q(product__manufacturer__icontains=variant)
+        )
+    return q
+
+
+def _inventory_items(batches):
+    """JSON partiyalarni sahifa formatiga qaytarish"""
+    return [
+        {
+            'series': batch['series'],
+            'expiry_date': date.fromisoformat(batch['expiry_date']) if batch['expiry_date'] else None,
+            'quantity': Decimal(batch['quantity']),
+        }
+        for batch in batches
+    ]
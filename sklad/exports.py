@@ -0,0 +1,276 @@
+"""
+Eksport (CSV / XLSX, oqim bilan)
+
+Eksportlar StreamingHttpResponse orqali qismlab yuboriladi: qatorlar
+bazadan .iterator() bilan o'qiladi va generator orqali yoziladi, shuning
+uchun katta fayl ham darhol yuklana boshlaydi va worker xotirasi o'smaydi.
+
+Qator generatorlari "xom" qiymatlarni qaytaradi (sana, Decimal, int) -
+formatlash yozuvchining ishi:
+- CSV: ';' ajratuvchi, UTF-8, boshida bitta BOM (Excel kirillni to'g'ri ochishi uchun)
+- XLSX: zipfile + qatorma-qator yoziladigan sheet XML (qo'shimcha kutubxonasiz),
+  miqdorlar - son, sanalar - haqiqiy sana katakchalari
+"""
+import codecs
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+
+# Bitta yuboriladigan qism (bayt) - taxminiy
+CHUNK_SIZE = 64 * 1024
+
+# Bazadan o'qish paketi
+ITERATOR_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class SignedNumber(int):
+    """Ishorasi bilan ko'rsatiladigan son: CSV da '+5', XLSX da +0 formatli son"""
+
+    def __str__(self):
+        return f'{int(self):+d}'
+
+
+def export_response(request, filename, rows, sheet_name='Natijalar'):
+    """
+    ?format=xlsx bo'lsa - XLSX, aks holda CSV
+
+    filename - kengaytmasiz fayl nomi
+    rows - birinchi qatori sarlavha bo'lgan generator
+    """
+    if request.GET.get('format') == 'xlsx':
+        return xlsx_response(f'{filename}.xlsx', rows, sheet_name)
+    return csv_response(f'{filename}.csv', rows)
+
+
+# ==================== CSV ====================
+
+class Echo:
+    """csv.writer uchun 'fayl' - yozilgan qatorni qaytaradi"""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows, delimiter=';'):
+    """Qatorlarni CSV baytlariga aylantirib, qismlab qaytarish"""
+    writer = csv.writer(Echo(), delimiter=delimiter)
+    yield codecs.BOM_UTF8
+
+    buffer = []
+    size = 0
+    for row in rows:
+        line = writer.writerow([format_date(value) if isinstance(value, date) else value for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def csv_response(filename, rows):
+    """Oqimli CSV javob (rows - sarlavha bilan birga qatorlar generatori)"""
+    response = StreamingHttpResponse(csv_stream(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def format_date(value):
+    return value.strftime('%d.%m.%Y') if value else ''
+
+
+# ==================== XLSX ====================
+
+# Katakcha uslublari (styles.xml dagi cellXfs tartibi)
+STYLE_DATE = 1
+STYLE_SIGNED = 2
+STYLE_HEADER = 3
+
+EXCEL_EPOCH = date(1899, 12, 30)
+
+# XML 1.0 da ruxsat etilmagan belgilar
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="2">'
+        '<numFmt numFmtId="164" formatCode="dd.mm.yyyy"/>'
+        '<numFmt numFmtId="165" formatCode="+0;-0;0"/>'
+        '</numFmts>'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+class _Sink:
+    """ZipFile yozadigan (seek qilinmaydigan) oqim - yozilganlar olib ketilguncha saqlanadi"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def xlsx_stream(rows, sheet_name='Natijalar'):
+    """Qatorlarni XLSX fayl baytlariga aylantirib, qismlab qaytarish"""
+    sink = _Sink()
+
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', _workbook_xml(sheet_name))
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+
+            buffer = []
+            size = 0
+            for row_num, row in enumerate(rows, 1):
+                line = _row_xml(row_num, row, STYLE_HEADER if row_num == 1 else None)
+                buffer.append(line)
+                size += len(line)
+                if size >= CHUNK_SIZE:
+                    sheet.write(''.join(buffer).encode('utf-8'))
+                    buffer = []
+                    size = 0
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+            buffer.append('</sheetData></worksheet>')
+            sheet.write(''.join(buffer).encode('utf-8'))
+
+    yield sink.drain()
+
+
+def xlsx_response(filename, rows, sheet_name='Natijalar'):
+    """Oqimli XLSX javob (rows - sarlavha bilan birga qatorlar generatori)"""
+    response = StreamingHttpResponse(xlsx_stream(rows, sheet_name), content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _workbook_xml(sheet_name):
+    name = escape(ILLEGAL_XML_CHARS.sub('', sheet_name)[:31], {'"': '&quot;'})
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+COLUMN_LETTERS = [_column_letter(i) for i in range(64)]
+
+
+def _row_xml(row_num, row, style=None):
+    cells = []
+    for col, value in enumerate(row):
+        if value is None or value == '':
+            continue
+        ref = f'{COLUMN_LETTERS[col]}{row_num}'
+        cells.append(_cell_xml(ref, value, style))
+    return f'<row r="{row_num}">{"".join(cells)}</row>'
+
+
+def _cell_xml(ref, value, style=None):
+    style_attr = f' s="{style}"' if style else ''
+
+    if isinstance(value, bool):
+        value = str(value)
+
+    if isinstance(value, SignedNumber):
+        return f'<c r="{ref}" s="{style or STYLE_SIGNED}"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return f'<c r="{ref}" s="{style or STYLE_DATE}"><v>{(value - EXCEL_EPOCH).days}</v></c>'
+
+    text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
@@ -0,0 +1,133 @@
+"""
+Nomenklatura uchun SQLite FTS5 qidiruvi
+
+sklad_product_fts virtual jadvali Product ni takrorlaydi (rowid = product.id):
+code, name, manufacturer va folded - nomning lotin/kirill farqisiz ko'rinishi
+("Парацетамол" va "paratsetamol" -> "paratsetamol", translit.fold()). folded Python da
+hisoblanadi, shuning uchun jadval tovarlar yozilganda index_products() bilan
+yangilanadi (upsert_products, admin). O'chirilgan tovarlar SQL trigger
+orqali o'chadi.
+
+UPDATE uchun trigger yo'q (folded ni SQL da hisoblab bo'lmaydi): Product ni
+boshqa yo'l bilan o'zgartiradigan kod (bulk_update, queryset.update(), xom
+SQL) index_products() ni o'zi chaqirishi kerak, aks holda jadval eskiradi -
+tuzatish: `manage.py rebuild_product_fts`.
+
+Qidiruv: so'rovdagi har bir so'z prefiks sifatida (AND), tartib - bm25
+(kod va nom mosligi ustun) barcha mosliklar bo'yicha; bir xil bahoda - nom
+(faqat qaytarilgan limit ta ichida).
+"""
+import re
+
+from django.db import connection
+
+from .models import Product
+from .translit import fold, variants
+
+
+FTS_TABLE = 'sklad_product_fts'
+
+# Ustunlar og'irligi bm25 uchun: code, name, manufacturer, folded
+BM25_WEIGHTS = (10.0, 0.0, 0.0, 5.0)
+
+TOKEN = re.compile(r'\w+')
+
+# So'rovdagi so'z (o'zbek lotinidagi tutuq belgisi bilan: "o'g'it")
+QUERY_TOKEN = re.compile(r"[\w'ʻʼ‘’`]+")
+
+
+_available = None
+
+
+def fts_available():
+    """FTS5 jadvali bormi (faqat SQLite, migratsiya yaratadi)"""
+    global _available
+    if _available is None:
+        _available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def index_products(products):
+    """Tovarlarni FTS jadvalida yangilash (yangi yoki o'zgargan Product lar)"""
+    if not fts_available():
+        return
+    rows = [(product.pk, product.code, product.name, product.manufacturer, fold(product.name))
+            for product in products]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, code, name, manufacturer, folded) VALUES (%s, %s, %s, %s, %s)',
+            rows
+        )
+
+
+def rebuild_product_fts(batch_size=2000):
+    """FTS jadvalini butun nomenklaturadan qayta yozish (fold() o'zgarganda)"""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    count = 0
+    batch = []
+    for product in Product.objects.only('id', 'code', 'name', 'manufacturer').iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            index_products(batch)
+            count += len(batch)
+            batch = []
+    index_products(batch)
+    return count + len(batch)
+
+
+def match_expression(query):
+    """
+    So'rov -> FTS5 MATCH ifodasi: har bir so'z kodda yoki folded ustunida
+    prefiks (folded nomning barcha so'zlarini o'z ichiga oladi - name ustuni
+    alohida qidirilmaydi). So'zning barcha transliteratsiya variantlari bitta
+    ifodada (OR) - bitta so'rov.
+    """
+    parts = []
+    for token in QUERY_TOKEN.findall(query.lower()):
+        code = ''.join(TOKEN.findall(token))
+        folded = []
+        for variant in variants(token):
+            key = ''.join(TOKEN.findall(fold(variant)))
+            if key and key not in folded:
+                folded.append(key)
+
+        options = [f'code : "{code}"*'] if code else []
+        if folded:
+            options.append('folded : (' + ' OR '.join(f'"{key}"*' for key in folded) + ')')
+        if options:
+            parts.append('(' + ' OR '.join(options) + ')')
+    return ' AND '.join(parts)
+
+
+def search_fts(query, limit=30):
+    """Eng mos tovarlar (API formatida)"""
+    expression = match_expression(query)
+    if not expression:
+        return []
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        # Barcha mosliklar bm25 bo'yicha; nom SQL da saralanmaydi (name ustunini
+        # har bir moslik uchun o'qish so'rovni ikki baravar sekinlashtiradi)
+        cursor.execute(
+            f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s',
+            [expression, limit]
+        )
+        scores = dict(cursor.fetchall())
+
+    products = Product.objects.in_bulk(scores)
+    ids = sorted(products, key=lambda pk: (scores[pk], products[pk].name))
+    return [{
+        'id': products[pk].id,
+        'code': products[pk].code,
+        'name': products[pk].name,
+        'manufacturer': products[pk].manufacturer or '',
+    } for pk in ids]
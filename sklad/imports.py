@@ -0,0 +1,403 @@
+"""
+Fayl yuklash: nomenklatura va 1C qoldiq (fon vazifasi)
+
+Sahifa faylni diskka (MEDIA_ROOT/imports/) saqlaydi va vazifani navbatga
+qo'yadi - katta fayl HTTP so'rov ichida o'qilmaydi (gunicorn/nginx timeout).
+Worker (`manage.py run_jobs`) faylni oqim bilan o'qiydi:
+- o'qish va moslash paytida o'qilgan qatorlar soni yozib boriladi
+  (sahifa status endpoint orqali kuzatadi)
+- 1C qoldiq: bazaga yozish (qoldiq, tekshirish jadvali, ImportRun) bitta
+  tranzaksiyada - xatolik bo'lsa yarim yuklangan qoldiq qolmaydi
+- nomenklatura: qatorlar o'qilgan sari paketlab yoziladi (xotira fayl
+  hajmiga bog'liq emas), butun fayl bitta tranzaksiyada
+
+Natija xabarlari [[daraja, matn], ...] ko'rinishida qaytariladi va
+vazifaning result maydoniga yoziladi.
+"""
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ImportRun, ProductMatchReview
+from .ingest import sniff, iter_lines, read_sample, StageTimer
+from .parsers import OneCInventoryParser
+from .matching import ProductNameMatcher
+from .inventory import diff_inventory, write_inventory, bump_inventory_version
+from .nomenclature import upsert_products
+from .reconciliation import mark_warehouse_changes
+
+
+# Jarayon shuncha qatordan keyin yoziladi
+PROGRESS_EVERY = 2000
+
+
+def _no_progress(stage, processed=0, total=0):
+    pass
+
+
+def repeated_import(kind, digest, warehouse=None, **options):
+    """Shu joyga oxirgi yuklash xuddi shu fayl (va sozlamalar) bilan bo'lgan bo'lsa - o'sha ImportRun"""
+    last = ImportRun.objects.filter(kind=kind, warehouse=warehouse, status='done').first()
+    if not last or last.file_hash != digest:
+        return None
+    if any(last.report.get(key) != value for key, value in options.items()):
+        return None
+    # Keyin nomenklatura yangilangan bo'lsa - 1C nomlari boshqacha moslanishi mumkin
+    if kind == 'inventory' and ImportRun.objects.filter(
+            kind='products', status='done', created_at__gt=last.created_at).exists():
+        return None
+    return last
+
+
+def repeated_message(previous):
+    uploaded_at = timezone.localtime(previous.created_at).strftime('%d.%m.%Y %H:%M')
+    summary = inventory_summary(previous.report) if previous.kind == 'inventory' else upsert_summary(previous.report)
+    return f'Bu fayl {uploaded_at} da yuklangan - qayta ishlanmadi. Natija: {summary}'
+
+
+def upsert_summary(stats):
+    return (
+        f"Yangi: {stats['created']}, yangilandi: {stats['updated']}, "
+        f"o'zgarmadi: {stats['unchanged']}"
+    )
+
+
+def inventory_summary(stats):
+    return (
+        f"Yangi: {stats['created']}, o'zgardi: {stats['updated']}, "
+        f"o'zgarmadi: {stats['unchanged']}, o'chirildi: {stats['deleted']}"
+    )
+
+
+def _record_import(kind, options, report, user, warehouse=None, **fields):
+    """fields - ImportRun ning qolgan maydonlari (qatorlar soni, vaqtlar, status)"""
+    return ImportRun.objects.create(
+        kind=kind,
+        warehouse=warehouse,
+        file_name=options.get('file_name', '')[:255],
+        file_size=options.get('file_size', 0),
+        file_hash=options.get('digest', ''),
+        report=report,
+        created_by=user,
+        **fields
+    )
+
+
+# ==================== NOMENKLATURA ====================
+
+def import_products(file, user, options, progress=None):
+    """
+    Nomenklatura fayli (CSV yoki JSON)
+
+    options - file_name, file_size, digest, hash_time
+    """
+    started = time.perf_counter()
+    try:
+        return _import_products(file, user, options, progress or _no_progress, started)
+    except Exception as e:
+        _record_import('products', options, {}, user, status='failed', error=str(e),
+                       duration=time.perf_counter() - started)
+        raise
+
+
+def _import_products(file, user, options, progress, started):
+    result = []
+    file_name = options.get('file_name', file.name)
+
+    # Encoding va delimiter (vergul yoki nuqtali vergul) - fayl boshidan
+    encoding, delimiter, _ = sniff(file)
+    timer = StageTimer()
+
+    if file_name.endswith('.csv'):
+        # Fayl qatorma-qator o'qiladi
+        reader = csv.DictReader(timer.wrap('decode', iter_lines(file, encoding)), delimiter=delimiter)
+        count = 0
+        errors = []
+
+        def parsed_rows():
+            nonlocal count
+
+            for i, row in enumerate(reader, start=2):
+                if i % PROGRESS_EVERY == 0:
+                    progress('reading', i)
+
+                # Turli nom variantlari
+                code = (
+                    row.get('code') or
+                    row.get('kod') or
+                    row.get('Code') or
+                    row.get('CODE') or
+                    row.get('№') or
+                    row.get('нумерация') or
+                    row.get('Нумерация') or
+                    row.get('\ufeffcode') or  # BOM bilan
+                    row.get('\ufeff№') or
+                    list(row.values())[0] if row else None  # Birinchi ustun
+                )
+
+                name = (
+                    row.get('name') or
+                    row.get('nom') or
+                    row.get('Name') or
+                    row.get('NAME') or
+                    row.get('товар номи') or
+                    row.get('Товар номи') or
+                    row.get('наименование') or
+                    row.get('Наименование') or
+                    row.get('tovar') or
+                    list(row.values())[1] if len(row) > 1 else None  # Ikkinchi ustun
+                )
+
+                manufacturer = (
+                    row.get('manufacturer') or
+                    row.get('ishlab_chiqaruvchi') or
+                    row.get('Manufacturer') or
+                    row.get('ишлаб чикарувчи') or
+                    row.get('Ишлаб чикарувчи') or
+                    row.get('производитель') or
+                    row.get('Производитель') or
+                    list(row.values())[2] if len(row) > 2 else ''  # Uchinchi ustun
+                )
+
+                if code and name:
+                    code_clean = str(code).strip()
+                    name_clean = str(name).strip()
+                    manufacturer_clean = str(manufacturer).strip() if manufacturer else ''
+
+                    if code_clean and name_clean:
+                        count += 1
+                        yield code_clean, name_clean, manufacturer_clean
+                else:
+                    if i <= 5:  # Faqat birinchi 5 ta xatoni ko'rsat
+                        errors.append(f"Qator {i}: code={code}, name={name}")
+
+        # Qatorlar o'qilgan sari yoziladi - fayl xotiraga to'liq yuklanmaydi
+        rows = timer.wrap('parse', parsed_rows())
+
+    elif file_name.endswith('.json'):
+        # JSON massivi butunligicha o'qiladi: standart json moduli oqim bilan
+        # o'qimaydi. Nomenklatura JSON eksportlari kichik - katta fayl uchun CSV
+        with timer.block('decode'):
+            data = json.loads(read_sample(file, file.size).decode(encoding))
+        rows = []
+
+        for item in data:
+            code = item.get('code') or item.get('kod')
+            name = item.get('name') or item.get('nom')
+            manufacturer = item.get('manufacturer') or item.get('ishlab_chiqaruvchi') or ''
+
+            if code and name:
+                rows.append((str(code).strip(), str(name).strip(), str(manufacturer).strip()))
+
+        count = len(rows)
+        errors = []
+        rows_read = len(data)
+        rows_skipped = rows_read - count
+        delimiter = ''
+        progress('writing')
+
+    else:
+        return [['error', 'Faqat CSV yoki JSON fayl yuklang!']]
+
+    # Qatorlar o'qilgan sari paketlab yoziladi (xotira fayl hajmiga bog'liq
+    # emas), lekin hammasi bitta tranzaksiyada - xatolik bo'lsa nomenklatura
+    # yarim yangilanib qolmaydi (versiya ham faqat muvaffaqiyatda oshadi)
+    with transaction.atomic():
+        write_started = time.perf_counter()
+        stats = upsert_products(rows)
+        timer.add('write', time.perf_counter() - write_started)
+
+        if file_name.endswith('.csv'):
+            timer.close()
+            rows_read = timer.counts['decode']
+            rows_skipped = max(rows_read - 1 - count, 0)
+
+        _record_import(
+            'products', options, {**stats, 'rows': count}, user,
+            encoding=encoding, delimiter=delimiter,
+            rows_read=rows_read, rows_skipped=rows_skipped,
+            matched=count, inserted=stats['created'], updated=stats['updated'],
+            timings={'hash': round(options.get('hash_time', 0), 4), **timer.timings()},
+            duration=time.perf_counter() - started,
+        )
+
+    if count > 0:
+        result.append(['success', f'{count} ta tovar yuklandi!'])
+        result.append(['info', upsert_summary(stats)])
+    else:
+        result.append(['error', 'Hech qanday tovar yuklanmadi. CSV formatini tekshiring.'])
+
+    if errors:
+        result.append(['warning', f'Xatolar: {"; ".join(errors)}'])
+
+    return result
+
+
+# ==================== 1C QOLDIQ ====================
+
+def import_inventory(file, warehouse, user, options, progress=None):
+    """
+    1C qoldiq faylini omborga yozish
+
+    options - file_name, file_size, digest, hash_time,
+    replace (faylda yo'q partiyalarni o'chirish)
+    """
+    started = time.perf_counter()
+    try:
+        return _import_inventory(file, warehouse, user, options, progress or _no_progress, started)
+    except Exception as e:
+        _record_import('inventory', options, {}, user, warehouse, status='failed', error=str(e),
+                       duration=time.perf_counter() - started)
+        raise
+
+
+def _import_inventory(file, warehouse, user, options, progress, started):
+    result = []
+    replace = options.get('replace', False)
+
+    # Encoding va delimiter - fayl boshidagi namuna bo'yicha,
+    # fayl esa qatorma-qator o'qiladi (butunlay xotiraga olinmaydi)
+    encoding, delimiter, empty = sniff(file)
+
+    if empty:
+        return [['error', 'Fayl bo\'sh!']]
+
+    # ========== NOMLAR INDEKSI ==========
+    matcher = ProductNameMatcher.from_db()
+
+    if not matcher:
+        return [['error', 'Nomenklatura bo\'sh! Avval nomenklatura yuklang.']]
+
+    # ========== MA'LUMOTLARNI YIGISH ==========
+    reviews_to_create = []
+    count = 0
+    fuzzy = 0
+    skipped = 0
+    errors_list = []
+    ambiguous = 0
+    zero_quantity = 0
+
+    # Qatorlar 1C parseri orqali (csv moduli, ustunlar tartibi e'lon qilingan)
+    parser = OneCInventoryParser(delimiter)
+
+    def matched_rows(rows):
+        """Fayldagi qoldiqlar: (product_id, series, expiry_date, quantity)"""
+        nonlocal count, fuzzy, skipped, ambiguous, zero_quantity
+
+        for position, row in enumerate(rows, start=1):
+            if position % PROGRESS_EVERY == 0:
+                progress('reading', position)
+
+            name = row.name
+
+            # Sana va miqdor parserda o'qilgan
+            expiry_date = row.expiry_date
+            qty = row.quantity
+
+            if qty <= 0:
+                zero_quantity += 1
+                continue
+
+            # Tovarni indeksdan topish (tasdiqlangan nom, to'liq nom, prefiks, keyin trigram o'xshashligi)
+            match = matcher.match(name)
+            product_id = match.product_id
+
+            if match.method == 'fuzzy':
+                fuzzy += 1
+
+            # Aniq topilmadi - nomzodlari bilan tekshirish jadvaliga
+            if not product_id:
+                if match.method == 'ambiguous':
+                    ambiguous += 1
+                if len(errors_list) < 15:
+                    errors_list.append(name[:35])
+                skipped += 1
+
+                reviews_to_create.append(ProductMatchReview(
+                    warehouse=warehouse,
+                    source_name=name[:500],
+                    manufacturer=row.manufacturer[:255],
+                    expiry_date=expiry_date,
+                    quantity=qty,
+                    candidates=[candidate._asdict() for candidate in match.candidates],
+                    score=match.candidates[0].score if match.candidates else 0,
+                ))
+                continue
+
+            count += 1
+            yield product_id, '', expiry_date, qty
+
+    # Bosqichlar: decode -> parse -> match -> diff -> write (har birining vaqti o'lchanadi)
+    timer = StageTimer()
+    lines = timer.wrap('decode', iter_lines(file, encoding))
+    rows = timer.wrap('parse', parser.parse(lines))
+    # Fayl tranzaksiyadan oldin oxirigacha o'qiladi - yozish qulfi faylni
+    # o'qish vaqtida ushlab turilmaydi
+    matched = list(timer.wrap('match', matched_rows(rows)))
+    timer.close()
+
+    skip_reasons = {**parser.skipped, 'quantity': zero_quantity}
+
+    progress('writing')
+    # Joriy qoldiq uni yozadigan tranzaksiya ichida o'qiladi (IMMEDIATE - boshqa
+    # yozuvchilar kutadi) - farq oraliqda o'zgargan qoldiq ustiga yozilmaydi.
+    # Faqat o'zgargan qatorlar yoziladi, "eski qoldiqlarni o'chirish"
+    # belgilansa faylda yo'q partiyalar o'chiriladi
+    with transaction.atomic():
+        with timer.block('diff'):
+            diff = diff_inventory(warehouse.pk, matched, replace=replace)
+        stats = diff.stats
+
+        with timer.block('write'):
+            write_inventory(diff)
+            bump_inventory_version(warehouse.pk)
+
+            # Oldingi yuklashdan qolgan tekshirilmagan nomlar - yangi fayl bo'yicha qayta yoziladi
+            warehouse.match_reviews.filter(status='pending').delete()
+            ProductMatchReview.objects.bulk_create(reviews_to_create, batch_size=500)
+
+            # Tugallangan reviziyalarda faqat o'zgargan tovarlar qayta hisoblanadi
+            changed_count = mark_warehouse_changes(warehouse.pk, diff.changed_products)
+
+            run = _record_import(
+                'inventory', options,
+                {**stats, 'rows': count, 'fuzzy': fuzzy, 'review': skipped, 'replace': replace,
+                 'skipped': skip_reasons},
+                user, warehouse,
+                encoding=encoding, delimiter=delimiter,
+                rows_read=timer.counts['decode'], rows_skipped=sum(skip_reasons.values()),
+                matched=count, unmatched=skipped, inserted=stats['created'], updated=stats['updated'],
+            )
+    # Yozish vaqti tranzaksiyadan keyin ma'lum
+    run.timings = {'hash': round(options.get('hash_time', 0), 4), **timer.timings()}
+    run.duration = time.perf_counter() - started
+    run.save(update_fields=['timings', 'duration'])
+
+    # ========== NATIJA XABARI ==========
+    if count > 0:
+        result.append(['success', f'✅ {count} ta qoldiq muvaffaqiyatli yuklandi!'])
+        result.append(['info', inventory_summary(stats)])
+    else:
+        result.append(['warning',
+                       '⚠️ Hech qanday qoldiq yuklanmadi. Tovar nomlari nomenklatura bilan mos kelmagan bo\'lishi mumkin.'])
+
+    if fuzzy > 0:
+        result.append(['info', f'{fuzzy} ta tovar o\'xshash nomi bo\'yicha avtomatik topildi.'])
+
+    if skipped > 0:
+        result.append(['warning',
+                       f'⚠️ {skipped} ta tovar nomenklaturada aniq topilmadi '
+                       f'({ambiguous} tasi bir nechta tovarga mos) - "Nomlarni tekshirish" sahifasida.'])
+
+    if errors_list:
+        result.append(['info',
+                       f'Topilmagan tovarlar: {", ".join(errors_list[:5])}{"..." if len(errors_list) > 5 else ""}'])
+
+    if changed_count and warehouse.revisions.filter(status='completed').exists():
+        result.append(['info',
+                       f'{changed_count} ta tovar qoldig\'i o\'zgardi - tugallangan reviziyalarda qayta hisoblash uchun belgilandi.'])
+
+    return result
@@ -0,0 +1,191 @@
+"""
+Yuklangan fayllarni oqim bilan o'qish (1C qoldiq, nomenklatura)
+
+Fayl butunlay xotiraga o'qilmaydi: encoding va ajratuvchi fayl boshidagi
+namuna (SAMPLE_SIZE) bo'yicha aniqlanadi, keyin fayl qismlab o'qilib,
+incremental decoder bilan qatorma-qator qaytariladi. Xotira fayl hajmiga
+emas, eng uzun qatorga bog'liq. Fayl xeshi ham qismlab hisoblanadi.
+
+Bosqichlar (decode -> parse -> match -> write) bir-biriga ulangan
+generatorlar, shuning uchun har bir bosqich vaqti StageTimer bilan
+o'lchanadi.
+"""
+import codecs
+import hashlib
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+# Encoding va ajratuvchini aniqlash uchun namuna (bayt)
+SAMPLE_SIZE = 64 * 1024
+
+# Fayldan bir marta o'qiladigan qism (bayt)
+CHUNK_SIZE = 256 * 1024
+
+# Tekshirish tartibi (latin-1 har qanday baytni o'qiydi - oxirgi variant)
+ENCODINGS = ['utf-8-sig', 'cp1251', 'latin-1']
+
+# str.splitlines() ajratadigan belgilar
+LINE_BREAKS = '\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+
+def read_sample(file, size=SAMPLE_SIZE):
+    """Fayl boshidan namuna (fayl o'qish joyi boshiga qaytariladi)"""
+    file.seek(0)
+    sample = file.read(size)
+    file.seek(0)
+    return sample
+
+
+def sniff_encoding(sample, complete=False):
+    """
+    Namuna bo'yicha encoding
+
+    complete - namuna butun fayl (aks holda namuna oxirida kesilgan UTF-8
+    belgi xato hisoblanmaydi)
+    """
+    for encoding in ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return ENCODINGS[-1]
+
+
+def sniff_delimiter(sample, encoding):
+    """Birinchi qator bo'yicha ajratuvchi: nuqtali vergul yoki vergul"""
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample)
+    first_line = text.splitlines()[0] if text else ''
+    return ';' if ';' in first_line else ','
+
+
+def sniff(file):
+    """Qaytaradi: (encoding, delimiter, namuna bo'shmi)"""
+    sample = read_sample(file)
+    encoding = sniff_encoding(sample, complete=len(sample) < SAMPLE_SIZE)
+    return encoding, sniff_delimiter(sample, encoding), not sample
+
+
+def file_digest(file, chunk_size=CHUNK_SIZE):
+    """Fayl mazmunining SHA-256 xeshi (fayl o'qish joyi boshiga qaytariladi)"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def iter_lines(file, encoding, chunk_size=CHUNK_SIZE):
+    """
+    Faylni qatorma-qator o'qish (qator oxiri belgilarisiz)
+
+    str.splitlines() bilan bir xil qatorlarga bo'linadi. Namunadan keyin
+    noto'g'ri bayt uchrasa, u U+FFFD belgisi bilan almashtiriladi.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    tail = ''
+
+    for chunk in file.chunks(chunk_size):
+        text = tail + decoder.decode(chunk)
+        lines = text.splitlines(True)
+
+        # Oxirgi qator tugamagan bo'lishi mumkin ('\r' dan keyin '\n' kelishi ham mumkin)
+        tail = ''
+        if lines and (lines[-1][-1] not in LINE_BREAKS or lines[-1].endswith('\r')):
+            tail = lines.pop()
+
+        for line in lines:
+            yield _strip_break(line)
+
+    text = tail + decoder.decode(b'', final=True)
+    for line in text.splitlines():
+        yield line
+
+
+def _strip_break(line):
+    if line.endswith('\r\n'):
+        return line[:-2]
+    return line[:-1]
+
+
+class StageTimer:
+    """
+    Ulangan generatorlar bosqichlari vaqti
+
+        lines = timer.wrap('decode', iter_lines(file, encoding))
+        rows = timer.wrap('parse', parser.parse(lines))
+
+    Har bir bosqich vaqti o'zidan oldingi (o'rab olingan) bosqich vaqtisiz
+    hisoblanadi. counts - bosqich qaytargan elementlar soni (close() dan keyin
+    to'liq - oxirigacha o'qilmagan bosqich ham yopiladi).
+
+    Generatorlar oxirigacha o'qilgandan keyingi bosqichlar (masalan yozish)
+    block() bilan o'lchanadi.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.inclusive = Counter()
+        self.exclusive = Counter()
+        self.counts = Counter()
+        self._generators = []
+
+    def wrap(self, stage, iterable):
+        self.stages.append(stage)
+        generator = self._timed(stage, iter(iterable))
+        self._generators.append(generator)
+        return generator
+
+    def close(self):
+        for generator in self._generators:
+            generator.close()
+
+    def _timed(self, stage, iterator):
+        clock = time.perf_counter
+        inclusive = 0.0
+        count = 0
+        try:
+            while True:
+                started = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    inclusive += clock() - started
+                    return
+                inclusive += clock() - started
+                count += 1
+                yield item
+        finally:
+            self.inclusive[stage] += inclusive
+            self.counts[stage] += count
+
+    def add(self, stage, seconds):
+        """Generator bo'lmagan bosqich (masalan yozish) - o'ralgan bosqichlar vaqtini ham o'z ichiga oladi"""
+        self.stages.append(stage)
+        self.inclusive[stage] += seconds
+
+    @contextmanager
+    def block(self, stage):
+        """Alohida bosqich - faqat blok ichidagi vaqt"""
+        self.stages.append(stage)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.exclusive[stage] += time.perf_counter() - started
+
+    def timings(self):
+        """{bosqich: soniya} - har biri o'zidan oldingisisiz"""
+        self.close()
+        result = {}
+        previous = 0.0
+        for stage in self.stages:
+            if stage in self.exclusive:
+                result[stage] = round(self.exclusive[stage], 4)
+                continue
+            result[stage] = round(max(self.inclusive[stage] - previous, 0.0), 4)
+            previous = self.inclusive[stage]
+        return result
@@ -0,0 +1,128 @@
+"""
+1C qoldig'ini omborga yozish (farqni qo'llash)
+
+Hamma qoldiqni o'chirib qayta yozish o'rniga fayl ombordagi joriy qoldiq
+bilan (product, series, expiry_date) kaliti bo'yicha solishtiriladi va
+faqat kerakli o'zgarishlar paketlab yoziladi:
+- faylda bor, omborda yo'q - INSERT
+- miqdori o'zgargan - UPDATE
+- omborda bor, faylda yo'q - DELETE (faqat replace=True bo'lsa)
+
+Faylda bir kalit bir necha marta kelsa, miqdorlar qo'shiladi. Omborda
+takrorlangan kalitlar (NULL srok bilan avval yozilganlar) bitta qatorga
+birlashtiriladi.
+
+diff_inventory() faqat o'qiydi (fayl shu yerda oxirigacha o'qiladi),
+write_inventory() esa yozadi - fon vazifasi yozishni boshqa yozuvlar bilan
+bitta tranzaksiyaga qo'shishi mumkin.
+
+Qoldiq o'zgargandan keyin bump_inventory_version() chaqiriladi (ombor
+bo'yicha qidiruv keshi).
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db.models import F
+
+from .models import Inventory, Warehouse
+
+
+# Bitta paketdagi qatorlar soni (SQLite: so'rovda 999 tagacha parametr)
+BATCH_SIZE = 900
+
+# Inventory.quantity aniqligi
+QUANTITY_STEP = Decimal('0.01')
+
+# stats - {'created': .., 'updated': .., 'unchanged': .., 'deleted': ..},
+# changed_products - qoldig'i o'zgargan tovarlar to'plami
+InventoryDiff = namedtuple('InventoryDiff', ['to_create', 'to_update', 'to_delete', 'stats', 'changed_products'])
+
+
+def bump_inventory_version(warehouse_id):
+    """Ombor qoldig'i o'zgardi"""
+    Warehouse.objects.filter(pk=warehouse_id).update(inventory_version=F('inventory_version') + 1)
+
+
+def diff_inventory(warehouse_id, rows, replace=True, batch_size=BATCH_SIZE):
+    """Fayl va joriy qoldiq farqi (bazaga yozilmaydi)"""
+    # Joriy qoldiq: kalit -> (id, qatordagi miqdor, kalit bo'yicha jami)
+    current = {}
+    to_delete = []
+    merged = set()
+    for pk, product_id, series, expiry_date, quantity in (
+        Inventory.objects
+        .filter(warehouse_id=warehouse_id)
+        .values_list('id', 'product_id', 'series', 'expiry_date', 'quantity')
+        .order_by('id')
+        .iterator(chunk_size=batch_size)
+    ):
+        key = (product_id, series, expiry_date)
+        if key in current:
+            # Takrorlangan kalit - birinchi qatorga qo'shiladi
+            kept_pk, stored, total = current[key]
+            current[key] = (kept_pk, stored, total + quantity)
+            to_delete.append(pk)
+            merged.add(key)
+        else:
+            current[key] = (pk, quantity, quantity)
+    duplicates = len(to_delete)
+
+    # Fayldagi qoldiq (takrorlangan kalit - miqdorlar yig'indisi)
+    incoming = {}
+    for product_id, series, expiry_date, quantity in rows:
+        key = (product_id, series, expiry_date)
+        incoming[key] = incoming.get(key, 0) + quantity
+
+    to_create = []
+    to_update = []
+    changed_products = set()
+    unchanged = 0
+
+    for key, quantity in incoming.items():
+        quantity = quantity.quantize(QUANTITY_STEP)
+        existing = current.pop(key, None)
+        if existing is None:
+            product_id, series, expiry_date = key
+            to_create.append(Inventory(
+                warehouse_id=warehouse_id,
+                product_id=product_id,
+                series=series,
+                expiry_date=expiry_date,
+                quantity=quantity
+            ))
+            changed_products.add(product_id)
+            continue
+
+        pk, stored, total = existing
+        if stored != quantity:
+            to_update.append(Inventory(pk=pk, quantity=quantity))
+        if total != quantity:
+            changed_products.add(key[0])
+        else:
+            unchanged += 1
+
+    # current da qolganlari - faylda yo'q
+    for key, (pk, stored, total) in current.items():
+        if replace:
+            to_delete.append(pk)
+            changed_products.add(key[0])
+        elif key in merged:
+            # Takrorlari o'chiriladi - jami birinchi qatorga yoziladi
+            to_update.append(Inventory(pk=pk, quantity=total))
+
+    stats = {
+        'created': len(to_create),
+        'updated': len(incoming) - len(to_create) - unchanged,
+        'unchanged': unchanged,
+        'deleted': len(to_delete) - duplicates,
+    }
+    return InventoryDiff(to_create, to_update, to_delete, stats, changed_products)
+
+
+def write_inventory(diff, batch_size=BATCH_SIZE):
+    """Farqni paketlab yozish (tranzaksiya ichida chaqiriladi)"""
+    to_delete = diff.to_delete
+    for start in range(0, len(to_delete), batch_size):
+        Inventory.objects.filter(pk__in=to_delete[start:start + batch_size]).delete()
+    Inventory.objects.bulk_update(diff.to_update, ['quantity'], batch_size=batch_size)
+    Inventory.objects.bulk_create(diff.to_create, batch_size=batch_size)
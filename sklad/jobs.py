@@ -0,0 +1,234 @@
+"""
+Fon vazifalari navbati (ma'lumotlar bazasida)
+
+Og'ir hisob-kitoblar HTTP so'rov ichida emas, `python manage.py run_jobs`
+worker jarayonida bajariladi. Sahifalar esa JSON status endpoint orqali
+jarayonni kuzatib boradi. Fayl yuklashda fayl diskka saqlanadi va worker
+o'sha yerdan o'qiydi (sklad/imports.py).
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Warehouse, BackgroundJob
+from .reconciliation import calculate_revision_results
+from .combined import refresh_combined_results
+from .imports import import_products, import_inventory
+
+
+logger = logging.getLogger(__name__)
+
+# Bajarilayotgan vazifaning heartbeat_at i shuncha soniyada bir marta yangilanadi
+HEARTBEAT_INTERVAL = 30
+
+# Shuncha vaqt yangilanmagan 'running' vazifa - worker to'xtagan deb hisoblanadi
+STALE_AFTER = timedelta(minutes=5)
+
+STAGE_LABELS = {
+    'reading': 'Fayl o\'qilmoqda',
+    'loading': 'Ma\'lumotlar yuklanmoqda',
+    'calculating': 'Hisoblanmoqda',
+    'writing': 'Natijalar yozilmoqda',
+}
+
+
+def enqueue_reconciliation(revision, user=None, dirty_only=False):
+    """
+    Reviziya natijalarini hisoblashni navbatga qo'yish (navbatda turgan bo'lsa - o'shani qaytaradi)
+
+    dirty_only - faqat o'zgargan tovarlarni qayta hisoblash
+    """
+    kinds = ['reconcile', 'reconcile_dirty'] if dirty_only else ['reconcile']
+    with transaction.atomic():
+        job = BackgroundJob.objects.filter(kind__in=kinds, revision=revision, status='queued').first()
+        if job:
+            return job
+        return BackgroundJob.objects.create(
+            kind='reconcile_dirty' if dirty_only else 'reconcile',
+            revision=revision,
+            created_by=user
+        )
+
+
+def enqueue_combined_refresh(warehouse_id, user=None):
+    """
+    Ombor umumiy natijalarini yangilashni navbatga qo'yish
+
+    Worker ulgurmasa, sahifa ochilganda natijalar joyida yangilanadi.
+    """
+    with transaction.atomic():
+        Warehouse.objects.filter(pk=warehouse_id).update(combined_refreshed_at=None)
+        job = BackgroundJob.objects.filter(kind='refresh_combined', warehouse_id=warehouse_id, status='queued').first()
+        if job:
+            return job
+        return BackgroundJob.objects.create(
+            kind='refresh_combined',
+            warehouse_id=warehouse_id,
+            created_by=user
+        )
+
+
+def enqueue_import(kind, file, user, warehouse=None, **options):
+    """
+    Yuklangan faylni diskka saqlab, yuklash vazifasini navbatga qo'yish
+
+    options - digest (fayl xeshi) va yuklash sozlamalari. Xuddi shu fayl
+    shu joy uchun navbatda yoki bajarilayotgan bo'lsa - o'sha vazifa qaytariladi.
+    """
+    options = {'file_name': file.name, 'file_size': file.size, **options}
+    with transaction.atomic():
+        job = BackgroundJob.objects.filter(
+            kind=kind,
+            warehouse=warehouse,
+            status__in=['queued', 'running'],
+            options__digest=options.get('digest'),
+        ).first()
+        if job:
+            return job
+        job = BackgroundJob(kind=kind, warehouse=warehouse, options=options, created_by=user)
+        job.file.save(file.name, file, save=False)
+        job.save()
+        return job
+
+
+def claim_next_job():
+    """Navbatdagi eng eski vazifani olish (boshqa worker olib ulgurgan bo'lsa - keyingisini)"""
+    while True:
+        job = BackgroundJob.objects.filter(status='queued').order_by('created_at', 'id').first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running',
+            started_at=now,
+            heartbeat_at=now
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_jobs():
+    """
+    To'xtab qolgan worker'ning 'running' vazifalarini qaytadan navbatga qo'yish
+
+    Faqat heartbeat_at i STALE_AFTER dan eski vazifalar - boshqa worker hozir
+    bajarayotganlariga tegilmaydi.
+    """
+    threshold = timezone.now() - STALE_AFTER
+    return BackgroundJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=threshold) | Q(heartbeat_at__isnull=True, started_at__lt=threshold)
+    ).update(status='queued', stage='')
+
+
+def report_progress(job, stage, processed=0, total=0):
+    """Vazifa jarayonini saqlash (status endpoint shu qiymatlarni o'qiydi)"""
+    job.stage = stage
+    job.processed = processed
+    job.total = total
+    BackgroundJob.objects.filter(pk=job.pk).update(stage=stage, processed=processed, total=total)
+
+
+def run_job(job):
+    """Vazifani bajarish va yakuniy statusni yozish"""
+    handler = JOB_HANDLERS[job.kind]
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job.pk, stop), name=f'job-{job.pk}-heartbeat', daemon=True)
+    heartbeat.start()
+    try:
+        handler(job)
+    except Exception:
+        logger.exception('Fon vazifasi #%s xatolik bilan tugadi', job.pk)
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error=traceback.format_exc(limit=5),
+            finished_at=timezone.now()
+        )
+        return False
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    BackgroundJob.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now())
+    return True
+
+
+def _heartbeat(job_id, stop):
+    """Vazifa bajarilayotganda heartbeat_at ni yangilab turish (alohida oqim va ulanish)"""
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                BackgroundJob.objects.filter(pk=job_id, status='running').update(heartbeat_at=timezone.now())
+            except Exception:
+                logger.warning('Vazifa #%s heartbeat yozilmadi', job_id, exc_info=True)
+    finally:
+        connection.close()
+
+
+def job_status(job):
+    """Status endpoint uchun JSON"""
+    if job is None:
+        return {'status': 'none', 'active': False}
+
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'stage': job.stage,
+        'stage_display': STAGE_LABELS.get(job.stage, ''),
+        'processed': job.processed,
+        'total': job.total,
+        'percent': job.percent,
+        'active': job.is_active,
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# ==================== HANDLERS ====================
+
+def _run_reconcile(job):
+    calculate_revision_results(
+        job.revision,
+        progress=lambda stage, processed=0, total=0: report_progress(job, stage, processed, total),
+        dirty_only=job.kind == 'reconcile_dirty'
+    )
+    refresh_combined_results(job.revision.warehouse_id)
+
+
+def _run_refresh_combined(job):
+    refresh_combined_results(job.warehouse_id)
+
+
+def _run_import(job):
+    progress = lambda stage, processed=0, total=0: report_progress(job, stage, processed, total)
+    try:
+        with job.file.open('rb') as file:
+            if job.kind == 'import_inventory':
+                result = import_inventory(file, job.warehouse, job.created_by, job.options, progress)
+            else:
+                result = import_products(file, job.created_by, job.options, progress)
+    finally:
+        # Fayl faqat shu vazifa uchun saqlangan
+        job.file.delete(save=False)
+        BackgroundJob.objects.filter(pk=job.pk).update(file='')
+
+    BackgroundJob.objects.filter(pk=job.pk).update(result={'messages': result})
+    if job.kind == 'import_inventory':
+        enqueue_combined_refresh(job.warehouse_id, job.created_by)
+
+
+JOB_HANDLERS = {
+    'reconcile': _run_reconcile,
+    'reconcile_dirty': _run_reconcile,
+    'refresh_combined': _run_refresh_combined,
+    'import_products': _run_import,
+    'import_inventory': _run_import,
+}
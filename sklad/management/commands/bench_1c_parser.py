@@ -0,0 +1,130 @@
+"""
+1C qoldiq faylini o'qish micro-benchmarki
+
+    python manage.py bench_1c_parser --rows 200000
+    python manage.py bench_1c_parser --file ostatki.csv
+
+Eski (belgima-belgi) ajratuvchili tsikl bilan OneCInventoryParser.parse()
+(csv moduli) taqqoslanadi - ikkalasi ham nom, sana va miqdorni o'qiydi.
+Bazaga murojaat yo'q.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from sklad.ingest import ENCODINGS, sniff_delimiter, sniff_encoding
+from sklad.parsers import InventoryRow, OneCInventoryParser, parse_date, parse_quantity
+
+
+def legacy_split(line, delimiter):
+    """admin_inventory_upload dagi eski ajratuvchi (taqqoslash uchun)"""
+    parts = []
+    current = ''
+    in_quotes = False
+
+    for char in line:
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == delimiter and not in_quotes:
+            parts.append(current.strip().strip('"'))
+            current = ''
+        else:
+            current += char
+    parts.append(current.strip().strip('"'))
+    return parts
+
+
+def legacy_parse(lines, delimiter):
+    """Eski tsikl: ajratish, nomni tekshirish, sana va miqdor"""
+    for line in lines:
+        parts = legacy_split(line, delimiter)
+        if len(parts) < 5:
+            continue
+        name = parts[1]
+        if not name or name in OneCInventoryParser.SKIP_NAMES or len(name) < 2:
+            continue
+        yield InventoryRow(name, parts[2], parse_date(parts[3]), parse_quantity(parts[4]))
+
+
+class Command(BaseCommand):
+    help = "1C qoldiq qatorlarini ajratish: eski parser va csv moduli"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help="Sintetik fayldagi qatorlar soni")
+        parser.add_argument('--file', help="Haqiqiy 1C fayli (berilsa - sintetik o'rniga)")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], 'rb') as f:
+                content = f.read()
+            encoding = sniff_encoding(content, complete=True)
+            delimiter = sniff_delimiter(content, encoding)
+            lines = content.decode(encoding, errors='replace').splitlines()
+        else:
+            encoding, delimiter = ENCODINGS[0], ';'
+            lines = self._sample(options['rows'])
+
+        parser = OneCInventoryParser(delimiter)
+        data_lines = list(parser.data_lines(lines))
+        size = sum(len(line) for line in data_lines)
+        self.stdout.write(
+            f"{len(data_lines)} ta qator, {size / 1024 / 1024:.1f} MB, "
+            f"encoding={encoding}, delimiter='{delimiter}'"
+        )
+
+        legacy = self._best(
+            options['repeat'],
+            lambda: list(legacy_parse(self._legacy_lines(lines), delimiter))
+        )
+        new = self._best(options['repeat'], lambda: list(OneCInventoryParser(delimiter).parse(lines)))
+
+        self.stdout.write(f"{'eski ajratuvchi':<28} {legacy:>8.3f} s")
+        self.stdout.write(f"{'csv moduli (parse)':<28} {new:>8.3f} s   x{legacy / new:.1f}")
+
+        # Natijalar mosligi ("" bilan yozilgan qo'shtirnoqsiz qatorlarda bir xil bo'lishi kerak)
+        plain = [line for line in data_lines if '""' not in line]
+        legacy_rows = list(legacy_parse(plain, delimiter))
+        rows = list(OneCInventoryParser(delimiter).parse(plain))
+        mismatched = abs(len(legacy_rows) - len(rows)) + sum(1 for old, row in zip(legacy_rows, rows) if old != row)
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f"{mismatched} ta qatorda natijalar farq qiladi"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Natijalar bir xil"))
+
+    def _legacy_lines(self, lines):
+        """Eski tsikldagi qatorlarni tashlash qoidalari"""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if 'Итого' in line or 'Мат.отв' in line or 'итого' in line:
+                break
+            if any(word in line for word in
+                   ['Наименование', 'наименование', 'Остатки по товар', 'Остаток на', ';;К.;', ',,К.,']):
+                continue
+            yield line
+
+    def _best(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _sample(self, rows):
+        """1C eksportiga o'xshash qatorlar (sarlavha, qo'shtirnoqli nomlar, Итого)"""
+        lines = [
+            'Остатки по товарам на 01.01.2030',
+            'Куп;Наименование;Производитель;Срок годность;Остаток;Кам',
+            ';;К.;;;',
+        ]
+        for i in range(rows):
+            name = f'Парацетамол {i} таблетки 500 мг №20'
+            if i % 7 == 0:
+                name = f'"{name}; упаковка"'
+            lines.append(f'{i + 1};{name};Фармстандарт ОАО;{1 + i % 28:02d}.{1 + i % 12:02d}.2030;{i % 500} ;')
+        lines.append('Итого;;;;;')
+        return lines
@@ -0,0 +1,80 @@
+"""
+1C nomlarini nomenklatura bilan moslashtirish benchmarki
+
+    python manage.py bench_name_matching --catalog 100000 --rows 10000
+
+Sintetik nomenklatura va "buzilgan" 1C nomlari (lotin harflari, bo'shliqlar,
+katta harflar) - har bir qator trigram o'xshashligi orqali topiladi (eng
+og'ir holat). Bazaga murojaat yo'q.
+"""
+import random
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from sklad.matching import ProductNameMatcher
+
+
+SYLLABLES = ['ка', 'ро', 'ми', 'зол', 'пра', 'лин', 'окс', 'ци', 'тин', 'фен',
+             'ам', 'бу', 'дол', 'нор', 'цеф', 'три', 'ло', 'вас', 'та', 'ген']
+FORMS = ['таблетки', 'капсулы', 'раствор для инъекций', 'сироп', 'суспензия',
+         'мазь', 'гель', 'порошок', 'капли глазные', 'свечи']
+UNITS = ['мг', 'мл', 'мкг', 'г']
+MAKERS = ['Фармстандарт', 'Гедеон Рихтер', 'KRKA', 'Sandoz', 'Teva', 'Borimed', 'Nika Pharm']
+
+
+class Command(BaseCommand):
+    help = "Tovar nomlarini moslashtirish (trigram indeksi) tezligini o'lchash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--catalog', type=int, default=100000, help="Nomenklaturadagi tovarlar soni")
+        parser.add_argument('--rows', type=int, default=10000, help="1C fayldagi qatorlar soni")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        names = self._catalog(rng, options['catalog'])
+        matcher = ProductNameMatcher(enumerate(names))
+
+        truth = [rng.randrange(len(names)) for _ in range(options['rows'])]
+        rows = [self._distort(rng, names[position]) for position in truth]
+
+        started = time.perf_counter()
+        matcher.trigram_index()
+        indexed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        matches = [matcher.match(row) for row in rows]
+        elapsed = time.perf_counter() - started
+
+        # To'g'ri tovar avtomatik tanlangan yoki birinchi nomzod
+        correct = sum(
+            1 for position, match in zip(truth, matches)
+            if (match.product_id if match.product_id is not None
+                else match.candidates[0].product_id if match.candidates else None) == position
+        )
+
+        self.stdout.write(f"nomenklatura: {len(names)}, qatorlar: {len(rows)}")
+        self.stdout.write(f"{'indeks qurish':<20} {indexed:>8.2f} s")
+        self.stdout.write(f"{'moslashtirish':<20} {elapsed:>8.2f} s   {len(rows) / elapsed:>8.0f} qator/s")
+        self.stdout.write(f"usullar: {dict(Counter(match.method for match in matches))}")
+        self.stdout.write(f"to'g'ri tovar birinchi o'rinda: {correct * 100 / len(rows):.1f}%")
+
+    def _catalog(self, rng, size):
+        drugs = [
+            ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5))).capitalize()
+            for _ in range(max(1, size // 8))
+        ]
+        names = set()
+        while len(names) < size:
+            names.add(
+                f"{rng.choice(drugs)} {rng.choice(FORMS)} {rng.choice([5, 10, 20, 50, 100, 250, 500, 1000])}"
+                f"{rng.choice(UNITS)} №{rng.randint(1, 120)} {rng.choice(MAKERS)} {rng.randint(1, 99)}"
+            )
+        return sorted(names)
+
+    def _distort(self, rng, name):
+        """1C dagi kabi: lotin "homoglif"lar, "500 мг", ba'zan katta harflar"""
+        name = name.replace('мг', ' мг').replace('а', 'a', 1).replace('о', 'o', 1)
+        return name.upper() if rng.random() < 0.3 else name
@@ -0,0 +1,74 @@
+"""
+Tovar qidiruvi benchmarki: FTS5 va LIKE
+
+    python manage.py bench_product_search --sizes 5000 50000 500000
+
+Har bir o'lcham uchun sintetik nomenklatura FTS jadvali bilan birga
+yoziladi va bir xil so'rovlar ikkala usulda o'lchanadi. Barcha ma'lumotlar
+tranzaksiya oxirida bekor qilinadi.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from sklad.fts import fts_available, index_products, search_fts
+from sklad.models import Product
+from sklad.nomenclature import BATCH_SIZE
+from sklad.management.commands.bench_name_matching import Command as NameMatchingBench
+
+
+QUERIES = ['та', 'капс', 'раствор для', 'kapsuly', 'paratsetamol 500', 'Sandoz', 'B00042']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Tovar qidiruvi (FTS5 va LIKE) tezligini nomenklatura hajmi bo'yicha o'lchash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[5000, 50000, 500000],
+                            help="Nomenklaturadagi tovarlar soni")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("FTS5 jadvali yo'q (faqat SQLite, migratsiyalarni bajaring)")
+
+        self.stdout.write(f"{'tovarlar':>10} {'FTS, ms':>10} {'LIKE, ms':>10}")
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._fixture(random.Random(options['seed']), size)
+                    fts = self._measure(lambda query: search_fts(query, 30), options['repeat'])
+                    like = self._measure(self._like, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+            self.stdout.write(f"{size:>10} {fts:>10.2f} {like:>10.2f}")
+
+    def _fixture(self, rng, size):
+        names = NameMatchingBench()._catalog(rng, size)
+        for start in range(0, size, BATCH_SIZE):
+            products = Product.objects.bulk_create([
+                Product(code=f'B{position:07d}', name=name, manufacturer='Bench')
+                for position, name in enumerate(names[start:start + BATCH_SIZE], start=start)
+            ])
+            index_products(products)
+
+    def _measure(self, search, repeat):
+        """Bitta so'rovning o'rtacha vaqti (ms)"""
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in QUERIES:
+                search(query)
+        return (time.perf_counter() - started) * 1000 / (repeat * len(QUERIES))
+
+    def _like(self, query):
+        """Eski qidiruv (transliteratsiyasiz)"""
+        return list(Product.objects.filter(Q(name__icontains=query) | Q(code__icontains=query)).order_by('name')[:30])
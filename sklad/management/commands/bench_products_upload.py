@@ -0,0 +1,95 @@
+"""
+Nomenklatura yuklash benchmarki
+
+    python manage.py bench_products_upload --sizes 10000 100000
+    python manage.py bench_products_upload --sizes 10000 --baseline 2000
+
+Har bir o'lcham uchun: birinchi yuklash (hammasi yangi) va qayta yuklash
+(har 10-chi tovar nomi o'zgargan). Tranzaksiyalar haqiqiy (har paket - commit),
+shuning uchun sintetik tovarlar oxirida o'chiriladi.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from sklad.models import Product
+from sklad.nomenclature import upsert_products
+
+
+PREFIX = 'BENCHP-'
+
+
+class QueryCounter:
+    """So'rovlarni sanash (CaptureQueriesContext 9000 tadan keyin to'xtaydi)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Nomenklatura yuklash (paketli upsert) tezligini o'lchash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000],
+                            help="Fayldagi qatorlar soni")
+        parser.add_argument('--baseline', type=int, default=0,
+                            help="Taqqoslash uchun: shuncha qatorni update_or_create bilan yozish")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'qatorlar':>10} {'rejim':>10} {'sorovlar':>10} {'vaqt, s':>8} {'qator/s':>10}")
+
+        try:
+            for size in options['sizes']:
+                self._cleanup()
+                self._measure(size, 'yangi', self._rows(size))
+                self._measure(size, 'qayta', self._rows(size, changed_every=10))
+
+            if options['baseline']:
+                self._cleanup()
+                self._baseline(options['baseline'])
+        finally:
+            self._cleanup()
+
+    def _rows(self, size, changed_every=0):
+        for i in range(size):
+            name = f'Benchmark tovar {i}'
+            if changed_every and i % changed_every == 0:
+                name += ' (yangi nom)'
+            yield f'{PREFIX}{i}', name, f'Ishlab chiqaruvchi {i % 50}'
+
+    def _measure(self, size, mode, rows):
+        started = time.perf_counter()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            stats = upsert_products(rows)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{size:>10} {mode:>10} {counter.count:>10} {elapsed:>8.2f} {size / elapsed:>10.0f}"
+            f"   (yangi {stats['created']}, yangilandi {stats['updated']}, o'zgarmadi {stats['unchanged']})"
+        )
+
+    def _baseline(self, size):
+        started = time.perf_counter()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            for code, name, manufacturer in self._rows(size):
+                Product.objects.update_or_create(
+                    code=code,
+                    defaults={'name': name, 'manufacturer': manufacturer}
+                )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{size:>10} {'eski':>10} {counter.count:>10} {elapsed:>8.2f} {size / elapsed:>10.0f}"
+            f"   (update_or_create)"
+        )
+
+    def _cleanup(self):
+        # Sintetik tovarlarga bog'langan yozuvlar yo'q
+        Product.objects.filter(code__startswith=PREFIX).delete()
@@ -0,0 +1,120 @@
+"""
+Reviziya natijalarini hisoblash benchmarki
+
+    python manage.py bench_reconciliation --sizes 1000 5000 20000
+
+Har bir o'lcham uchun sintetik ombor yaratiladi, natijalar hisoblanadi va
+so'rovlar soni o'lchanadi. Barcha ma'lumotlar tranzaksiya oxirida bekor qilinadi.
+"""
+import math
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from sklad.models import (
+    User, Warehouse, Product, Inventory,
+    Revision, RevisionAssignment, RevisionItem,
+)
+from sklad.reconciliation import BATCH_SIZE, calculate_revision_results, rebuild_running_totals
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Reviziya natijalarini hisoblash uchun so'rovlar soni va vaqtini o'lchash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 5000, 20000],
+                            help="1C qoldiq qatorlari soni")
+        parser.add_argument('--revizors', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'qatorlar':>10} {'sorovlar':>10} {'oqish':>8} {'yozish':>8} {'vaqt, s':>8}")
+
+        reads = set()
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    revision = self._fixture(size, options['revizors'])
+                    started = time.perf_counter()
+                    with CaptureQueriesContext(connection) as ctx:
+                        calculate_revision_results(revision)
+                    elapsed = time.perf_counter() - started
+                    raise Rollback
+            except Rollback:
+                pass
+
+            sqls = [q['sql'].lstrip().upper() for q in ctx.captured_queries]
+            writes = sum(1 for sql in sqls if sql.startswith('INSERT'))
+            read_count = len(sqls) - writes
+            reads.add(read_count)
+            self.stdout.write(f"{size:>10} {len(sqls):>10} {read_count:>8} {writes:>8} {elapsed:>8.2f}")
+
+        self.stdout.write(
+            f"INSERT paketlari ~ qatorlar / min({BATCH_SIZE}, DB limiti); "
+            f"qolgan so'rovlar soni: {', '.join(str(r) for r in sorted(reads))}"
+        )
+        if len(reads) == 1:
+            self.stdout.write(self.style.SUCCESS("Qator soniga bog'liq so'rovlar yo'q"))
+        else:
+            self.stdout.write(self.style.ERROR("So'rovlar soni qatorlar soni bilan o'smoqda!"))
+
+    def _fixture(self, size, revizor_count):
+        """Sintetik ombor: size ta 1C partiyasi, ~90% sanalgan, 5% hisobda yo'q"""
+        admin = User.objects.create(username='bench_admin', role='admin')
+        warehouse = Warehouse.objects.create(name='Benchmark', created_by=admin)
+        revizors = [
+            User.objects.create(username=f'bench_revizor_{i}', role='revizor', created_by=admin)
+            for i in range(revizor_count)
+        ]
+
+        # Har bir tovar o'rtacha 2 partiyada
+        product_count = math.ceil(size / 2)
+        extra = max(1, size // 20)
+        Product.objects.bulk_create(
+            [Product(code=f'BENCH-{i}', name=f'Benchmark tovar {i}') for i in range(product_count + extra)],
+            batch_size=BATCH_SIZE,
+        )
+        product_ids = list(
+            Product.objects.filter(code__startswith='BENCH-').order_by('id').values_list('id', flat=True)
+        )
+
+        Inventory.objects.bulk_create(
+            [
+                Inventory(
+                    warehouse=warehouse,
+                    product_id=product_ids[i % product_count],
+                    series=f'S{i // product_count}',
+                    quantity=Decimal(10 + i % 7),
+                )
+                for i in range(size)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        revision = Revision.objects.create(warehouse=warehouse, created_by=admin, status='in_progress')
+        RevisionAssignment.objects.bulk_create(
+            [RevisionAssignment(revision=revision, revizor=r) for r in revizors]
+        )
+
+        counted = product_ids[:product_count * 9 // 10] + product_ids[product_count:]
+        RevisionItem.objects.bulk_create(
+            [
+                RevisionItem(
+                    revision=revision,
+                    revizor=revizors[i % revizor_count],
+                    product_id=product_id,
+                    expiry_date='2030-01-01',
+                    quantity=Decimal(15 + i % 11),
+                )
+                for i, product_id in enumerate(counted)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        rebuild_running_totals(revision)
+        return revision
@@ -0,0 +1,22 @@
+"""
+Tovar qidiruvi FTS5 jadvalini qayta yozish
+
+    python manage.py rebuild_product_fts
+
+Odatda kerak emas - jadval tovarlar yozilganda yangilanadi. fold() (lotin/
+kirill qoidalari) o'zgargandan keyin yoki jadval buzilganda ishlatiladi.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from sklad.fts import fts_available, rebuild_product_fts
+
+
+class Command(BaseCommand):
+    help = "Tovar qidiruvi FTS5 jadvalini nomenklaturadan qayta yozish"
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("FTS5 jadvali yo'q (faqat SQLite, migratsiyalarni bajaring)")
+
+        count = rebuild_product_fts()
+        self.stdout.write(self.style.SUCCESS(f"{count} ta tovar indekslandi"))
@@ -0,0 +1,50 @@
+"""
+Fon vazifalari worker'i
+
+    python manage.py run_jobs            # doimiy ishlaydi
+    python manage.py run_jobs --once     # navbatni bo'shatib chiqadi
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from sklad.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi fon vazifalarini (natijalarni hisoblash va h.k.) bajarish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbat bo'shagach to'xtash")
+        parser.add_argument('--interval', type=float, default=2.0, help="Navbatni tekshirish oralig'i (soniya)")
+
+    def handle(self, *args, **options):
+        self.requeue_stale()
+
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                # Boshqa worker to'xtab qolgan bo'lsa - uning vazifalari
+                self.requeue_stale()
+                continue
+
+            self.stdout.write(f"#{job.pk} {job.get_kind_display()} boshlandi")
+            started = time.perf_counter()
+            ok = run_job(job)
+            elapsed = time.perf_counter() - started
+
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"#{job.pk} tugadi ({elapsed:.1f} s)"))
+            else:
+                self.stdout.write(self.style.ERROR(f"#{job.pk} xatolik bilan tugadi ({elapsed:.1f} s)"))
+
+    def requeue_stale(self):
+        stale = requeue_stale_jobs()
+        if stale:
+            self.stdout.write(self.style.WARNING(f"{stale} ta to'xtab qolgan vazifa qayta navbatga qo'yildi"))
@@ -0,0 +1,228 @@
+"""
+1C dagi tovar nomini nomenklatura bilan moslashtirish
+
+- tasdiqlangan nom (ProductAlias): admin avval tanlagan tovar (dict)
+- to'liq moslik: normallashtirilgan nom -> tovar (dict)
+- prefiks moslik: saralangan nomlar ro'yxatida bisect bilan qidirish
+  (birinchi PREFIX_LENGTH belgisi bir xil tovarlar). Bir nechta tovar
+  chiqsa - tanlanmaydi, "noaniq" deb qaytariladi.
+- o'xshashlik (trigram): qolgan nomlar uchun eng o'xshash tovarlar va
+  ishonch bali (0..1). Bal AUTO_ACCEPT_SCORE dan yuqori va keyingi
+  nomzoddan aniq ajralib tursa - tovar avtomatik tanlanadi, aks holda
+  nomzodlar tekshirish uchun qaytariladi.
+
+Tasdiqlangan nomlar bitta so'rov bilan yuklanadi - takroriy yuklashlarda
+oldin tanlangan nomlar o'xshashlik hisoblashsiz topiladi. To'liq va prefiks
+qidiruv O(log n) - nomenklatura hajmiga chiziqli bog'liq
+emas. Trigram indeksi birinchi kerak bo'lganda bir marta quriladi.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from django.db.models import F
+
+from .models import Product, ProductAlias, Inventory
+from .inventory import bump_inventory_version
+
+
+# Prefiks bo'yicha solishtiriladigan belgilar soni (qisqa nomlar faqat to'liq moslik bilan)
+PREFIX_LENGTH = 15
+
+# Shu baldan yuqori va ikkinchi nomzoddan AUTO_ACCEPT_MARGIN ga farq qilsa - avtomatik
+AUTO_ACCEPT_SCORE = 0.8
+AUTO_ACCEPT_MARGIN = 0.05
+
+# Bundan past nomzodlar ko'rsatilmaydi
+MIN_SCORE = 0.4
+
+# Ko'rsatiladigan nomzodlar soni
+SUGGEST_LIMIT = 5
+
+# Ball aniq hisoblanadigan nomzodlar (umumiy trigramlar soni bo'yicha eng yaxshilari)
+SCORE_CANDIDATES = 20
+
+# Nomzodlar nomning eng kam uchraydigan trigramlari bo'yicha qidiriladi ("таб", " мг"
+# kabi umumiy trigramlarning ro'yxatlari juda uzun): kamida MIN_RARE_TRIGRAMS ta,
+# qolganlari - ro'yxatlar jami uzunligi POSTINGS_BUDGET dan oshmaguncha
+MIN_RARE_TRIGRAMS = 4
+POSTINGS_BUDGET = 5000
+
+# Natija: product_id (yoki None), usul ('alias', 'exact', 'prefix', 'fuzzy', 'ambiguous', 'missing'), nomzodlar
+Match = namedtuple('Match', ['product_id', 'method', 'candidates'])
+
+# O'xshashlik nomzodi: score - 0..1 (Dice koeffitsienti)
+Candidate = namedtuple('Candidate', ['product_id', 'name', 'score'])
+
+WHITESPACE = re.compile(r'\s+')
+
+# O'xshashlik uchun: harf va raqamdan boshqa belgilar, raqam-harf chegarasi ("500мг")
+NON_WORD = re.compile(r'[\W_]+')
+DIGIT_BOUNDARY = re.compile(r'(?<=\d)(?=[^\W\d_])|(?<=[^\W\d_])(?=\d)')
+
+# Kirill harflariga o'xshash lotin harflari (1C da aralash yozilgan nomlar)
+HOMOGLYPHS = str.maketrans('abcehkmoptxyё', 'авсенкмортхуе')
+
+
+def normalize_name(name):
+    """Kichik harf, ortiqcha bo'shliqlarsiz"""
+    return WHITESPACE.sub(' ', name.lower()).strip()
+
+
+def fuzzy_key(name):
+    """
+    O'xshashlik uchun kalit: kichik harf, lotin "homoglif"lar kirillga,
+    tinish belgilari bo'shliqqa, "500мг" -> "500 мг"
+    """
+    key = name.lower().translate(HOMOGLYPHS)
+    key = DIGIT_BOUNDARY.sub(' ', NON_WORD.sub(' ', key))
+    return WHITESPACE.sub(' ', key).strip()
+
+
+def trigrams(key):
+    """Kalitning trigramlari (so'z boshi va oxiri bo'shliq bilan belgilanadi)"""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(left, right):
+    """Ikki trigram to'plamining o'xshashligi (Dice): 0..1"""
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+
+class ProductNameMatcher:
+    """Nomenklatura bo'yicha nom indeksi (bitta yuklash davomida ishlatiladi)"""
+
+    def __init__(self, products, aliases=()):
+        """
+        products - (id, name) lar (tartib: bir xil nomli tovarlardan oxirgisi olinadi)
+        aliases - (normallashtirilgan 1C nomi, product_id) lar
+        """
+        self.aliases = dict(aliases)
+        self.by_name = {}
+        self.products = []
+        for product_id, name in products:
+            self.by_name[normalize_name(name)] = product_id
+            self.products.append((product_id, name))
+
+        self.names = sorted(self.by_name)
+        self._trigram_index = None
+        self._keys = None
+
+    @classmethod
+    def from_db(cls):
+        return cls(
+            Product.objects.values_list('id', 'name'),
+            ProductAlias.objects.values_list('name', 'product_id'),
+        )
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def match(self, name):
+        normalized = normalize_name(name)
+
+        # Admin tasdiqlagan moslik - boshqa qidiruvlardan ustun
+        product_id = self.aliases.get(normalized)
+        if product_id:
+            return Match(product_id, 'alias', [])
+
+        product_id = self.by_name.get(normalized)
+        if product_id:
+            return Match(product_id, 'exact', [])
+
+        if len(normalized) >= PREFIX_LENGTH:
+            prefixed = self.prefix_candidates(normalized[:PREFIX_LENGTH])
+            if len(prefixed) == 1:
+                return Match(self.by_name[prefixed[0]], 'prefix', [])
+        else:
+            prefixed = []
+
+        # Trigram o'xshashligi - aniq ajralib turgan eng yaxshi nomzod avtomatik olinadi
+        candidates = self.suggest(name)
+        if candidates and candidates[0].score >= AUTO_ACCEPT_SCORE:
+            runner_up = candidates[1].score if len(candidates) > 1 else 0
+            if candidates[0].score - runner_up >= AUTO_ACCEPT_MARGIN:
+                return Match(candidates[0].product_id, 'fuzzy', candidates)
+
+        return Match(None, 'ambiguous' if prefixed else 'missing', candidates)
+
+    def prefix_candidates(self, prefix, limit=10):
+        """prefix bilan boshlanadigan nomlar (ko'pi bilan limit ta)"""
+        start = bisect_left(self.names, prefix)
+        candidates = []
+        for name in self.names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            candidates.append(name)
+        return candidates
+
+    def suggest(self, name, limit=SUGGEST_LIMIT):
+        """Eng o'xshash tovarlar (score kamayish tartibida, MIN_SCORE dan past emas)"""
+        query = trigrams(fuzzy_key(name))
+        if not query:
+            return []
+
+        index = self.trigram_index()
+
+        # Nomzodlar: eng kam uchraydigan trigramlar bo'yicha
+        postings = sorted((index[gram] for gram in query if gram in index), key=len)
+
+        hits = Counter()
+        budget = POSTINGS_BUDGET
+        for number, posting in enumerate(postings):
+            if number >= MIN_RARE_TRIGRAMS and len(posting) > budget:
+                break
+            hits.update(posting)
+            budget -= len(posting)
+
+        # Aniq ball - eng ko'p umumiy trigramli nomzodlar uchun
+        candidates = []
+        for position, _ in hits.most_common(SCORE_CANDIDATES):
+            product_id, product_name = self.products[position]
+            score = similarity(query, trigrams(self._keys[position]))
+            if score >= MIN_SCORE:
+                candidates.append(Candidate(product_id, product_name, round(score, 3)))
+
+        candidates.sort(key=lambda candidate: -candidate.score)
+        return candidates[:limit]
+
+    def trigram_index(self):
+        """trigram -> tovarlar (self.products dagi o'rni) ro'yxati"""
+        if self._trigram_index is None:
+            self._keys = [fuzzy_key(name) for _, name in self.products]
+            index = {}
+            for position, key in enumerate(self._keys):
+                for gram in trigrams(key):
+                    index.setdefault(gram, []).append(position)
+            self._trigram_index = index
+        return self._trigram_index
+
+
+def accept_review(review, product_id, user=None):
+    """
+    Tekshirilgan nomni tanlangan tovar qoldig'i sifatida yozish
+    (shu partiya allaqachon bo'lsa - miqdor qo'shiladi). Moslik ProductAlias
+    ga yoziladi - keyingi yuklashlarda shu nom avtomatik topiladi.
+    """
+    ProductAlias.objects.update_or_create(
+        name=normalize_name(review.source_name),
+        defaults={'product_id': product_id, 'created_by': user}
+    )
+
+    inventory, created = Inventory.objects.get_or_create(
+        warehouse_id=review.warehouse_id,
+        product_id=product_id,
+        series='',
+        expiry_date=review.expiry_date,
+        defaults={'quantity': review.quantity}
+    )
+    if not created:
+        Inventory.objects.filter(pk=inventory.pk).update(quantity=F('quantity') + review.quantity)
+    bump_inventory_version(review.warehouse_id)
+
+    review.product_id = product_id
+    review.status = 'accepted'
+    review.save(update_fields=['product', 'status'])
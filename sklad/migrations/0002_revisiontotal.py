@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_totals(apps, schema_editor):
+    """Mavjud reviziyalar uchun jamilarni RevisionItem dan to'ldirish"""
+    RevisionItem = apps.get_model('sklad', 'RevisionItem')
+    RevisionTotal = apps.get_model('sklad', 'RevisionTotal')
+
+    rows = (
+        RevisionItem.objects
+        .values_list('revision_id', 'product_id')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    RevisionTotal.objects.bulk_create(
+        [
+            RevisionTotal(revision_id=revision_id, product_id=product_id, quantity=total)
+            for revision_id, product_id, total in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevisionTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Jami sanalgan')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revision_totals', to='sklad.product', verbose_name='Tovar')),
+                ('revision', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='sklad.revision', verbose_name='Reviziya')),
+            ],
+            options={
+                'verbose_name': 'Reviziya jami',
+                'verbose_name_plural': 'Reviziya jamilari',
+                'unique_together': {('revision', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
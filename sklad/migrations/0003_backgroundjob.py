@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0002_revisiontotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('reconcile', 'Natijalarni hisoblash')], max_length=30, verbose_name='Turi')),
+                ('status', models.CharField(choices=[('queued', 'Navbatda'), ('running', 'Bajarilmoqda'), ('done', 'Tugadi'), ('failed', 'Xatolik')], default='queued', max_length=20, verbose_name='Status')),
+                ('stage', models.CharField(blank=True, max_length=30, verbose_name='Bosqich')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Bajarildi')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Jami')),
+                ('error', models.TextField(blank=True, verbose_name='Xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Kim yaratdi')),
+                ('revision', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='sklad.revision', verbose_name='Reviziya')),
+            ],
+            options={
+                'verbose_name': 'Fon vazifasi',
+                'verbose_name_plural': 'Fon vazifalari',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='sklad_backg_status_4b09f8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0003_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('reconcile', 'Natijalarni hisoblash'), ('reconcile_dirty', "O'zgargan tovarlarni qayta hisoblash")], max_length=30, verbose_name='Turi'),
+        ),
+        migrations.CreateModel(
+            name='DirtyProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_marks', to='sklad.product', verbose_name='Tovar')),
+                ('revision', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_products', to='sklad.revision', verbose_name='Reviziya')),
+            ],
+            options={
+                'verbose_name': "O'zgargan tovar",
+                'verbose_name_plural': "O'zgargan tovarlar",
+                'unique_together': {('revision', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.9 on 2026-10-17 01:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0004_dirtyproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='sklad.warehouse', verbose_name='Ombor'),
+        ),
+        migrations.AddField(
+            model_name='warehouse',
+            name='combined_refreshed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Umumiy natijalar yangilangan vaqt'),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('reconcile', 'Natijalarni hisoblash'), ('reconcile_dirty', "O'zgargan tovarlarni qayta hisoblash"), ('refresh_combined', 'Umumiy natijalarni yangilash')], max_length=30, verbose_name='Turi'),
+        ),
+        migrations.CreateModel(
+            name='CombinedResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expected_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name="1C bo'yicha")),
+                ('actual_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Sanaldi')),
+                ('difference', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Farq')),
+                ('status', models.CharField(choices=[('shortage', 'Kam'), ('excess', "Ko'p"), ('not_counted', 'Sanalmagan'), ('correct', "To'g'ri"), ('unaccounted', "Hisobda yo'q")], max_length=20, verbose_name='Status')),
+                ('revizors', models.TextField(blank=True, verbose_name='Revizorlar')),
+                ('batches', models.JSONField(blank=True, default=list, verbose_name='Partiyalar')),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_results', to='sklad.product', verbose_name='Tovar')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_results', to='sklad.warehouse', verbose_name='Ombor')),
+            ],
+            options={
+                'verbose_name': 'Umumiy natija',
+                'verbose_name_plural': 'Umumiy natijalar',
+                'indexes': [models.Index(fields=['warehouse', 'status'], name='sklad_combi_warehou_50e036_idx')],
+                'unique_together': {('warehouse', 'product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CombinedRevizorCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Sanaldi')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_revizor_counts', to='sklad.product', verbose_name='Tovar')),
+                ('revizor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_counts', to=settings.AUTH_USER_MODEL, verbose_name='Revizor')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_revizor_counts', to='sklad.warehouse', verbose_name='Ombor')),
+            ],
+            options={
+                'verbose_name': "Revizor bo'yicha jami",
+                'verbose_name_plural': "Revizorlar bo'yicha jamilar",
+                'unique_together': {('warehouse', 'product', 'revizor')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0005_combinedresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductMatchReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(max_length=500, verbose_name='1C dagi nomi')),
+                ('manufacturer', models.CharField(blank=True, max_length=255, verbose_name='Ishlab chiqaruvchi')),
+                ('expiry_date', models.DateField(blank=True, null=True, verbose_name='Yaroqlilik muddati')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Qoldiq')),
+                ('candidates', models.JSONField(blank=True, default=list, verbose_name='Nomzodlar')),
+                ('score', models.FloatField(default=0, verbose_name='Eng yuqori moslik')),
+                ('status', models.CharField(choices=[('pending', 'Tekshirilmagan'), ('accepted', 'Tasdiqlangan'), ('rejected', 'Rad etilgan')], default='pending', max_length=20, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='match_reviews', to='sklad.product', verbose_name='Tanlangan tovar')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_reviews', to='sklad.warehouse', verbose_name='Ombor')),
+            ],
+            options={
+                'verbose_name': 'Nomni tekshirish',
+                'verbose_name_plural': 'Nomlarni tekshirish',
+                'ordering': ['-score', 'source_name'],
+                'indexes': [models.Index(fields=['warehouse', 'status'], name='sklad_produ_warehou_4baace_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0006_productmatchreview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, unique=True, verbose_name='1C dagi nomi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='product_aliases', to=settings.AUTH_USER_MODEL, verbose_name='Kim tasdiqladi')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='sklad.product', verbose_name='Tovar')),
+            ],
+            options={
+                'verbose_name': 'Tovar nomi (1C)',
+                'verbose_name_plural': 'Tovar nomlari (1C)',
+            },
+        ),
+    ]
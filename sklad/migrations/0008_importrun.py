@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0007_productalias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('products', 'Nomenklatura'), ('inventory', '1C qoldiq')], max_length=20, verbose_name='Turi')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Fayl nomi')),
+                ('file_size', models.PositiveBigIntegerField(default=0, verbose_name='Hajmi (bayt)')),
+                ('file_hash', models.CharField(max_length=64, verbose_name='Xesh')),
+                ('report', models.JSONField(blank=True, default=dict, verbose_name='Natija')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='imports', to=settings.AUTH_USER_MODEL, verbose_name='Kim yukladi')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='sklad.warehouse', verbose_name='Ombor')),
+            ],
+            options={
+                'verbose_name': 'Fayl yuklash',
+                'verbose_name_plural': 'Fayl yuklashlar',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['kind', 'warehouse', 'created_at'], name='sklad_impor_kind_edac6a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0008_importrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importrun',
+            name='delimiter',
+            field=models.CharField(blank=True, max_length=5, verbose_name='Ajratuvchi'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='duration',
+            field=models.FloatField(default=0, verbose_name='Jami vaqt (s)'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='encoding',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Encoding'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='Xatolik'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='inserted',
+            field=models.PositiveIntegerField(default=0, verbose_name='Yangi'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='matched',
+            field=models.PositiveIntegerField(default=0, verbose_name='Topilgan'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='rows_read',
+            field=models.PositiveIntegerField(default=0, verbose_name="O'qilgan qatorlar"),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='rows_skipped',
+            field=models.PositiveIntegerField(default=0, verbose_name='Tashlab yuborilgan'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='status',
+            field=models.CharField(choices=[('done', 'Tugadi'), ('failed', 'Xatolik')], default='done', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Bosqichlar vaqti'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='unmatched',
+            field=models.PositiveIntegerField(default=0, verbose_name='Topilmagan'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='updated',
+            field=models.PositiveIntegerField(default=0, verbose_name='Yangilangan'),
+        ),
+    ]
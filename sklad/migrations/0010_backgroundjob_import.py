@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0009_importrun_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='file',
+            field=models.FileField(blank=True, upload_to='imports/%Y/%m/', verbose_name='Fayl'),
+        ),
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='options',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Sozlamalar'),
+        ),
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='result',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Natija'),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('reconcile', 'Natijalarni hisoblash'), ('reconcile_dirty', "O'zgargan tovarlarni qayta hisoblash"), ('refresh_combined', 'Umumiy natijalarni yangilash'), ('import_products', 'Nomenklatura yuklash'), ('import_inventory', '1C qoldiq yuklash')], max_length=30, verbose_name='Turi'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Nomenklatura uchun FTS5 jadvali (faqat SQLite)
+
+from django.db import migrations
+
+
+# Migratsiya yozilgan paytdagi nusxa (sklad.fts / sklad.translit keyin
+# o'zgarsa ham bu migratsiya bir xil ishlaydi)
+FTS_TABLE = 'sklad_product_fts'
+
+CYRILLIC_TO_LATIN = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '',
+    'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ў': 'o', 'қ': 'k', 'ғ': 'g', 'ҳ': 'h',
+    "'": '', '‘': '', '’': '', 'ʻ': '', 'ʼ': '',
+})
+
+LATIN_FOLDS = [
+    ('shch', 'sh'), ('kh', 'h'), ('ph', 'f'), ('ch', '\x01'), ('c', 'ts'),
+    ('\x01', 'ch'), ('x', 'ks'), ('w', 'v'), ('q', 'k'), ('j', 'dzh'),
+]
+
+
+def fold(text):
+    text = text.lower().translate(CYRILLIC_TO_LATIN)
+    for source, target in LATIN_FOLDS:
+        text = text.replace(source, target)
+    return text
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"code, name, manufacturer, folded, "
+        f"tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON sklad_product BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END"
+    )
+
+    Product = apps.get_model('sklad', 'Product')
+    rows = [
+        (pk, code, name, manufacturer, fold(name))
+        for pk, code, name, manufacturer in Product.objects.values_list('id', 'code', 'name', 'manufacturer').iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, code, name, manufacturer, folded) VALUES (%s, %s, %s, %s, %s)',
+            rows
+        )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0011_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
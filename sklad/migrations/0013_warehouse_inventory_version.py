@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0012_product_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='warehouse',
+            name='inventory_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Qoldiq versiyasi'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sklad', '0013_warehouse_inventory_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dirtyproduct',
+            name='claimed',
+            field=models.BooleanField(default=False, verbose_name='Hisoblanmoqda'),
+        ),
+    ]
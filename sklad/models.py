@@ -53,6 +53,13 @@ class Warehouse(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    combined_refreshed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Umumiy natijalar yangilangan vaqt'
+    )
+    # Qoldiq yozilganda oshiriladi (ombor bo'yicha qidiruv keshi)
+    inventory_version = models.PositiveIntegerField(default=0, verbose_name='Qoldiq versiyasi')
 
     class Meta:
         verbose_name = 'Ombor'
@@ -80,6 +87,23 @@ class Product(models.Model):
         return f"{self.code} - {self.name}"
 
 
+class CatalogVersion(models.Model):
+    """
+    Nomenklatura versiyasi (bitta yozuv) - tovarlar yozilganda oshiriladi.
+    Jarayon xotirasidagi qidiruv indeksi shu bo'yicha eskirganini biladi.
+    """
+
+    value = models.PositiveBigIntegerField(default=0, verbose_name='Versiya')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Nomenklatura versiyasi'
+        verbose_name_plural = 'Nomenklatura versiyasi'
+
+    def __str__(self):
+        return f"v{self.value}"
+
+
 class Inventory(models.Model):
     """1C dan yuklangan tovar qoldig'i"""
 
@@ -249,6 +273,67 @@ class RevisionItem(models.Model):
         return f"{self.product.name} | {self.series} | {self.quantity}"
 
 
+class RevisionTotal(models.Model):
+    """Reviziya davomida tovar bo'yicha jami sanalgan miqdor (running total)"""
+
+    revision = models.ForeignKey(
+        Revision,
+        on_delete=models.CASCADE,
+        related_name='totals',
+        verbose_name='Reviziya'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='revision_totals',
+        verbose_name='Tovar'
+    )
+    quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Jami sanalgan'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Reviziya jami'
+        verbose_name_plural = 'Reviziya jamilari'
+        unique_together = ['revision', 'product']
+
+    def __str__(self):
+        return f"{self.product.name} | Jami: {self.quantity}"
+
+
+class DirtyProduct(models.Model):
+    """Tugallangan reviziyada natijasi qayta hisoblanishi kerak bo'lgan tovar"""
+
+    revision = models.ForeignKey(
+        Revision,
+        on_delete=models.CASCADE,
+        related_name='dirty_products',
+        verbose_name='Reviziya'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='dirty_marks',
+        verbose_name='Tovar'
+    )
+    # Hisoblash boshlanganda True; hisoblash davomida qayta belgilansa - False
+    # (belgi o'chirilmaydi, keyingi hisoblashga qoladi)
+    claimed = models.BooleanField(default=False, verbose_name='Hisoblanmoqda')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'O\'zgargan tovar'
+        verbose_name_plural = 'O\'zgargan tovarlar'
+        unique_together = ['revision', 'product']
+
+    def __str__(self):
+        return f"{self.product.name} | {self.revision}"
+
+
 class RevisionResult(models.Model):
     """Reviziya natijasi - avtomatik hisoblanadi"""
 
@@ -360,4 +445,297 @@ class UnaccountedItem(models.Model):
         verbose_name_plural = 'Hisobda yo\'q tovarlar'
 
     def __str__(self):
-        return f"NEUCHTEN: {self.product.name} | {self.quantity}"
\ No newline at end of file
+        return f"NEUCHTEN: {self.product.name} | {self.quantity}"
+
+
+class CombinedResult(models.Model):
+    """Ombor bo'yicha umumiy natija (barcha tugallangan reviziyalar) - tayyor jadval"""
+
+    STATUS_CHOICES = [
+        ('shortage', 'Kam'),
+        ('excess', 'Ko\'p'),
+        ('not_counted', 'Sanalmagan'),
+        ('correct', 'To\'g\'ri'),
+        ('unaccounted', 'Hisobda yo\'q'),
+    ]
+
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        related_name='combined_results',
+        verbose_name='Ombor'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='combined_results',
+        verbose_name='Tovar'
+    )
+    expected_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='1C bo\'yicha')
+    actual_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Sanaldi')
+    difference = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Farq')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, verbose_name='Status')
+    revizors = models.TextField(blank=True, verbose_name='Revizorlar')
+    # 1C partiyalari: [{"series": ..., "expiry_date": "YYYY-MM-DD", "quantity": "..."}]
+    batches = models.JSONField(default=list, blank=True, verbose_name='Partiyalar')
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Umumiy natija'
+        verbose_name_plural = 'Umumiy natijalar'
+        unique_together = ['warehouse', 'product']
+        indexes = [models.Index(fields=['warehouse', 'status'])]
+
+    def __str__(self):
+        return f"{self.product.name} | {self.get_status_display()}"
+
+
+class CombinedRevizorCount(models.Model):
+    """Umumiy natija uchun revizor bo'yicha sanalgan miqdor (revizor filtri uchun)"""
+
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        related_name='combined_revizor_counts',
+        verbose_name='Ombor'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='combined_revizor_counts',
+        verbose_name='Tovar'
+    )
+    revizor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='combined_counts',
+        verbose_name='Revizor'
+    )
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Sanaldi')
+
+    class Meta:
+        verbose_name = 'Revizor bo\'yicha jami'
+        verbose_name_plural = 'Revizorlar bo\'yicha jamilar'
+        unique_together = ['warehouse', 'product', 'revizor']
+
+    def __str__(self):
+        return f"{self.product.name} | {self.revizor} | {self.quantity}"
+
+
+class BackgroundJob(models.Model):
+    """Fon vazifasi - `manage.py run_jobs` (worker) tomonidan bajariladi"""
+
+    KIND_CHOICES = [
+        ('reconcile', 'Natijalarni hisoblash'),
+        ('reconcile_dirty', 'O\'zgargan tovarlarni qayta hisoblash'),
+        ('refresh_combined', 'Umumiy natijalarni yangilash'),
+        ('import_products', 'Nomenklatura yuklash'),
+        ('import_inventory', '1C qoldiq yuklash'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'Navbatda'),
+        ('running', 'Bajarilmoqda'),
+        ('done', 'Tugadi'),
+        ('failed', 'Xatolik'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name='Turi')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name='Status')
+    revision = models.ForeignKey(
+        Revision,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Reviziya'
+    )
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Ombor'
+    )
+
+    # Fayl yuklash vazifalari: diskdagi fayl, sozlamalar va natija xabarlari
+    file = models.FileField(upload_to='imports/%Y/%m/', blank=True, verbose_name='Fayl')
+    options = models.JSONField(default=dict, blank=True, verbose_name='Sozlamalar')
+    result = models.JSONField(default=dict, blank=True, verbose_name='Natija')
+
+    # Jarayon
+    stage = models.CharField(max_length=30, blank=True, verbose_name='Bosqich')
+    processed = models.PositiveIntegerField(default=0, verbose_name='Bajarildi')
+    total = models.PositiveIntegerField(default=0, verbose_name='Jami')
+    error = models.TextField(blank=True, verbose_name='Xatolik')
+
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Kim yaratdi'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bajarayotgan worker muntazam yangilaydi - eskirsa worker to'xtagan
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Fon vazifasi'
+        verbose_name_plural = 'Fon vazifalari'
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} | {self.get_status_display()}"
+
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+
+class ProductAlias(models.Model):
+    """1C dagi tovar nomi -> nomenklatura tovari (admin tasdiqlagan moslik)"""
+
+    # matching.normalize_name() natijasi
+    name = models.CharField(max_length=500, unique=True, verbose_name='1C dagi nomi')
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='aliases',
+        verbose_name='Tovar'
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='product_aliases',
+        verbose_name='Kim tasdiqladi'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Tovar nomi (1C)'
+        verbose_name_plural = 'Tovar nomlari (1C)'
+
+    def __str__(self):
+        return f"{self.name} → {self.product.name}"
+
+
+class ProductMatchReview(models.Model):
+    """1C qoldiq faylidagi aniq topilmagan tovar nomi - qo'lda tekshirish uchun"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Tekshirilmagan'),
+        ('accepted', 'Tasdiqlangan'),
+        ('rejected', 'Rad etilgan'),
+    ]
+
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        related_name='match_reviews',
+        verbose_name='Ombor'
+    )
+    source_name = models.CharField(max_length=500, verbose_name='1C dagi nomi')
+    manufacturer = models.CharField(max_length=255, blank=True, verbose_name='Ishlab chiqaruvchi')
+    expiry_date = models.DateField(null=True, blank=True, verbose_name='Yaroqlilik muddati')
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name='Qoldiq')
+    # O'xshash tovarlar: [{"product_id": ..., "name": ..., "score": 0.73}] (score kamayish tartibida)
+    candidates = models.JSONField(default=list, blank=True, verbose_name='Nomzodlar')
+    score = models.FloatField(default=0, verbose_name='Eng yuqori moslik')
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='match_reviews',
+        verbose_name='Tanlangan tovar'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Status')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Nomni tekshirish'
+        verbose_name_plural = 'Nomlarni tekshirish'
+        ordering = ['-score', 'source_name']
+        indexes = [models.Index(fields=['warehouse', 'status'])]
+
+    def __str__(self):
+        return f"{self.source_name} | {self.get_status_display()}"
+
+
+class ImportRun(models.Model):
+    """Fayl yuklash (nomenklatura yoki 1C qoldiq) - bir xil faylni qayta ishlamaslik uchun"""
+
+    KIND_CHOICES = [
+        ('products', 'Nomenklatura'),
+        ('inventory', '1C qoldiq'),
+    ]
+
+    STATUS_CHOICES = [
+        ('done', 'Tugadi'),
+        ('failed', 'Xatolik'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Turi')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='done', verbose_name='Status')
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='imports',
+        verbose_name='Ombor'
+    )
+    file_name = models.CharField(max_length=255, verbose_name='Fayl nomi')
+    file_size = models.PositiveBigIntegerField(default=0, verbose_name='Hajmi (bayt)')
+    # Fayl mazmunining SHA-256 xeshi
+    file_hash = models.CharField(max_length=64, verbose_name='Xesh')
+    encoding = models.CharField(max_length=20, blank=True, verbose_name='Encoding')
+    delimiter = models.CharField(max_length=5, blank=True, verbose_name='Ajratuvchi')
+
+    # Qatorlar
+    rows_read = models.PositiveIntegerField(default=0, verbose_name='O\'qilgan qatorlar')
+    rows_skipped = models.PositiveIntegerField(default=0, verbose_name='Tashlab yuborilgan')
+    matched = models.PositiveIntegerField(default=0, verbose_name='Topilgan')
+    unmatched = models.PositiveIntegerField(default=0, verbose_name='Topilmagan')
+    inserted = models.PositiveIntegerField(default=0, verbose_name='Yangi')
+    updated = models.PositiveIntegerField(default=0, verbose_name='Yangilangan')
+
+    # Vaqt: jami va bosqichlar bo'yicha {"decode": 0.12, "parse": ..., "match": ..., "write": ...} (soniya)
+    duration = models.FloatField(default=0, verbose_name='Jami vaqt (s)')
+    timings = models.JSONField(default=dict, blank=True, verbose_name='Bosqichlar vaqti')
+
+    # Yuklash natijasi: yangi/o'zgargan/... soni, tashlab yuborish sabablari va sozlamalar
+    report = models.JSONField(default=dict, blank=True, verbose_name='Natija')
+    error = models.TextField(blank=True, verbose_name='Xatolik')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='imports',
+        verbose_name='Kim yukladi'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Fayl yuklash'
+        verbose_name_plural = 'Fayl yuklashlar'
+        ordering = ['-created_at', '-id']
+        indexes = [models.Index(fields=['kind', 'warehouse', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} | {self.file_name}"
@@ -0,0 +1,91 @@
+"""
+Nomenklatura yuklash (paketli upsert)
+
+Har bir qator uchun update_or_create o'rniga qatorlar paketlab ishlanadi:
+- paketdagi kodlar bo'yicha mavjud tovarlar bitta so'rov bilan olinadi
+- yangilari bulk_create, faqat o'zgarganlari bulk_update bilan yoziladi
+- har bir paket alohida tranzaksiyada (SQLite da bitta fsync); fayl yuklash
+  butun faylni tashqi tranzaksiyaga o'raydi - paketlar savepoint bo'ladi
+
+Bir kod faylda bir necha marta kelsa - oxirgisi yoziladi (eski xatti-harakat).
+
+Tovarlar o'zgarsa CatalogVersion oshiriladi (qidiruv indekslari qayta quriladi),
+yangi va o'zgargan tovarlar FTS jadvaliga ham yoziladi (sklad/fts.py).
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product, CatalogVersion
+from .fts import index_products
+
+
+# Bitta paketdagi qatorlar soni (SQLite: so'rovda 999 tagacha parametr)
+BATCH_SIZE = 900
+
+
+def upsert_products(rows, batch_size=BATCH_SIZE):
+    """
+    rows - (code, name, manufacturer) lar ketma-ketligi (tozalangan)
+
+    Qaytaradi: {'created': .., 'updated': .., 'unchanged': ..}
+    """
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0}
+
+    batch = {}
+    for code, name, manufacturer in rows:
+        # Paket ichida takrorlangan kod - oxirgisi
+        batch[code] = (name, manufacturer)
+        if len(batch) >= batch_size:
+            _write_batch(batch, stats)
+            batch = {}
+
+    if batch:
+        _write_batch(batch, stats)
+
+    if stats['created'] or stats['updated']:
+        bump_catalog_version()
+
+    return stats
+
+
+def catalog_version():
+    """Joriy nomenklatura versiyasi"""
+    return CatalogVersion.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def bump_catalog_version():
+    """Tovar qo'shilgan, o'zgargan yoki o'chirilganda chaqiriladi"""
+    updated = CatalogVersion.objects.filter(pk=1).update(value=F('value') + 1, updated_at=timezone.now())
+    if not updated:
+        CatalogVersion.objects.get_or_create(pk=1, defaults={'value': 1})
+
+
+def _write_batch(batch, stats):
+    with transaction.atomic():
+        existing = {
+            product.code: product
+            for product in Product.objects.filter(code__in=list(batch)).only('id', 'code', 'name', 'manufacturer')
+        }
+
+        to_create = []
+        to_update = []
+        for code, (name, manufacturer) in batch.items():
+            product = existing.get(code)
+            if product is None:
+                to_create.append(Product(code=code, name=name, manufacturer=manufacturer))
+            elif product.name != name or product.manufacturer != manufacturer:
+                product.name = name
+                product.manufacturer = manufacturer
+                to_update.append(product)
+            else:
+                stats['unchanged'] += 1
+
+        if to_create:
+            Product.objects.bulk_create(to_create)
+        if to_update:
+            Product.objects.bulk_update(to_update, ['name', 'manufacturer'])
+        index_products(to_create + to_update)
+
+    stats['created'] += len(to_create)
+    stats['updated'] += len(to_update)
@@ -0,0 +1,130 @@
+"""
+1C hisobotlarini o'qish (qoldiq fayli)
+
+Qatorlar C da yozilgan csv moduli bilan ajratiladi (qo'shtirnoq ichidagi
+ajratuvchi va "" bilan yozilgan qo'shtirnoq to'g'ri o'qiladi). Ustunlar
+tartibi LAYOUT da e'lon qilinadi - boshqa 1C shakli uchun o'z LAYOUT i
+bilan yangi parser yaratish kifoya.
+"""
+import csv
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+
+InventoryRow = namedtuple('InventoryRow', ['name', 'manufacturer', 'expiry_date', 'quantity'])
+
+DATE_FORMATS = ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y', '%d.%m.%y']
+
+
+# Faylda bir xil sanalar ko'p takrorlanadi - strptime natijasi keshlanadi
+@lru_cache(maxsize=8192)
+def parse_date(value):
+    """Sana: 01.02.2030, 2030-02-01, 01/02/2030, 01.02.30 (bo'lmasa - None)"""
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_quantity(value):
+    """Miqdor: '1 234,5' -> Decimal('1234.5') (noto'g'ri bo'lsa - 0)"""
+    cleaned = value.replace(' ', '').replace(',', '.').replace('\xa0', '')
+    if not cleaned:
+        return Decimal('0')
+    try:
+        quantity = Decimal(cleaned)
+    except InvalidOperation:
+        return Decimal('0')
+    return quantity if quantity.is_finite() else Decimal('0')
+
+
+class OneCInventoryParser:
+    """
+    1C "Остатки по товарам" hisobotidan qoldiq qatorlari
+
+    Format: Куп;Наименование;Производитель;Срок годность;Остаток;Кам
+    """
+
+    LAYOUT = {
+        'number': 0,        # Куп
+        'name': 1,          # Наименование
+        'manufacturer': 2,  # Производитель
+        'expiry': 3,        # Срок годность
+        'quantity': 4,      # Остаток
+    }
+
+    # "Итого" qatoriga yetganda to'xtatish
+    STOP_MARKERS = ['Итого', 'Мат.отв', 'итого']
+
+    # Sarlavha qatorlari
+    HEADER_MARKERS = ['Наименование', 'наименование', 'Остатки по товар', 'Остаток на', ';;К.;', ',,К.,']
+
+    # Tovar nomi emas
+    SKIP_NAMES = {'К.', 'K.'}
+
+    def __init__(self, delimiter=';'):
+        self.delimiter = delimiter
+        self.min_columns = max(self.LAYOUT.values()) + 1
+        self._stop = re.compile('|'.join(map(re.escape, self.STOP_MARKERS)))
+        self._header = re.compile('|'.join(map(re.escape, self.HEADER_MARKERS)))
+
+        # Tashlab yuborilgan qatorlar, sabab bo'yicha (empty, header, footer, columns, name)
+        self.skipped = Counter()
+
+    def data_lines(self, lines):
+        """Bo'sh, sarlavha va "Итого" dan keyingi qatorlarni tashlab yuborish"""
+        stop = self._stop.search
+        header = self._header.search
+        skipped = self.skipped
+
+        for line in lines:
+            line = line.strip()
+
+            if not line:
+                skipped['empty'] += 1
+                continue
+
+            if stop(line):
+                # Keyingi qatorlar o'qilmaydi
+                skipped['footer'] += 1
+                break
+
+            if header(line):
+                skipped['header'] += 1
+                continue
+
+            yield line
+
+    def parse(self, lines):
+        """Qoldiq qatorlari (nomi bo'sh yoki noto'g'ri bo'lganlari tashlanadi)"""
+        name_col = self.LAYOUT['name']
+        manufacturer_col = self.LAYOUT['manufacturer']
+        expiry_col = self.LAYOUT['expiry']
+        quantity_col = self.LAYOUT['quantity']
+        min_columns = self.min_columns
+        skipped = self.skipped
+
+        # Faqat kerakli ustunlar tozalanadi
+        for parts in csv.reader(self.data_lines(lines), delimiter=self.delimiter):
+            if len(parts) < min_columns:
+                skipped['columns'] += 1
+                continue
+
+            name = parts[name_col].strip().strip('"')
+            if not name or name in self.SKIP_NAMES or len(name) < 2:
+                skipped['name'] += 1
+                continue
+
+            yield InventoryRow(
+                name=name,
+                manufacturer=parts[manufacturer_col].strip().strip('"'),
+                expiry_date=parse_date(parts[expiry_col].strip().strip('"')),
+                quantity=parse_quantity(parts[quantity_col].strip().strip('"')),
+            )
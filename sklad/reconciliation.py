@@ -0,0 +1,397 @@
+"""
+Reviziya natijalarini hisoblash (solishtirish)
+
+1C qoldig'i va revizorlar sanagan miqdorlar GROUP BY so'rovlari bilan
+tovar bo'yicha jamlanadi, natijalar esa paketlab (bulk) yoziladi.
+So'rovlar soni qatorlar soniga emas, paketlar soniga bog'liq.
+
+Sahifalar (views) ham, Django admin amali ham shu moduldan foydalanadi.
+
+Revizor kiritgan miqdorlar RevisionTotal jadvalida tovar bo'yicha jamlanib
+boriladi (delta bilan), shuning uchun reviziyani tugatishda faqat tayyor
+jamilar 1C bilan solishtiriladi.
+
+Tugallangan reviziyadan keyin 1C qoldig'i yoki revizor yozuvlari o'zgarsa,
+tegishli tovarlar DirtyProduct jadvalida belgilanadi va faqat shu tovarlar
+natijalari qayta hisoblanadi (dirty_only=True).
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+
+from .models import (
+    Product, Inventory, Revision, RevisionItem, RevisionTotal,
+    DirtyProduct, RevisionResult, UnaccountedItem
+)
+
+
+# Bitta INSERT paketidagi qatorlar soni
+BATCH_SIZE = 1000
+
+ZERO = Decimal('0')
+
+# RevisionResult.revizors uchun oraliq (through) jadval
+RevisionResultRevizor = RevisionResult.revizors.through
+
+
+def get_status(difference):
+    """Farq bo'yicha status"""
+    if difference == 0:
+        return 'correct'
+    if difference < 0:
+        return 'shortage'
+    return 'excess'
+
+
+def clear_results(revision, products=None):
+    """
+    Reviziyaning avvalgi natijalarini o'chirish (qator soniga bog'liq bo'lmagan so'rovlar bilan)
+
+    products - faqat shu tovarlar natijalarini o'chirish (product_id lar, subquery ham bo'lishi mumkin)
+    """
+    links = RevisionResultRevizor.objects.filter(revisionresult__revision=revision)
+    results = RevisionResult.objects.filter(revision=revision)
+    unaccounted = UnaccountedItem.objects.filter(revision=revision)
+
+    if products is not None:
+        links = links.filter(revisionresult__product_id__in=products)
+        results = results.filter(product_id__in=products)
+        unaccounted = unaccounted.filter(product_id__in=products)
+
+    # M2M through qatorlari avval bitta so'rov bilan o'chiriladi - results.delete()
+    # dagi Collector ular uchun faqat bo'sh DELETE bajaradi
+    links.delete()
+    results.delete()
+    unaccounted.delete()
+
+
+# ==================== RUNNING TOTALS ====================
+
+def apply_count_delta(revision_id, product_id, delta):
+    """
+    Tovar jamisiga delta qo'shish (RevisionItem qo'shilganda/o'zgarganda/o'chirilganda)
+
+    RevisionItem yozuvi bilan bitta tranzaksiya ichida chaqirilishi kerak.
+    """
+    if not delta:
+        return
+
+    totals = RevisionTotal.objects.filter(revision_id=revision_id, product_id=product_id)
+    if totals.update(quantity=F('quantity') + delta):
+        return
+
+    total, created = RevisionTotal.objects.get_or_create(
+        revision_id=revision_id,
+        product_id=product_id,
+        defaults={'quantity': delta}
+    )
+    if not created:
+        # Parallel so'rov bizdan oldin yaratib qo'ydi
+        totals.update(quantity=F('quantity') + delta)
+
+
+def rebuild_running_totals(revision):
+    """
+    Jamilarni RevisionItem dan qaytadan hisoblash (admin orqali o'zgartirilgan yozuvlar uchun)
+
+    Qaytaradi: jamisi o'zgargan tovarlar (product_id lar to'plami)
+    """
+    with transaction.atomic():
+        totals = RevisionTotal.objects.filter(revision=revision, quantity__gt=0)
+        before = dict(totals.values_list('product_id', 'quantity'))
+
+        RevisionTotal.objects.filter(revision=revision).delete()
+        after = dict(
+            RevisionItem.objects
+            .filter(revision=revision)
+            .values_list('product_id')
+            .annotate(total=Sum('quantity'))
+            .order_by()
+        )
+        RevisionTotal.objects.bulk_create(
+            [
+                RevisionTotal(revision=revision, product_id=product_id, quantity=total)
+                for product_id, total in after.items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    return {
+        product_id for product_id in before.keys() | after.keys()
+        if before.get(product_id) != after.get(product_id)
+    }
+
+
+def _counted_totals(revision, products=None):
+    """
+    Revizorlar sanagan miqdor - TOVAR BO'YICHA JAMI (RevisionTotal dan)
+
+    Qaytaradi: ({product_id: jami}, {product_id: {revizor_id, ...}})
+    """
+    totals = RevisionTotal.objects.filter(revision=revision)
+    items = RevisionItem.objects.filter(revision=revision)
+    if products is not None:
+        totals = totals.filter(product_id__in=products)
+        items = items.filter(product_id__in=products)
+
+    actual_by_product = dict(totals.values_list('product_id', 'quantity'))
+
+    revizors_by_product = defaultdict(set)
+    rows = items.values_list('product_id', 'revizor_id').distinct().order_by()
+    for product_id, revizor_id in rows:
+        revizors_by_product[product_id].add(revizor_id)
+
+    return actual_by_product, revizors_by_product
+
+
+def live_results(revision):
+    """
+    Reviziya davomidagi joriy natijalar (tovar bo'yicha, natijalar jadvaliga yozmasdan)
+
+    Qaytaradi: (results, unaccounted) - dict ro'yxatlari
+    """
+    expected_by_product = dict(
+        Inventory.objects
+        .filter(warehouse_id=revision.warehouse_id)
+        .values_list('product_id')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    actual_by_product = dict(
+        RevisionTotal.objects
+        .filter(revision=revision, quantity__gt=0)
+        .values_list('product_id', 'quantity')
+    )
+    products = Product.objects.in_bulk(set(expected_by_product) | set(actual_by_product))
+
+    results = []
+    for product_id, expected in expected_by_product.items():
+        actual = actual_by_product.get(product_id, ZERO)
+        difference = actual - expected
+        results.append({
+            'product': products[product_id],
+            'expected_quantity': expected,
+            'actual_quantity': actual,
+            'difference': difference,
+            'status': get_status(difference),
+        })
+
+    unaccounted = [
+        {'product': products[product_id], 'quantity': actual}
+        for product_id, actual in actual_by_product.items()
+        if product_id not in expected_by_product
+    ]
+    return results, unaccounted
+
+
+# ==================== DIRTY TRACKING ====================
+
+def mark_dirty(revision_ids, product_ids):
+    """Tovarlarni reviziyalarda "qayta hisoblash kerak" deb belgilash"""
+    # Belgi bor bo'lsa claimed qaytadan False - hisoblanayotgan reviziya uni o'chirmaydi
+    DirtyProduct.objects.bulk_create(
+        [
+            DirtyProduct(revision_id=revision_id, product_id=product_id)
+            for revision_id in revision_ids
+            for product_id in product_ids
+        ],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['revision', 'product'],
+        update_fields=['claimed'],
+    )
+
+
+def mark_warehouse_changes(warehouse_id, product_ids):
+    """
+    Qoldig'i o'zgargan tovarlarni ombordagi tugallangan reviziyalarda belgilash
+
+    Qaytaradi: o'zgargan tovarlar soni
+    """
+    if product_ids:
+        revision_ids = list(
+            Revision.objects
+            .filter(warehouse_id=warehouse_id, status='completed')
+            .values_list('id', flat=True)
+        )
+        mark_dirty(revision_ids, product_ids)
+    return len(product_ids)
+
+
+def sync_revision_totals(revision, product_ids=()):
+    """
+    Revizor yozuvlari admin paneldan o'zgartirilgandan keyin: jamilarni qayta yig'ish,
+    tugallangan reviziyada esa jamisi o'zgargan (va product_ids dagi) tovarlarni belgilash
+    """
+    changed = rebuild_running_totals(revision) | set(product_ids)
+    if revision.status == 'completed' and changed:
+        mark_dirty([revision.pk], changed)
+    return changed
+
+
+# ==================== NATIJALAR ====================
+
+def load_inventory(warehouse_id, products=None):
+    """
+    Ombor 1C qoldig'ini bir marta yuklash
+
+    Qaytaradi: ({product_id: 1C jami}, [(product_id, series, expiry_date, quantity), ...])
+    Partiyalar tovar bo'yicha tartiblangan - bir ombordagi bir nechta reviziya
+    uchun qayta ishlatiladi.
+    """
+    inventory = Inventory.objects.filter(warehouse_id=warehouse_id)
+    if products is not None:
+        inventory = inventory.filter(product_id__in=products)
+
+    # 1C bo'yicha jami (GROUP BY)
+    expected_by_product = dict(
+        inventory
+        .values_list('product_id')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    batches = list(
+        inventory
+        .values_list('product_id', 'series', 'expiry_date', 'quantity')
+        .order_by('product_id', 'id')
+    )
+    return expected_by_product, batches
+
+
+def calculate_revision_results(revision, inventory=None, batch_size=BATCH_SIZE, progress=None, dirty_only=False):
+    """
+    Reviziya natijalarini hisoblash - TZ bo'yicha
+
+    MUHIM: Revizor partiyalarni ajratmaydi!
+    - 1C da bir tovar bir nechta partiyada bo'lishi mumkin
+    - Revizor umumiy sonni kiritadi
+    - Tizim TOVAR BO'YICHA JAMI solishtiriladi
+    - Farq birinchi partiyaga yoziladi
+
+    inventory - load_inventory() natijasi (berilmasa yuklanadi)
+    progress - progress(stage, processed, total) chaqiriladigan funksiya
+    dirty_only - faqat DirtyProduct da belgilangan tovarlarni qayta hisoblash,
+                 qolgan natijalarga tegmaslik
+
+    Yangi natijalar avval xotirada tayyorlanadi, keyin bitta qisqa
+    tranzaksiyada eskisining o'rniga yoziladi - shu paytgacha eski natijalar
+    o'qilishda davom etadi.
+    """
+    report = progress or (lambda stage, processed=0, total=0: None)
+
+    report('loading')
+
+    # Shu paytgacha qo'yilgan belgilar qoldiq o'qilishidan OLDIN olinadi (claimed).
+    # Hisoblash davomida qo'yilgan yangi belgilar va qayta belgilanganlari
+    # (claimed=False) oxirida o'chirilmaydi - keyingi safarga qoladi
+    marks = DirtyProduct.objects.filter(revision=revision)
+    last_mark = marks.aggregate(last=Max('id'))['last']
+    marks = marks.filter(id__lte=last_mark or 0)
+    marks.update(claimed=True)
+
+    products = None
+    if dirty_only:
+        if last_mark is None:
+            return
+        products = marks.values('product_id')
+        inventory = load_inventory(revision.warehouse_id, products)
+    elif inventory is None:
+        inventory = load_inventory(revision.warehouse_id)
+    expected_by_product, batches = inventory
+
+    # Revizorlar bo'yicha jami (tayyor running totals)
+    actual_by_product, revizors_by_product = _counted_totals(revision, products)
+
+    # Har bir 1C partiyasi uchun natija
+    total = len(batches)
+    results = []
+    next_report = batch_size
+    report('calculating', 0, total)
+
+    for product_id, rows in groupby(batches, key=itemgetter(0)):
+        difference = actual_by_product.get(product_id, ZERO) - expected_by_product[product_id]
+        status = get_status(difference)
+
+        for i, (_, series, expiry_date, quantity) in enumerate(rows):
+            # Farq BIRINCHI partiyaga yoziladi, qolganlari "to'g'ri"
+            first = i == 0
+            results.append(RevisionResult(
+                revision=revision,
+                product_id=product_id,
+                series=series,
+                expiry_date=expiry_date,
+                expected_quantity=quantity,
+                actual_quantity=quantity + difference if first else quantity,
+                difference=difference if first else ZERO,
+                status=status if first else 'correct',
+            ))
+
+        if len(results) >= next_report:
+            report('calculating', len(results), total)
+            next_report += batch_size
+
+    # Hisobda yo'q tovarlar (1C da yo'q, lekin revizor kiritgan)
+    items = RevisionItem.objects.filter(revision=revision)
+    if products is not None:
+        items = items.filter(product_id__in=products)
+    items = items.values_list('product_id', 'series', 'expiry_date', 'quantity', 'revizor_id').order_by('id')
+    unaccounted = [
+        UnaccountedItem(
+            revision=revision,
+            product_id=product_id,
+            series=series,
+            expiry_date=expiry_date,
+            quantity=quantity,
+            revizor_id=revizor_id,
+        )
+        for product_id, series, expiry_date, quantity, revizor_id in items.iterator(chunk_size=batch_size)
+        if product_id not in expected_by_product
+    ]
+
+    # Almashtirish - paketlab yozish
+    report('writing', total, total)
+    with transaction.atomic():
+        clear_results(revision, products)
+        for start in range(0, len(results), batch_size):
+            _write_results(results[start:start + batch_size], revizors_by_product, batch_size)
+        UnaccountedItem.objects.bulk_create(unaccounted, batch_size=batch_size)
+        marks.filter(claimed=True).delete()
+
+
+def calculate_many_revision_results(revisions, batch_size=BATCH_SIZE):
+    """
+    Bir nechta reviziya natijalarini bitta o'tishda hisoblash
+
+    1C qoldig'i har bir ombor uchun faqat bir marta yuklanadi. Jamilar
+    RevisionItem dan qayta yig'iladi - admin paneldan o'zgartirilgan yozuvlar
+    ham hisobga olinadi.
+    Qaytaradi: hisoblangan reviziyalar soni
+    """
+    count = 0
+    with transaction.atomic():
+        revisions = sorted(revisions, key=lambda r: r.warehouse_id)
+        for warehouse_id, group in groupby(revisions, key=lambda r: r.warehouse_id):
+            inventory = load_inventory(warehouse_id)
+            for revision in group:
+                rebuild_running_totals(revision)
+                calculate_revision_results(revision, inventory=inventory, batch_size=batch_size)
+                count += 1
+    return count
+
+
+def _write_results(results, revizors_by_product, batch_size):
+    """Natijalar paketini va ularning revizorlarini (M2M) yozish"""
+    RevisionResult.objects.bulk_create(results, batch_size=batch_size)
+
+    RevisionResultRevizor.objects.bulk_create(
+        [
+            RevisionResultRevizor(revisionresult_id=result.pk, user_id=revizor_id)
+            for result in results
+            for revizor_id in revizors_by_product.get(result.product_id, ())
+        ],
+        batch_size=batch_size,
+    )
@@ -0,0 +1,393 @@
+"""
+Revizor tovar qidiruvi
+
+settings.PRODUCT_SEARCH bo'yicha: 'fts' - SQLite FTS5 jadvali (sklad/fts.py),
+'memory' - quyidagi jarayon xotirasidagi indeks, 'db' - LIKE. FTS jadvali
+bo'lmasa (SQLite emas) xotiradagi indeks ishlatiladi, u hali qurilmagan
+bo'lsa - LIKE.
+
+Har bir usul asl so'rovni oladi va lotin/kirill variantlarini o'zi
+hosil qiladi (translit.variants): FTS - match_expression() da, xotiradagi
+indeks - search_keys() da, LIKE - search_db() da.
+
+Nomenklatura indeksi (jarayon xotirasida)
+
+Har bir tugma bosilishida Product jadvalini LIKE bilan to'liq ko'rib chiqish
+o'rniga har bir jarayon (gunicorn worker) nomenklaturadan indeks quradi:
+- tovarlar nom bo'yicha saralangan, nom va kod fold() qilingan (lotin/kirill
+  farqisiz) - so'rov variantlari ham fold() dan keyin odatda 1-2 kalitga tushadi
+- 3 va undan uzun so'rov: trigram -> tovarlar ro'yxati (array). Eng kam
+  uchraydigan trigram ro'yxati ko'rib chiqiladi va `limit` ta moslik
+  topilganda to'xtaydi (natijalar nom tartibida)
+- 1-2 belgili so'rov: so'z boshi (prefiks) -> tovarlar ro'yxati
+
+Indeks CatalogVersion bilan solishtiriladi (tovarlar yozilganda oshiriladi).
+Versiya o'zgarsa indeks fon oqimida qayta quriladi, shu paytgacha eskisi
+ishlatiladi. Birinchi qurilish tugaguncha get_search_index() None qaytaradi -
+qidiruv bazadan.
+
+Ombor bo'yicha qidiruv (reviziya paytida)
+
+Revizor qidirayotgan tovar deyarli har doim shu omborning 1C qoldig'ida bor.
+Shuning uchun avval ombordagi tovarlar (bir necha ming) qidiriladi: kod
+to'liq mos, keyin so'z boshi, keyin nomning istalgan joyi. Butun
+nomenklatura - faqat omborda topilmasa. Ombor to'plami jarayon xotirasida
+(Warehouse.inventory_version va CatalogVersion bo'yicha yangilanadi).
+
+Oflayn katalog (ish ekrani uchun)
+
+catalog_bundle() - shu ombor to'plami ustunlar bo'yicha (ids, codes, names,
+manufacturers) gzip qilingan JSON, transliteratsiya qoidalari bilan. Ish
+ekrani uni reviziya uchun bir marta yuklab IndexedDB da saqlaydi va
+qidiruvni brauzerda (yuqoridagi tartibda) bajaradi. ETag - JSON baytlarining
+xeshi; keyingi ochilishda 304 qaytadi.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product, Warehouse
+from .nomenclature import catalog_version
+from .fts import fts_available, search_fts
+from .translit import MAX_VARIANTS, LATIN_TO_CYRILLIC, CYRILLIC_TO_LATIN, fold, variants
+
+
+logger = logging.getLogger(__name__)
+
+# Versiya (bazadagi hisoblagich) shuncha soniyada bir marta tekshiriladi
+VERSION_CHECK_INTERVAL = 2.0
+
+# Qisqa so'rovlar (so'z boshi bo'yicha) uzunligi
+PREFIX_LENGTH = 2
+
+# Xotirada saqlanadigan omborlar to'plami soni (eng oxirgi ishlatilganlari)
+WAREHOUSE_CACHE_SIZE = 16
+
+# Nom va kod orasidagi ajratuvchi (so'rovda bo'lmaydi - ikkalasiga bir vaqtda mos kelmaydi)
+SEPARATOR = '\x00'
+
+WHITESPACE = re.compile(r'\s+')
+TOKEN = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Kichik harf, ё -> е, ortiqcha bo'shliqlarsiz"""
+    return WHITESPACE.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def search_keys(query):
+    """So'rovning barcha yozilish variantlari fold() dan keyin (takrorlarsiz)"""
+    return [key for key in dict.fromkeys(normalize(fold(variant)) for variant in variants(query)) if key]
+
+
+class ProductSearchIndex:
+    """Nomenklatura bo'yicha qidiruv indeksi (o'qish uchun, oqimlar orasida umumiy)"""
+
+    def __init__(self, products, version=0):
+        """products - nom bo'yicha saralangan (id, code, name, manufacturer) lar"""
+        self.version = version
+        self.ids = array('q')
+        self.codes = []
+        self.names = []
+        self.manufacturers = []
+        self.haystacks = []
+
+        grams = {}
+        prefixes = {}
+        for position, (product_id, code, name, manufacturer) in enumerate(products):
+            self.ids.append(product_id)
+            self.codes.append(code)
+            self.names.append(name)
+            self.manufacturers.append(manufacturer or '')
+
+            haystack = f'{normalize(fold(name))}{SEPARATOR}{normalize(fold(code))}'
+            self.haystacks.append(haystack)
+
+            for gram in trigrams(haystack):
+                grams.setdefault(gram, []).append(position)
+            starts = {token[:length] for token in TOKEN.findall(haystack) for length in range(1, PREFIX_LENGTH + 1)}
+            for prefix in starts:
+                prefixes.setdefault(prefix, []).append(position)
+
+        # Ro'yxatlar ixcham massivlarda (tovar o'rni - 4 bayt)
+        self.grams = {gram: array('I', positions) for gram, positions in grams.items()}
+        self.prefixes = {prefix: array('I', positions) for prefix, positions in prefixes.items()}
+
+    @classmethod
+    def from_db(cls):
+        version = catalog_version()
+        products = (
+            Product.objects
+            .order_by('name', 'id')
+            .values_list('id', 'code', 'name', 'manufacturer')
+            .iterator(chunk_size=2000)
+        )
+        return cls(products, version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, key, limit):
+        """Kalitga (search_keys()) mos tovarlar o'rni (nom tartibida, ko'pi bilan limit ta)"""
+        if not key:
+            return []
+
+        if len(key) <= PREFIX_LENGTH:
+            return list(self.prefixes.get(key, ())[:limit])
+
+        postings = []
+        for gram in trigrams(key):
+            posting = self.grams.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+
+        # Eng qisqa ro'yxat - har bir nomzod to'liq qatorga tekshiriladi
+        haystacks = self.haystacks
+        found = []
+        for position in min(postings, key=len):
+            if key in haystacks[position]:
+                found.append(position)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def search(self, query, limit=30):
+        """Natija API formatida"""
+        positions = set()
+        for key in search_keys(query):
+            positions.update(self.positions(key, limit))
+
+        return [{
+            'id': self.ids[position],
+            'code': self.codes[position],
+            'name': self.names[position],
+            'manufacturer': self.manufacturers[position],
+        } for position in sorted(positions)[:limit]]
+
+
+def search_products(query, limit=30):
+    """Nomenklatura bo'yicha qidiruv (settings.PRODUCT_SEARCH), tovarlar API formatida"""
+    backend = getattr(settings, 'PRODUCT_SEARCH', 'fts')
+
+    if backend == 'fts' and fts_available():
+        return search_fts(query, limit)
+
+    if backend != 'db':
+        index = get_search_index()
+        if index is not None:
+            return index.search(query, limit)
+
+    return search_db(query, limit)
+
+
+def search_db(query, limit=30):
+    """LIKE bilan qidiruv (indeks tayyor bo'lmaganda)"""
+    q_filter = Q()
+    for variant in variants(query):
+        q_filter |= Q(name__icontains=variant)
+        q_filter |= Q(code__icontains=variant)
+
+    products = Product.objects.filter(q_filter).order_by('name')[:limit]
+    return [{
+        'id': p.id,
+        'code': p.code,
+        'name': p.name,
+        'manufacturer': p.manufacturer or '',
+    } for p in products]
+
+
+_index = None
+_checked_at = 0.0
+_building = False
+_lock = threading.Lock()
+
+
+def get_search_index():
+    """
+    Joriy indeks. Eskirgan bo'lsa - fon oqimida qayta quriladi (hozircha eskisi
+    qaytariladi), hali qurilmagan bo'lsa - None.
+    """
+    global _checked_at
+
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _index
+    _checked_at = now
+
+    if _index is None or _index.version != catalog_version():
+        _start_rebuild()
+    return _index
+
+
+def rebuild_search_index():
+    """Indeksni hozir qurish"""
+    global _index
+    _index = ProductSearchIndex.from_db()
+    return _index
+
+
+def _start_rebuild():
+    global _building
+    with _lock:
+        if _building:
+            return
+        _building = True
+    threading.Thread(target=_rebuild, name='product-search-index', daemon=True).start()
+
+
+def _rebuild():
+    global _building
+    started = time.perf_counter()
+    try:
+        index = rebuild_search_index()
+        logger.info('Qidiruv indeksi qurildi: %s ta tovar, v%s (%.2f s)',
+                    len(index), index.version, time.perf_counter() - started)
+    except Exception:
+        logger.exception('Qidiruv indeksini qurishda xatolik')
+    finally:
+        _building = False
+        connection.close()
+
+
+# ==================== OMBOR BO'YICHA ====================
+
+class WarehouseCandidates:
+    """Ombor qoldig'idagi tovarlar: kod, so'z boshi va nom bo'yicha qidiruv"""
+
+    def __init__(self, products, key=None):
+        """products - nom bo'yicha saralangan (id, code, name, manufacturer) lar"""
+        self.key = key
+        self.checked_at = time.monotonic()
+        self.bundle = None
+        self.rows = []
+        self.haystacks = []
+        self.codes = {}
+        tokens = []
+        for position, (product_id, code, name, manufacturer) in enumerate(products):
+            self.rows.append({'id': product_id, 'code': code, 'name': name, 'manufacturer': manufacturer or ''})
+            haystack = f'{normalize(name)}{SEPARATOR}{normalize(code)}'
+            self.haystacks.append(haystack)
+            self.codes.setdefault(normalize(code), position)
+            tokens.extend((token, position) for token in set(TOKEN.findall(haystack)))
+
+        # (so'z, o'rni) saralangan - so'z boshi bisect bilan
+        tokens.sort()
+        self.tokens = [token for token, _ in tokens]
+        self.token_positions = array('I', (position for _, position in tokens))
+
+    @classmethod
+    def from_db(cls, warehouse_id, key=None):
+        products = (
+            Product.objects
+            .filter(inventory__warehouse_id=warehouse_id)
+            .distinct()
+            .order_by('name', 'id')
+            .values_list('id', 'code', 'name', 'manufacturer')
+        )
+        return cls(products, key)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query, limit=30):
+        """Kod to'liq mos -> so'z boshi -> nomning istalgan joyi; har birida nom tartibida"""
+        # Lotin/kirill variantlari (oflayn qidiruvdagi kabi fold() siz)
+        queries = [key for key in dict.fromkeys(normalize(variant) for variant in variants(query)) if key]
+        exact, prefixed, contained = set(), set(), set()
+
+        for query in queries:
+            position = self.codes.get(query)
+            if position is not None:
+                exact.add(position)
+
+            if ' ' not in query:
+                start = bisect_left(self.tokens, query)
+                for index in range(start, len(self.tokens)):
+                    if not self.tokens[index].startswith(query):
+                        break
+                    prefixed.add(self.token_positions[index])
+
+        # Nom ichidan - oldingi bosqichlar yetmasa
+        if len(exact | prefixed) < limit:
+            for query in queries:
+                for position, haystack in enumerate(self.haystacks):
+                    if query in haystack:
+                        contained.add(position)
+
+        result = []
+        seen = set()
+        for tier in (exact, prefixed, contained):
+            for position in sorted(tier - seen):
+                result.append(self.rows[position])
+                if len(result) >= limit:
+                    return result
+            seen |= tier
+        return result
+
+
+_warehouses = OrderedDict()
+
+
+def get_warehouse_candidates(warehouse_id):
+    """Ombor to'plami (eskirgan bo'lsa - qayta quriladi, bir necha ming tovar)"""
+    candidates = _warehouses.get(warehouse_id)
+    now = time.monotonic()
+    if candidates is not None and now - candidates.checked_at < VERSION_CHECK_INTERVAL:
+        _warehouses.move_to_end(warehouse_id)
+        return candidates
+
+    inventory_version = Warehouse.objects.filter(pk=warehouse_id).values_list('inventory_version', flat=True).first()
+    key = (inventory_version, catalog_version())
+    if candidates is None or candidates.key != key:
+        candidates = WarehouseCandidates.from_db(warehouse_id, key)
+    candidates.checked_at = now
+
+    _warehouses[warehouse_id] = candidates
+    _warehouses.move_to_end(warehouse_id)
+    while len(_warehouses) > WAREHOUSE_CACHE_SIZE:
+        _warehouses.popitem(last=False)
+    return candidates
+
+
+def catalog_bundle(warehouse_id):
+    """(etag, gzip baytlar) - ombor to'plami, ish ekranida lokal qidiruv uchun"""
+    candidates = get_warehouse_candidates(warehouse_id)
+    if candidates.bundle is None:
+        candidates.bundle = build_bundle(candidates)
+    return candidates.bundle
+
+
+def build_bundle(candidates):
+    # Ishlab chiqaruvchilar takrorlanadi - alohida ro'yxat va indekslar
+    manufacturers = {}
+    payload = {
+        'ids': [row['id'] for row in candidates.rows],
+        'codes': [row['code'] for row in candidates.rows],
+        'names': [row['name'] for row in candidates.rows],
+        'manufacturer': [manufacturers.setdefault(row['manufacturer'], len(manufacturers))
+                         for row in candidates.rows],
+        'manufacturers': list(manufacturers),
+        'translit': {
+            'limit': MAX_VARIANTS,
+            'rules': [LATIN_TO_CYRILLIC, CYRILLIC_TO_LATIN],
+        },
+    }
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = '"%s"' % hashlib.sha1(data).hexdigest()
+    return etag, gzip.compress(data, mtime=0)
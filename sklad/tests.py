@@ -1,3 +1,448 @@
-from django.test import TestCase
+"""
+sklad testlari
 
-# Create your tests here.
+    python manage.py test sklad
+"""
+import csv
+import io
+import json
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+
+from .exports import SignedNumber, export_response
+from .fts import fts_available, search_fts
+from .imports import repeated_import
+from .inventory import diff_inventory, write_inventory
+from .matching import ProductNameMatcher
+from .models import (
+    User, Warehouse, Product, Inventory, Revision, RevisionAssignment, RevisionItem,
+    RevisionTotal, DirtyProduct, RevisionResult, UnaccountedItem, ImportRun
+)
+from .nomenclature import upsert_products
+from .parsers import OneCInventoryParser
+from .reconciliation import calculate_revision_results, mark_dirty, rebuild_running_totals
+from .translit import fold, variants
+
+
+class WarehouseTestCase(TestCase):
+    """Ombor: 5 ta tovar, 1C qoldig'i (C0 - ikki partiya) va boshlangan reviziya"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', role='admin')
+        cls.ali = User.objects.create_user('ali', password='x', role='revizor', created_by=cls.admin)
+        cls.vali = User.objects.create_user('vali', password='x', role='revizor', created_by=cls.admin)
+        cls.warehouse = Warehouse.objects.create(name='Ombor', created_by=cls.admin)
+        cls.products = [
+            Product.objects.create(code=f'C{i}', name=f'Tovar {i}', manufacturer='M') for i in range(5)
+        ]
+        p0, p1, p2 = cls.products[:3]
+        Inventory.objects.create(warehouse=cls.warehouse, product=p0, series='A', quantity=5)
+        Inventory.objects.create(warehouse=cls.warehouse, product=p0, series='B', quantity=3)
+        Inventory.objects.create(warehouse=cls.warehouse, product=p1, quantity=10)
+        Inventory.objects.create(warehouse=cls.warehouse, product=p2, quantity=4)
+
+        cls.revision = Revision.objects.create(warehouse=cls.warehouse, created_by=cls.admin, status='in_progress')
+        for revizor in (cls.ali, cls.vali):
+            RevisionAssignment.objects.create(revision=cls.revision, revizor=revizor, status='working')
+
+    def count(self, revizor, product, quantity, series=''):
+        return RevisionItem.objects.create(
+            revision=self.revision, revizor=revizor, product=product, series=series,
+            expiry_date=date(2030, 1, 1), quantity=quantity
+        )
+
+
+# ==================== NATIJALAR ====================
+
+class CalculateRevisionResultsTest(WarehouseTestCase):
+    def setUp(self):
+        p0, p1, p2, p3, _ = self.products
+        self.count(self.ali, p0, 4)
+        self.count(self.vali, p0, 2)
+        self.count(self.ali, p2, 4)
+        self.count(self.vali, p3, 2)
+        rebuild_running_totals(self.revision)
+
+    def results(self, product):
+        return list(RevisionResult.objects.filter(revision=self.revision, product=product).order_by('id'))
+
+    def test_difference_goes_to_first_batch(self):
+        calculate_revision_results(self.revision)
+
+        first, second = self.results(self.products[0])
+        self.assertEqual((first.series, first.expected_quantity, first.actual_quantity), ('A', 5, 3))
+        self.assertEqual((first.difference, first.status), (-2, 'shortage'))
+        self.assertEqual((second.series, second.actual_quantity, second.difference), ('B', 3, 0))
+        self.assertEqual(second.status, 'correct')
+        self.assertEqual(set(first.revizors.all()), {self.ali, self.vali})
+
+        [missing] = self.results(self.products[1])
+        self.assertEqual((missing.actual_quantity, missing.difference, missing.status), (0, -10, 'shortage'))
+        [correct] = self.results(self.products[2])
+        self.assertEqual(correct.status, 'correct')
+
+    def test_unaccounted_items(self):
+        calculate_revision_results(self.revision)
+
+        [item] = UnaccountedItem.objects.filter(revision=self.revision)
+        self.assertEqual((item.product, item.quantity, item.revizor), (self.products[3], 2, self.vali))
+        self.assertFalse(self.results(self.products[3]))
+
+    def test_recalculation_replaces_results(self):
+        calculate_revision_results(self.revision)
+        calculate_revision_results(self.revision)
+
+        self.assertEqual(RevisionResult.objects.filter(revision=self.revision).count(), 4)
+        self.assertEqual(UnaccountedItem.objects.filter(revision=self.revision).count(), 1)
+
+    def test_dirty_only(self):
+        calculate_revision_results(self.revision)
+        p0, p1, p2 = self.products[:3]
+
+        # p1 belgilangan, p2 - yo'q: faqat p1 qayta hisoblanadi
+        Inventory.objects.filter(warehouse=self.warehouse, product=p1).update(quantity=7)
+        Inventory.objects.filter(warehouse=self.warehouse, product=p2).update(quantity=9)
+        mark_dirty([self.revision.pk], [p1.pk])
+
+        calculate_revision_results(self.revision, dirty_only=True)
+
+        [result] = self.results(p1)
+        self.assertEqual((result.expected_quantity, result.difference), (7, -7))
+        [untouched] = self.results(p2)
+        self.assertEqual(untouched.expected_quantity, 4)
+        self.assertEqual(len(self.results(p0)), 2)
+        self.assertFalse(DirtyProduct.objects.filter(revision=self.revision).exists())
+
+    def test_dirty_only_without_marks(self):
+        calculate_revision_results(self.revision)
+        before = list(RevisionResult.objects.filter(revision=self.revision).values_list('id', flat=True))
+
+        calculate_revision_results(self.revision, dirty_only=True)
+
+        after = list(RevisionResult.objects.filter(revision=self.revision).values_list('id', flat=True))
+        self.assertEqual(before, after)
+
+
+# ==================== REVIZOR YOZUVLARI ====================
+
+class RunningTotalsTest(WarehouseTestCase):
+    """apply_count_delta - revizor qo'shish/o'zgartirish/o'chirish sahifalari orqali"""
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.ali)
+
+    def post(self, url, data=None):
+        return self.client.post(url, json.dumps(data or {}), content_type='application/json')
+
+    def add(self, product, quantity, series=''):
+        response = self.post('/api/items/add/', {
+            'revision_id': self.revision.pk, 'product_id': product.pk,
+            'series': series, 'expiry_date': '2030-01-01', 'quantity': quantity,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['item']['id']
+
+    def total(self, product):
+        return RevisionTotal.objects.get(revision=self.revision, product=product).quantity
+
+    def test_add_same_batch_accumulates(self):
+        product = self.products[0]
+        first = self.add(product, 4)
+        second = self.add(product, 3)
+        self.add(product, 1, series='X')
+
+        self.assertEqual(first, second)
+        self.assertEqual(RevisionItem.objects.get(pk=first).quantity, 7)
+        self.assertEqual(self.total(product), 8)
+
+    def test_update_applies_delta(self):
+        product = self.products[1]
+        self.add(product, 2, series='X')
+        item = self.add(product, 5)
+
+        response = self.post(f'/api/items/{item}/update/', {'quantity': 3})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.total(product), 5)
+
+    def test_delete_applies_delta_once(self):
+        product = self.products[2]
+        self.add(product, 2, series='X')
+        item = self.add(product, 5)
+
+        self.assertEqual(self.post(f'/api/items/{item}/delete/').status_code, 200)
+        self.assertEqual(self.post(f'/api/items/{item}/delete/').status_code, 404)
+        self.assertEqual(self.total(product), 2)
+
+    def test_other_revizor_item_is_not_editable(self):
+        item = self.count(self.vali, self.products[0], 4)
+
+        response = self.post(f'/api/items/{item.pk}/update/', {'quantity': 1})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(RevisionItem.objects.get(pk=item.pk).quantity, 4)
+
+
+# ==================== 1C QOLDIG'I ====================
+
+class DiffInventoryTest(WarehouseTestCase):
+    def file_rows(self):
+        p0, _, _, p3, _ = self.products
+        return [
+            (p0.pk, 'A', None, Decimal('5')),
+            (p0.pk, 'B', None, Decimal('1')),
+            (p0.pk, 'B', None, Decimal('1.5')),
+            (p3.pk, '', None, Decimal('2')),
+        ]
+
+    def stock(self):
+        return {
+            (product_id, series): quantity
+            for product_id, series, quantity in
+            Inventory.objects.filter(warehouse=self.warehouse).values_list('product_id', 'series', 'quantity')
+        }
+
+    def test_replace(self):
+        p0, p1, p2, p3, _ = self.products
+
+        diff = diff_inventory(self.warehouse.pk, self.file_rows(), replace=True)
+
+        self.assertEqual(diff.stats, {'created': 1, 'updated': 1, 'unchanged': 1, 'deleted': 2})
+        self.assertEqual(diff.changed_products, {p0.pk, p1.pk, p2.pk, p3.pk})
+
+        write_inventory(diff)
+        self.assertEqual(self.stock(), {(p0.pk, 'A'): 5, (p0.pk, 'B'): Decimal('2.5'), (p3.pk, ''): 2})
+
+    def test_keep_missing_batches(self):
+        p0, p1, p2, p3, _ = self.products
+
+        diff = diff_inventory(self.warehouse.pk, self.file_rows(), replace=False)
+
+        self.assertEqual(diff.stats['deleted'], 0)
+        self.assertEqual(diff.changed_products, {p0.pk, p3.pk})
+        write_inventory(diff)
+        self.assertEqual(self.stock()[(p1.pk, '')], 10)
+
+    def test_unchanged_file(self):
+        rows = Inventory.objects.filter(warehouse=self.warehouse).values_list(
+            'product_id', 'series', 'expiry_date', 'quantity'
+        )
+
+        diff = diff_inventory(self.warehouse.pk, list(rows))
+
+        self.assertEqual(diff.stats, {'created': 0, 'updated': 0, 'unchanged': 4, 'deleted': 0})
+        self.assertFalse(diff.to_create or diff.to_update or diff.to_delete or diff.changed_products)
+
+
+class OneCInventoryParserTest(SimpleTestCase):
+    LINES = [
+        'Остатки по товарам на 01.01.2030',
+        'Куп;Наименование;Производитель;Срок годность;Остаток;Кам',
+        ';;К.;;;',
+        '',
+        '1;"Аспирин; 500 мг";Байер;01.02.2030;1 234,5;',
+        '2;"Но-шпа ""форте"" таб";Хиноин;;3;',
+        '3;К.;;;;',
+        '4;Qisqa qator',
+        '5;"Парацетамол";;2030-03-01;abc;',
+        'Итого;;;;;',
+        '6;Keyingi;;;1;',
+    ]
+
+    def test_quoting(self):
+        parser = OneCInventoryParser(';')
+
+        rows = list(parser.parse(self.LINES))
+
+        self.assertEqual([row.name for row in rows], ['Аспирин; 500 мг', 'Но-шпа "форте" таб', 'Парацетамол'])
+        self.assertEqual(rows[0].manufacturer, 'Байер')
+        self.assertEqual(rows[0].expiry_date, date(2030, 2, 1))
+        self.assertEqual(rows[0].quantity, Decimal('1234.5'))
+        self.assertIsNone(rows[1].expiry_date)
+        self.assertEqual(rows[2].expiry_date, date(2030, 3, 1))
+        self.assertEqual(rows[2].quantity, 0)
+
+    def test_skip_rules(self):
+        parser = OneCInventoryParser(';')
+
+        list(parser.parse(self.LINES))
+
+        self.assertEqual(parser.skipped, {'header': 3, 'empty': 1, 'name': 1, 'columns': 1, 'footer': 1})
+
+    def test_comma_delimiter(self):
+        rows = list(OneCInventoryParser(',').parse(['Куп,Наименование', '1,"Аспирин, 500",,,2,']))
+
+        self.assertEqual([(row.name, row.quantity) for row in rows], [('Аспирин, 500', 2)])
+
+
+# ==================== NOMLARNI MOSLASHTIRISH ====================
+
+class ProductNameMatcherTest(SimpleTestCase):
+    def setUp(self):
+        self.matcher = ProductNameMatcher(
+            [
+                (1, 'Парацетамол 500 мг таблетки №10'),
+                (2, 'Парацетамол 500 мг таблетки №20'),
+                (3, 'Аспирин кардио 100 мг'),
+                (4, 'Но-шпа 40 мг таблетки №24'),
+            ],
+            [('ношпа', 4)],
+        )
+
+    def test_exact_and_alias(self):
+        self.assertEqual(self.matcher.match('  ПАРАЦЕТАМОЛ 500 мг  таблетки №10'), (1, 'exact', []))
+        self.assertEqual(self.matcher.match('Ношпа'), (4, 'alias', []))
+
+    def test_unique_prefix(self):
+        self.assertEqual(self.matcher.match('Аспирин кардио 100 мг №30'), (3, 'prefix', []))
+
+    def test_ambiguous_prefix(self):
+        match = self.matcher.match('Парацетамол 500 мг таблетки')
+
+        self.assertIsNone(match.product_id)
+        self.assertEqual(match.method, 'ambiguous')
+        self.assertEqual({candidate.product_id for candidate in match.candidates[:2]}, {1, 2})
+
+    def test_fuzzy_above_threshold(self):
+        match = self.matcher.match('Nо-шпа 40мг таблeтки N24')
+
+        self.assertEqual((match.product_id, match.method), (4, 'fuzzy'))
+        self.assertGreaterEqual(match.candidates[0].score, 0.8)
+
+    def test_fuzzy_below_threshold(self):
+        match = self.matcher.match('Но-шпа таблетки')
+
+        self.assertEqual((match.product_id, match.method), (None, 'missing'))
+        self.assertEqual(match.candidates[0].product_id, 4)
+        self.assertLess(match.candidates[0].score, 0.8)
+
+    def test_unknown_name(self):
+        self.assertEqual(self.matcher.match('Витамин С'), (None, 'missing', []))
+
+
+# ==================== TRANSLITERATSIYA ====================
+
+class TranslitTest(SimpleTestCase):
+    def test_variants(self):
+        self.assertEqual(variants('Парацетамол')[0], 'парацетамол')
+        self.assertIn('paratsetamol', variants('Парацетамол'))
+        self.assertIn('парацетамол', variants('paratsetamol'))
+        self.assertIn('ўғит', variants("o'g'it"))
+
+    def test_variants_without_letters(self):
+        self.assertEqual(variants('500'), ('500',))
+
+    def test_fold(self):
+        self.assertEqual(fold('Парацетамол'), 'paratsetamol')
+        self.assertEqual(fold('paratsetamol'), fold('Парацетамол'))
+        self.assertEqual(fold('Холестерин'), fold('kholesterin'))
+        self.assertEqual(fold('ўғит'), fold('o‘g‘it'))
+
+
+# ==================== EKSPORT ====================
+
+class ExportResponseTest(SimpleTestCase):
+    ROWS = [
+        ['№', 'Tovar nomi', 'Srok', 'Farq'],
+        [1, 'Aspirin; "forte" <10>', date(2030, 2, 1), SignedNumber(5)],
+        [2, 'Ношпа', None, SignedNumber(-3)],
+    ]
+
+    def response(self, **params):
+        request = RequestFactory().get('/export/', params)
+        return export_response(request, 'natijalar', iter(self.ROWS))
+
+    def test_csv(self):
+        response = self.response()
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="natijalar.csv"')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'\xef\xbb\xbf'))
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig')), delimiter=';'))
+        self.assertEqual(rows, [
+            ['№', 'Tovar nomi', 'Srok', 'Farq'],
+            ['1', 'Aspirin; "forte" <10>', '01.02.2030', '+5'],
+            ['2', 'Ношпа', '', '-3'],
+        ])
+
+    def test_xlsx(self):
+        response = self.response(format='xlsx')
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="natijalar.xlsx"')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn('<c r="A1" t="inlineStr" s="3"><is><t xml:space="preserve">№</t></is></c>', sheet)
+        self.assertIn('Aspirin; "forte" &lt;10&gt;', sheet)
+        excel_date = (date(2030, 2, 1) - date(1899, 12, 30)).days
+        self.assertIn(f'<c r="C2" s="1"><v>{excel_date}</v></c>', sheet)
+        self.assertIn('<c r="D2" s="2"><v>5</v></c>', sheet)
+        self.assertNotIn('r="C3"', sheet)
+
+
+# ==================== FAYL YUKLASH ====================
+
+class RepeatedImportTest(WarehouseTestCase):
+    def run_import(self, kind, digest, warehouse=None, **fields):
+        return ImportRun.objects.create(
+            kind=kind, warehouse=warehouse, file_name='f.csv', file_hash=digest, created_by=self.admin, **fields
+        )
+
+    def test_same_file(self):
+        run = self.run_import('products', 'abc')
+
+        self.assertEqual(repeated_import('products', 'abc'), run)
+        self.assertIsNone(repeated_import('products', 'other'))
+
+    def test_only_last_done_run(self):
+        self.run_import('products', 'abc')
+        self.run_import('products', 'def')
+        self.run_import('products', 'abc', status='failed')
+
+        self.assertIsNone(repeated_import('products', 'abc'))
+        self.assertIsNotNone(repeated_import('products', 'def'))
+
+    def test_inventory_options_and_warehouse(self):
+        run = self.run_import('inventory', 'abc', self.warehouse, report={'replace': True})
+
+        self.assertEqual(repeated_import('inventory', 'abc', self.warehouse, replace=True), run)
+        self.assertIsNone(repeated_import('inventory', 'abc', self.warehouse, replace=False))
+        self.assertIsNone(repeated_import('inventory', 'abc', None, replace=True))
+
+    def test_inventory_after_nomenclature_upload(self):
+        run = self.run_import('inventory', 'abc', self.warehouse, report={'replace': False})
+        products = self.run_import('products', 'xyz')
+        ImportRun.objects.filter(pk=products.pk).update(created_at=run.created_at + timedelta(seconds=1))
+
+        self.assertIsNone(repeated_import('inventory', 'abc', self.warehouse, replace=False))
+
+
+# ==================== QIDIRUV ====================
+
+@skipUnless(fts_available(), 'FTS5 jadvali faqat SQLite da')
+class SearchFtsTest(TestCase):
+    def test_transliteration(self):
+        upsert_products([('X1', 'Ципрофлоксацин 500мг таблетки', 'KRKA'), ('X2', 'Ciprofloxacin eye drops', '')])
+
+        self.assertEqual({product['code'] for product in search_fts('ципро')}, {'X1', 'X2'})
+        self.assertEqual([product['code'] for product in search_fts('tsiproflok 500')], ['X1'])
+        self.assertEqual([product['code'] for product in search_fts('x2')], ['X2'])
+
+    def test_ranks_all_matches(self):
+        # Eng mos tovar oxirida yoziladi (rowid > 500) - tartib barcha mosliklar bo'yicha
+        upsert_products([
+            (f'T{i:04d}', f'Тест препарат {i} таблетки покрытые оболочкой', '') for i in range(600)
+        ])
+        upsert_products([('BEST', 'Тест', '')])
+
+        products = search_fts('тест', limit=5)
+
+        self.assertEqual(len(products), 5)
+        self.assertEqual(products[0]['code'], 'BEST')
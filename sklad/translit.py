@@ -0,0 +1,163 @@
+"""
+Qidiruv uchun transliteratsiya: o'zbek/rus, lotin <-> kirill
+
+Revizor tovar nomini lotin yoki kirill harflarida, o'zbekcha yoki ruscha
+yozishi mumkin ("xolesterin", "холестерин", "o'g'it", "ципро"). Bitta
+"to'g'ri" javob yo'q: 'x' o'zbekcha 'х', inglizcha 'кс'; 'ц' - 'ts' yoki 's'.
+Shuning uchun bir nechta ehtimoliy variant qaytariladi.
+
+- Qoidalar ikki yo'nalish uchun prefiks daraxtiga (trie) bir marta
+  kompilyatsiya qilinadi; matn eng uzun moslik bo'yicha bo'laklarga
+  ajratiladi ("shch" -> "щ", "sh" -> "ш", keyin "s")
+- Har bir bo'lakning variantlari ehtimollik tartibida; variantlar birinchi
+  variantlardan boshlab (indekslar yig'indisi bo'yicha) MAX_VARIANTS tagacha
+  yig'iladi
+- Natija so'rov bo'yicha keshlanadi (bir xil so'rov har bosishda qayta keladi)
+
+fold() - nomning bitta lotin "skeleti" (FTS jadvalining folded ustuni uchun).
+U ham shu jadvallardan olinadi: kirill harfi -> birinchi lotin varianti
+(FOLD_OVERRIDES dan tashqari), keyin bir tovushning lotincha turli
+yozilishlari bittaga keltiriladi (LATIN_FOLDS).
+"""
+import heapq
+from functools import lru_cache
+
+
+# Bitta yo'nalishdagi variantlar soni (asl matn hisobga olinmaydi)
+MAX_VARIANTS = 4
+
+# Tutuq belgisining turli yozilishi -> '
+APOSTROPHES = str.maketrans({'ʻ': "'", 'ʼ': "'", '‘': "'", '’': "'", '`': "'"})
+
+# Lotin -> kirill (birinchisi - eng ehtimoliy, nomenklatura asosan ruscha)
+LATIN_TO_CYRILLIC = {
+    'a': ['а'], 'b': ['б'], 'c': ['ц', 'к'], 'd': ['д'], 'e': ['е', 'э'],
+    'f': ['ф'], 'g': ['г'], 'h': ['х', 'ҳ'], 'i': ['и'], 'j': ['ж', 'дж'],
+    'k': ['к'], 'l': ['л'], 'm': ['м'], 'n': ['н'], 'o': ['о'], 'p': ['п'],
+    'q': ['к', 'қ'], 'r': ['р'], 's': ['с'], 't': ['т'], 'u': ['у'],
+    'v': ['в'], 'w': ['в'], 'x': ['х', 'кс'], 'y': ['й', 'ы'], 'z': ['з'],
+    "'": ['', 'ъ'],
+    'sh': ['ш'], 'ch': ['ч'], 'zh': ['ж'], 'kh': ['х'], 'ts': ['ц', 'тс'],
+    'sch': ['щ', 'сч'], 'shch': ['щ'], 'ph': ['ф'],
+    'yo': ['ё', 'йо'], 'yu': ['ю'], 'ya': ['я'], 'ye': ['е', 'йе'],
+    "o'": ['ў', 'о'], "g'": ['ғ', 'г'],
+}
+
+# Kirill -> lotin (o'zbek lotin alifbosi, keyin ruscha transliteratsiya)
+CYRILLIC_TO_LATIN = {
+    'а': ['a'], 'б': ['b'], 'в': ['v'], 'г': ['g'], 'д': ['d'], 'е': ['e'],
+    'ё': ['yo'], 'ж': ['j', 'zh'], 'з': ['z'], 'и': ['i'], 'й': ['y'],
+    'к': ['k'], 'л': ['l'], 'м': ['m'], 'н': ['n'], 'о': ['o'], 'п': ['p'],
+    'р': ['r'], 'с': ['s'], 'т': ['t'], 'у': ['u'], 'ф': ['f'],
+    'х': ['x', 'h', 'kh'], 'ц': ['ts', 's', 'c'], 'ч': ['ch'], 'ш': ['sh'],
+    'щ': ['sh', 'shch'], 'ъ': ["'", ''], 'ы': ['i', 'y'], 'ь': [''],
+    'э': ['e'], 'ю': ['yu'], 'я': ['ya'],
+    'ў': ["o'"], 'қ': ['q'], 'ғ': ["g'"], 'ҳ': ['h'],
+    'дж': ['j'],
+}
+
+
+# fold() da birinchi variantdan farqli harflar (ruscha nomenklatura skeleti)
+FOLD_OVERRIDES = {'ж': 'zh', 'х': 'h', 'ы': 'y'}
+
+# Lotin yozuvidagi bir tovushning turli yozilishi (tartib muhim: avval uzunlari)
+LATIN_FOLDS = [
+    ('shch', 'sh'), ('kh', 'h'), ('ph', 'f'), ('ch', '\x01'), ('c', 'ts'),
+    ('\x01', 'ch'), ('x', 'ks'), ('w', 'v'), ('q', 'k'), ('j', 'dzh'),
+]
+
+FOLD_CYRILLIC = str.maketrans({
+    char: FOLD_OVERRIDES.get(char, targets[0])
+    for char, targets in CYRILLIC_TO_LATIN.items()
+    if len(char) == 1
+})
+
+
+def fold(text):
+    """Lotin va kirill yozuvidagi nomni bitta (lotin) ko'rinishga keltirish"""
+    text = text.lower().translate(APOSTROPHES).translate(FOLD_CYRILLIC).replace("'", '')
+    for source, target in LATIN_FOLDS:
+        text = text.replace(source, target)
+    return text
+
+
+def compile_rules(rules):
+    """Qoidalar -> prefiks daraxti: {belgi: tugun}, tugun[None] - variantlar"""
+    root = {}
+    for source, targets in rules.items():
+        node = root
+        for char in source:
+            node = node.setdefault(char, {})
+        node[None] = tuple(targets)
+    return root
+
+
+LATIN_TRIE = compile_rules(LATIN_TO_CYRILLIC)
+CYRILLIC_TRIE = compile_rules(CYRILLIC_TO_LATIN)
+
+
+def segment(text, trie):
+    """Matn -> bo'laklar variantlari (eng uzun moslik); qoidada yo'q belgi o'zicha qoladi"""
+    segments = []
+    position = 0
+    length = len(text)
+    while position < length:
+        node = trie
+        matched = None
+        end = position
+        cursor = position
+        while cursor < length:
+            node = node.get(text[cursor])
+            if node is None:
+                break
+            cursor += 1
+            if None in node:
+                matched = node[None]
+                end = cursor
+        if matched is None:
+            segments.append((text[position],))
+            position += 1
+        else:
+            segments.append(matched)
+            position = end
+    return segments
+
+
+def best_combinations(segments, limit):
+    """Bo'laklardan eng ehtimoliy limit ta matn (variant indekslari yig'indisi bo'yicha)"""
+    # Faqat bir nechta varianti bor bo'laklar tanlanadi - qolganlari o'zgarmaydi
+    choices = [position for position, options in enumerate(segments) if len(options) > 1]
+    start = (0,) * len(choices)
+    heap = [(0, start)]
+    seen = {start}
+    results = []
+
+    while heap and len(results) < limit:
+        cost, picks = heapq.heappop(heap)
+        parts = [options[0] for options in segments]
+        for position, pick in zip(choices, picks):
+            parts[position] = segments[position][pick]
+        results.append(''.join(parts))
+
+        for index, position in enumerate(choices):
+            if picks[index] + 1 < len(segments[position]):
+                following = picks[:index] + (picks[index] + 1,) + picks[index + 1:]
+                if following not in seen:
+                    seen.add(following)
+                    heapq.heappush(heap, (cost + 1, following))
+    return results
+
+
+@lru_cache(maxsize=4096)
+def variants(text, limit=MAX_VARIANTS):
+    """
+    Matn va uning ehtimoliy lotin/kirill variantlari (birinchisi - asl matn,
+    kichik harflarda). Kortej - keshlangan natija o'zgartirilmaydi.
+    """
+    text = text.lower().translate(APOSTROPHES)
+    result = [text]
+    for trie in (LATIN_TRIE, CYRILLIC_TRIE):
+        for variant in best_combinations(segment(text, trie), limit):
+            if variant not in result:
+                result.append(variant)
+    return tuple(result)
@@ -23,6 +23,12 @@ urlpatterns = [
     # ==================== ADMIN: INVENTORY (1C QOLDIQ) ====================
     path('admin-panel/warehouse/<int:warehouse_pk>/inventory/upload/', views.admin_inventory_upload,
          name='admin_inventory_upload'),
+    path('admin-panel/warehouse/<int:warehouse_pk>/match-reviews/', views.admin_match_reviews,
+         name='admin_match_reviews'),
+    path('admin-panel/warehouse/<int:warehouse_pk>/imports/', views.admin_warehouse_imports,
+         name='admin_warehouse_imports'),
+    path('admin-panel/imports/<int:pk>/', views.admin_import_job, name='admin_import_job'),
+    path('admin-panel/imports/<int:pk>/status/', views.admin_import_job_status, name='admin_import_job_status'),
 
 
 
@@ -38,6 +44,10 @@ urlpatterns = [
     path('admin-panel/revision/<int:pk>/start/', views.admin_revision_start, name='admin_revision_start'),
     path('admin-panel/revision/<int:pk>/complete/', views.admin_revision_complete, name='admin_revision_complete'),
     path('admin-panel/revision/<int:pk>/results/', views.admin_revision_results, name='admin_revision_results'),
+    path('admin-panel/revision/<int:pk>/recalculate/', views.admin_revision_recalculate,
+         name='admin_revision_recalculate'),
+    path('admin-panel/revision/<int:pk>/job-status/', views.admin_revision_job_status,
+         name='admin_revision_job_status'),
     path('admin-panel/revision/<int:pk>/export/', views.admin_revision_export, name='admin_revision_export'),
     path('admin-panel/revision/<int:pk>/unaccounted/export/', views.admin_unaccounted_export,
          name='admin_unaccounted_export'),
@@ -62,6 +72,7 @@ urlpatterns = [
 
     # ==================== REVIZOR: AJAX ====================
     path('api/products/search/', views.revizor_search_products, name='revizor_search_products'),
+    path('api/revisions/<int:revision_pk>/catalog/', views.revizor_catalog_bundle, name='revizor_catalog_bundle'),
     path('api/items/add/', views.revizor_add_item, name='revizor_add_item'),
     path('api/items/<int:pk>/update/', views.revizor_update_item, name='revizor_update_item'),
     path('api/items/<int:pk>/delete/', views.revizor_delete_item, name='revizor_delete_item'),
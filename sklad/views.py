@@ -3,58 +3,33 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
+from django.db import transaction
 from django.db.models import Sum, Q
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
-import csv
+import gzip
 import json
+import time
 from datetime import datetime
 from decimal import Decimal
 from .models import (
-    User, Warehouse, Product, Inventory,
+    User, Warehouse, Product,
     Revision, RevisionAssignment, RevisionItem,
-    RevisionResult, UnaccountedItem
+    RevisionResult, UnaccountedItem, BackgroundJob
 )
+from .reconciliation import apply_count_delta, live_results, mark_warehouse_changes
+from .combined import (
+    combined_queryset, combined_stats, combined_row, combined_rows, combined_unaccounted, cached_dataset
+)
+from .exports import ITERATOR_CHUNK_SIZE, SignedNumber, export_response
+from .ingest import file_digest
+from .imports import repeated_import, repeated_message
+from .matching import accept_review
+from .search import search_products, get_warehouse_candidates, catalog_bundle
+from .jobs import enqueue_reconciliation, enqueue_combined_refresh, enqueue_import, job_status
 
 
-
-# ============ TRANSLITERATSIYA ============
-LATIN_TO_CYRILLIC = {
-    'a': 'а', 'b': 'б', 'v': 'в', 'g': 'г', 'd': 'д',
-    'e': 'е', 'yo': 'ё', 'zh': 'ж', 'z': 'з', 'i': 'и',
-    'y': 'й', 'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н',
-    'o': 'о', 'p': 'п', 'r': 'р', 's': 'с', 't': 'т',
-    'u': 'у', 'f': 'ф', 'h': 'х', 'kh': 'х', 'ts': 'ц',
-    'ch': 'ч', 'sh': 'ш', 'sch': 'щ', 'shch': 'щ',
-    'j': 'дж', 'x': 'кс', 'w': 'в', 'q': 'к', 'c': 'ц',
-}
-
-def transliterate_to_cyrillic(text):
-    text = text.lower()
-    result = ''
-    i = 0
-    while i < len(text):
-        if i + 4 <= len(text) and text[i:i+4] in LATIN_TO_CYRILLIC:
-            result += LATIN_TO_CYRILLIC[text[i:i+4]]
-            i += 4
-        elif i + 3 <= len(text) and text[i:i+3] in LATIN_TO_CYRILLIC:
-            result += LATIN_TO_CYRILLIC[text[i:i+3]]
-            i += 3
-        elif i + 2 <= len(text) and text[i:i+2] in LATIN_TO_CYRILLIC:
-            result += LATIN_TO_CYRILLIC[text[i:i+2]]
-            i += 2
-        elif text[i] in LATIN_TO_CYRILLIC:
-            result += LATIN_TO_CYRILLIC[text[i]]
-            i += 1
-        else:
-            result += text[i]
-            i += 1
-    return result
-
-def is_latin(text):
-    return any(c in 'abcdefghijklmnopqrstuvwxyz' for c in text.lower())
-
 # ==================== AUTH ====================
 
 def login_view(request):
@@ -142,11 +117,13 @@ def admin_warehouse_detail(request, pk):
     warehouse = get_object_or_404(Warehouse, pk=pk, created_by=request.user)
     revisions = warehouse.revisions.all().order_by('-created_at')
     inventory_count = warehouse.inventory.count()
+    review_count = warehouse.match_reviews.filter(status='pending').count()
 
     context = {
         'warehouse': warehouse,
         'revisions': revisions,
         'inventory_count': inventory_count,
+        'review_count': review_count,
     }
     return render(request, 'sklad/admin/warehouse_detail.html', context)
 
@@ -214,129 +191,31 @@ def admin_products_upload(request):
 
     if request.method == 'POST':
         file = request.FILES.get('file')
+        force = request.POST.get('force') == 'on'
         if not file:
             messages.error(request, 'Fayl tanlanmadi!')
             return redirect('admin_products')
 
-        try:
-            # Faylni o'qish
-            content = file.read()
-
-            # Encoding aniqlash
-            try:
-                decoded = content.decode('utf-8-sig')
-            except:
-                try:
-                    decoded = content.decode('cp1251')  # Windows Cyrillic
-                except:
-                    decoded = content.decode('latin-1')
-
-            lines = decoded.splitlines()
-
-            if file.name.endswith('.csv'):
-                # Delimiter aniqlash (vergul yoki nuqtali vergul)
-                first_line = lines[0] if lines else ''
-                delimiter = ';' if ';' in first_line else ','
-
-                reader = csv.DictReader(lines, delimiter=delimiter)
-                count = 0
-                errors = []
-
-                for i, row in enumerate(reader, start=2):
-                    # Turli nom variantlari
-                    code = (
-                        row.get('code') or
-                        row.get('kod') or
-                        row.get('Code') or
-                        row.get('CODE') or
-                        row.get('№') or
-                        row.get('нумерация') or
-                        row.get('Нумерация') or
-                        row.get('\ufeffcode') or  # BOM bilan
-                        row.get('\ufeff№') or
-                        list(row.values())[0] if row else None  # Birinchi ustun
-                    )
-
-                    name = (
-                        row.get('name') or
-                        row.get('nom') or
-                        row.get('Name') or
-                        row.get('NAME') or
-                        row.get('товар номи') or
-                        row.get('Товар номи') or
-                        row.get('наименование') or
-                        row.get('Наименование') or
-                        row.get('tovar') or
-                        list(row.values())[1] if len(row) > 1 else None  # Ikkinchi ustun
-                    )
-
-                    manufacturer = (
-                        row.get('manufacturer') or
-                        row.get('ishlab_chiqaruvchi') or
-                        row.get('Manufacturer') or
-                        row.get('ишлаб чикарувчи') or
-                        row.get('Ишлаб чикарувчи') or
-                        row.get('производитель') or
-                        row.get('Производитель') or
-                        list(row.values())[2] if len(row) > 2 else ''  # Uchinchi ustun
-                    )
-
-                    if code and name:
-                        code_clean = str(code).strip()
-                        name_clean = str(name).strip()
-                        manufacturer_clean = str(manufacturer).strip() if manufacturer else ''
-
-                        if code_clean and name_clean:
-                            Product.objects.update_or_create(
-                                code=code_clean,
-                                defaults={
-                                    'name': name_clean,
-                                    'manufacturer': manufacturer_clean
-                                }
-                            )
-                            count += 1
-                    else:
-                        if i <= 5:  # Faqat birinchi 5 ta xatoni ko'rsat
-                            errors.append(f"Qator {i}: code={code}, name={name}")
-
-                if count > 0:
-                    messages.success(request, f'{count} ta tovar yuklandi!')
-                else:
-                    messages.error(request, 'Hech qanday tovar yuklanmadi. CSV formatini tekshiring.')
-
-                if errors:
-                    messages.warning(request, f'Xatolar: {"; ".join(errors)}')
-
-            elif file.name.endswith('.json'):
-                data = json.loads(decoded)
-                count = 0
-
-                for item in data:
-                    code = item.get('code') or item.get('kod')
-                    name = item.get('name') or item.get('nom')
-                    manufacturer = item.get('manufacturer') or item.get('ishlab_chiqaruvchi') or ''
-
-                    if code and name:
-                        Product.objects.update_or_create(
-                            code=str(code).strip(),
-                            defaults={
-                                'name': str(name).strip(),
-                                'manufacturer': str(manufacturer).strip()
-                            }
-                        )
-                        count += 1
-
-                messages.success(request, f'{count} ta tovar yuklandi!')
-            else:
-                messages.error(request, 'Faqat CSV yoki JSON fayl yuklang!')
+        if not file.name.endswith(('.csv', '.json')):
+            messages.error(request, 'Faqat CSV yoki JSON fayl yuklang!')
+            return redirect('admin_products')
 
-        except Exception as e:
-            messages.error(request, f'Xatolik: {str(e)}')
+        # Xuddi shu fayl oxirgi marta yuklangan bo'lsa - qayta ishlanmaydi
+        hash_started = time.perf_counter()
+        digest = file_digest(file)
+        hash_time = time.perf_counter() - hash_started
+        previous = None if force else repeated_import('products', digest)
+        if previous:
+            messages.info(request, repeated_message(previous))
+            return redirect('admin_products')
 
-        return redirect('admin_products')
+        # Fayl fon vazifasida o'qiladi - sahifa jarayonni ko'rsatadi
+        job = enqueue_import('import_products', file, request.user, digest=digest, hash_time=hash_time)
+        return redirect('admin_import_job', pk=job.pk)
 
     return render(request, 'sklad/admin/products_upload.html')
 
+
 # ==================== INVENTORY (1C QOLDIQ) ====================
 # ============================================
 # YANGILANGAN admin_inventory_upload
@@ -371,191 +250,120 @@ def admin_inventory_upload(request, warehouse_pk):
     if request.method == 'POST':
         file = request.FILES.get('file')
         clear_old = request.POST.get('clear_old') == 'on'
+        force = request.POST.get('force') == 'on'
 
         if not file:
             messages.error(request, 'Fayl tanlanmadi!')
             return redirect('admin_warehouse_detail', pk=warehouse_pk)
 
-        try:
-            # Faylni o'qish
-            content = file.read()
-
-            # Encoding aniqlash
-            decoded = None
-            for encoding in ['utf-8-sig', 'utf-8', 'cp1251', 'latin-1']:
-                try:
-                    decoded = content.decode(encoding)
-                    break
-                except:
-                    continue
-
-            if not decoded:
-                messages.error(request, 'Fayl encodingini aniqlab bo\'lmadi!')
-                return redirect('admin_warehouse_detail', pk=warehouse_pk)
-
-            lines = decoded.splitlines()
-
-            if not lines:
-                messages.error(request, 'Fayl bo\'sh!')
-                return redirect('admin_warehouse_detail', pk=warehouse_pk)
-
-            # Eskisini tozalash
-            if clear_old:
-                Inventory.objects.filter(warehouse=warehouse).delete()
-
-            # ========== DELIMITER ANIQLASH ==========
-            first_line = lines[0]
-            delimiter = ';' if ';' in first_line else ','
-
-            # ========== PRODUCTS CACHE ==========
-            products_cache = {}
-            for p in Product.objects.all().values('id', 'name'):
-                name_clean = p['name'].lower().strip()
-                products_cache[name_clean] = p['id']
-
-            if not products_cache:
-                messages.error(request, 'Nomenklatura bo\'sh! Avval nomenklatura yuklang.')
-                return redirect('admin_warehouse_detail', pk=warehouse_pk)
-
-            # ========== MA'LUMOTLARNI YIGISH ==========
-            inventory_to_create = []
-            count = 0
-            skipped = 0
-            errors_list = []
-
-            for line_num, line in enumerate(lines, 1):
-                line = line.strip()
-
-                # Bo'sh qatorni o'tkazish
-                if not line:
-                    continue
-
-                # "Итого" qatoriga yetganda to'xtatish
-                if 'Итого' in line or 'Мат.отв' in line or 'итого' in line:
-                    break
-
-                # Sarlavha qatorlarini o'tkazish
-                if any(word in line for word in
-                       ['Наименование', 'наименование', 'Остатки по товар', 'Остаток на', ';;К.;', ',,К.,']):
-                    continue
-
-                # CSV qatorini parse qilish
-                parts = []
-                current = ''
-                in_quotes = False
-
-                for char in line:
-                    if char == '"':
-                        in_quotes = not in_quotes
-                    elif char == delimiter and not in_quotes:
-                        parts.append(current.strip().strip('"'))
-                        current = ''
-                    else:
-                        current += char
-                parts.append(current.strip().strip('"'))
-
-                # Ustunlarni olish
-                # Format: Куп;Наименование;Производитель;Срок годность;Остаток;Кам
-                # Index:   0       1            2             3           4      5
-
-                if len(parts) < 5:
-                    continue
-
-                name = parts[1].strip() if len(parts) > 1 else ''
-                expiry_str = parts[3].strip() if len(parts) > 3 else ''
-                quantity_str = parts[4].strip() if len(parts) > 4 else '0'
-
-                # Bo'sh yoki noto'g'ri nomni o'tkazish
-                if not name or name == 'К.' or name == 'K.' or len(name) < 2:
-                    continue
-
-                # Tovarni CACHE dan topish
-                name_lower = name.lower().strip()
-                product_id = products_cache.get(name_lower)
-
-                # Agar topilmasa, qisman qidirish
-                if not product_id:
-                    for cached_name, cached_id in products_cache.items():
-                        if name_lower == cached_name:
-                            product_id = cached_id
-                            break
-                        # Qisman moslik (80% mos bo'lsa)
-                        if len(name_lower) > 10:
-                            if name_lower[:15] == cached_name[:15]:
-                                product_id = cached_id
-                                break
-
-                if not product_id:
-                    if len(errors_list) < 15:
-                        errors_list.append(name[:35])
-                    skipped += 1
-                    continue
-
-                # Sanani parse qilish
-                expiry_date = None
-                if expiry_str:
-                    for fmt in ['%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y', '%d.%m.%y']:
-                        try:
-                            expiry_date = datetime.strptime(expiry_str, fmt).date()
-                            break
-                        except:
-                            continue
-
-                # Miqdorni parse qilish
-                try:
-                    qty_clean = quantity_str.replace(' ', '').replace(',', '.').replace('\xa0', '')
-                    qty = Decimal(qty_clean) if qty_clean else Decimal('0')
-                except:
-                    qty = Decimal('0')
-
-                if qty <= 0:
-                    continue
-
-                # Inventory obyektini yaratish
-                inventory_to_create.append(Inventory(
-                    warehouse=warehouse,
-                    product_id=product_id,
-                    series='',
-                    expiry_date=expiry_date,
-                    quantity=qty
-                ))
-                count += 1
-
-                # Har 500 tadan BULK INSERT
-                if len(inventory_to_create) >= 500:
-                    Inventory.objects.bulk_create(
-                        inventory_to_create,
-                        ignore_conflicts=True
-                    )
-                    inventory_to_create = []
-
-            # Qolganlarini saqlash
-            if inventory_to_create:
-                Inventory.objects.bulk_create(
-                    inventory_to_create,
-                    ignore_conflicts=True
-                )
+        if not file.size:
+            messages.error(request, 'Fayl bo\'sh!')
+            return redirect('admin_warehouse_detail', pk=warehouse_pk)
 
-            # ========== NATIJA XABARI ==========
-            if count > 0:
-                messages.success(request, f'✅ {count} ta qoldiq muvaffaqiyatli yuklandi!')
-            else:
-                messages.warning(request,
-                                 '⚠️ Hech qanday qoldiq yuklanmadi. Tovar nomlari nomenklatura bilan mos kelmagan bo\'lishi mumkin.')
+        # Xuddi shu fayl shu omborga oxirgi marta yuklangan bo'lsa - qayta ishlanmaydi
+        hash_started = time.perf_counter()
+        digest = file_digest(file)
+        hash_time = time.perf_counter() - hash_started
+        previous = None if force else repeated_import('inventory', digest, warehouse, replace=clear_old)
+        if previous:
+            messages.info(request, repeated_message(previous))
+            return redirect('admin_warehouse_detail', pk=warehouse_pk)
 
-            if skipped > 0:
-                messages.warning(request, f'⚠️ {skipped} ta tovar nomenklaturada topilmadi.')
+        # Fayl fon vazifasida o'qiladi va bitta tranzaksiyada yoziladi
+        job = enqueue_import('import_inventory', file, request.user, warehouse,
+                             digest=digest, hash_time=hash_time, replace=clear_old)
+        return redirect('admin_import_job', pk=job.pk)
 
-            if errors_list:
-                messages.info(request,
-                              f'Topilmagan tovarlar: {", ".join(errors_list[:5])}{"..." if len(errors_list) > 5 else ""}')
+    return render(request, 'sklad/admin/inventory_upload.html', {'warehouse': warehouse})
 
-        except Exception as e:
-            messages.error(request, f'Xatolik: {str(e)}')
 
-        return redirect('admin_warehouse_detail', pk=warehouse_pk)
+@login_required
+def admin_import_job(request, pk):
+    """Fayl yuklash vazifasi: jarayon (status endpoint orqali) va natija xabarlari"""
+    if not request.user.is_admin:
+        return redirect('revizor_dashboard')
 
-    return render(request, 'sklad/admin/inventory_upload.html', {'warehouse': warehouse})
+    job = get_object_or_404(
+        BackgroundJob, pk=pk, kind__in=['import_products', 'import_inventory'], created_by=request.user
+    )
+
+    context = {
+        'job': job,
+        'results': job.result.get('messages', []),
+    }
+    return render(request, 'sklad/admin/import_job.html', context)
+
+
+@login_required
+def admin_import_job_status(request, pk):
+    """Fayl yuklash vazifasining holati (JSON)"""
+    if not request.user.is_admin:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    job = get_object_or_404(
+        BackgroundJob, pk=pk, kind__in=['import_products', 'import_inventory'], created_by=request.user
+    )
+    return JsonResponse(job_status(job))
+
+
+@login_required
+def admin_match_reviews(request, warehouse_pk):
+    """1C fayldagi aniq topilmagan nomlarni tekshirish (nomzodlardan tanlash yoki rad etish)"""
+    if not request.user.is_admin:
+        return redirect('revizor_dashboard')
+
+    warehouse = get_object_or_404(Warehouse, pk=warehouse_pk, created_by=request.user)
+    pending = warehouse.match_reviews.filter(status='pending')
+
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        review = get_object_or_404(pending, pk=request.POST.get('review_id'))
+
+        if action == 'reject':
+            review.status = 'rejected'
+            review.save(update_fields=['status'])
+        else:
+            product = get_object_or_404(Product, pk=request.POST.get('product_id'))
+
+            with transaction.atomic():
+                # Shu nomli boshqa partiyalar ham (moslik bitta nom uchun tasdiqlanadi)
+                same_name = list(pending.filter(source_name=review.source_name))
+                for item in same_name:
+                    accept_review(item, product.pk, request.user)
+
+                # Yangi qoldiq - tugallangan reviziyalarda faqat shu tovar qayta hisoblanadi
+                mark_warehouse_changes(warehouse.pk, [product.pk])
+            enqueue_combined_refresh(warehouse.pk, request.user)
+
+            messages.success(request, f'✅ "{review.source_name}" → {product.name} ({len(same_name)} ta partiya)')
+
+        return redirect(f"{request.path}?page={request.POST.get('page', 1)}")
+
+    paginator = Paginator(pending.order_by('-score', 'source_name', 'pk'), 50)
+    page = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'warehouse': warehouse,
+        'page': page,
+        'reviews': page.object_list,
+    }
+    return render(request, 'sklad/admin/match_reviews.html', context)
+
+
+@login_required
+def admin_warehouse_imports(request, warehouse_pk):
+    """Ombor bo'yicha oxirgi yuklashlar: qatorlar soni va bosqichlar vaqti"""
+    if not request.user.is_admin:
+        return redirect('revizor_dashboard')
+
+    warehouse = get_object_or_404(Warehouse, pk=warehouse_pk, created_by=request.user)
+    runs = warehouse.imports.select_related('created_by')[:50]
+
+    context = {
+        'warehouse': warehouse,
+        'runs': runs,
+    }
+    return render(request, 'sklad/admin/warehouse_imports.html', context)
 
 @login_required
 def admin_revizors(request):
@@ -713,10 +521,10 @@ def admin_revision_complete(request, pk):
         revision.completed_at = timezone.now()
         revision.save()
 
-        # Natijalarni hisoblash
-        calculate_revision_results(revision)
+        # Natijalarni hisoblash - fon vazifasi (run_jobs)
+        enqueue_reconciliation(revision, request.user)
 
-        messages.success(request, 'Reviziya tugallandi va natijalar hisoblandi!')
+        messages.success(request, 'Reviziya tugallandi! Natijalar hisoblanmoqda...')
 
     return redirect('admin_revision_results', pk=pk)
 
@@ -733,6 +541,10 @@ def admin_revision_results(request, pk):
     status_filter = request.GET.get('status', '')
     search = request.GET.get('search', '')
 
+    # Reviziya davom etmoqda - joriy jamilar bo'yicha natijalar
+    if revision.status == 'in_progress':
+        return _revision_live_results(request, revision, status_filter, search)
+
     results = RevisionResult.objects.filter(revision=revision).select_related('product')
 
     if status_filter:
@@ -765,43 +577,104 @@ def admin_revision_results(request, pk):
         'unaccounted': unaccounted,
         'status_filter': status_filter,
         'search': search,
+        'job': revision.jobs.first(),
+        'dirty_count': revision.dirty_products.count(),
+    }
+    return render(request, 'sklad/admin/revision_results.html', context)
+
+
+def _revision_live_results(request, revision, status_filter, search):
+    """Jarayondagi reviziya natijalari (RevisionTotal bo'yicha, qayta hisoblamasdan)"""
+    results, unaccounted = live_results(revision)
+
+    if search:
+        search_lower = search.lower()
+        results = [
+            r for r in results
+            if search_lower in r['product'].name.lower() or search_lower in r['product'].code.lower()
+        ]
+
+    stats = {'total': len(results), 'correct': 0, 'shortage': 0, 'excess': 0}
+    for r in results:
+        stats[r['status']] += 1
+
+    if status_filter:
+        results = [r for r in results if r['status'] == status_filter]
+
+    status_order = {'shortage': 0, 'excess': 1, 'correct': 2}
+    results.sort(key=lambda r: (status_order[r['status']], r['product'].name))
+
+    context = {
+        'revision': revision,
+        'results': results,
+        'stats': stats,
+        'unaccounted': unaccounted,
+        'status_filter': status_filter,
+        'search': search,
+        'live': True,
     }
     return render(request, 'sklad/admin/revision_results.html', context)
 
 
 @login_required
-def admin_revision_export(request, pk):
-    """Natijalarni CSV ga eksport"""
+@require_POST
+def admin_revision_recalculate(request, pk):
+    """O'zgargan tovarlar natijalarini qayta hisoblash (fon vazifasi)"""
     if not request.user.is_admin:
         return redirect('revizor_dashboard')
 
+    revision = get_object_or_404(Revision, pk=pk, created_by=request.user, status='completed')
+    enqueue_reconciliation(revision, request.user, dirty_only=True)
+    messages.success(request, 'O\'zgargan tovarlar qayta hisoblanmoqda...')
+    return redirect('admin_revision_results', pk=pk)
+
+
+@login_required
+def admin_revision_job_status(request, pk):
+    """Natijalarni hisoblash vazifasining holati (JSON, natijalar sahifasi so'rab turadi)"""
+    if not request.user.is_admin:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
     revision = get_object_or_404(Revision, pk=pk, created_by=request.user)
-    results = RevisionResult.objects.filter(revision=revision).select_related('product')
+    return JsonResponse(job_status(revision.jobs.first()))
 
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response[
-        'Content-Disposition'] = f'attachment; filename="revision_{revision.revision_number}_{revision.created_at.strftime("%Y%m%d")}.csv"'
 
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(
-        ['№', 'Tovar nomi', 'Ishlab chiqaruvchi', 'Seriya', 'Srok', '1C qoldiq', 'Haqiqiy', 'Farq', 'Natija'])
+@login_required
+def admin_revision_export(request, pk):
+    """Natijalarni CSV ga eksport"""
+    if not request.user.is_admin:
+        return redirect('revizor_dashboard')
 
-    status_labels = {'correct': 'To\'g\'ri', 'shortage': 'Kam', 'excess': 'Ko\'p'}
+    revision = get_object_or_404(Revision, pk=pk, created_by=request.user)
+    results = RevisionResult.objects.filter(revision=revision).order_by('pk').values_list(
+        'product__name', 'product__manufacturer', 'series', 'expiry_date',
+        'expected_quantity', 'actual_quantity', 'difference', 'status'
+    )
 
-    for i, r in enumerate(results, 1):
-        writer.writerow([
-            i,
-            r.product.name,
-            r.product.manufacturer,
-            r.series,
-            r.expiry_date.strftime('%d.%m.%Y') if r.expiry_date else '',
-            r.expected_quantity,
-            r.actual_quantity,
-            r.difference,
-            status_labels.get(r.status, r.status)
-        ])
+    status_labels = {'correct': 'To\'g\'ri', 'shortage': 'Kam', 'excess': 'Ko\'p'}
 
-    return response
+    def rows():
+        yield ['№', 'Tovar nomi', 'Ishlab chiqaruvchi', 'Seriya', 'Srok', '1C qoldiq', 'Haqiqiy', 'Farq', 'Natija']
+
+        results_iter = results.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        for i, (name, manufacturer, series, expiry_date, expected, actual, difference, status) in enumerate(results_iter, 1):
+            yield [
+                i,
+                name,
+                manufacturer,
+                series,
+                expiry_date,
+                expected,
+                actual,
+                difference,
+                status_labels.get(status, status)
+            ]
+
+    return export_response(
+        request,
+        f'revision_{revision.revision_number}_{revision.created_at.strftime("%Y%m%d")}',
+        rows()
+    )
 
 
 @login_required
@@ -811,26 +684,18 @@ def admin_unaccounted_export(request, pk):
         return redirect('revizor_dashboard')
 
     revision = get_object_or_404(Revision, pk=pk, created_by=request.user)
-    items = UnaccountedItem.objects.filter(revision=revision).select_related('product', 'revizor')
-
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response['Content-Disposition'] = f'attachment; filename="unaccounted_{revision.revision_number}.csv"'
+    items = UnaccountedItem.objects.filter(revision=revision).order_by('pk').values_list(
+        'product__name', 'product__manufacturer', 'series', 'expiry_date', 'quantity', 'revizor__full_name'
+    )
 
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(['№', 'Tovar nomi', 'Ishlab chiqaruvchi', 'Seriya', 'Srok', 'Soni', 'Revizor'])
+    def rows():
+        yield ['№', 'Tovar nomi', 'Ishlab chiqaruvchi', 'Seriya', 'Srok', 'Soni', 'Revizor']
 
-    for i, item in enumerate(items, 1):
-        writer.writerow([
-            i,
-            item.product.name,
-            item.product.manufacturer,
-            item.series,
-            item.expiry_date.strftime('%d.%m.%Y') if item.expiry_date else '',
-            item.quantity,
-            item.revizor.full_name
-        ])
+        items_iter = items.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        for i, (name, manufacturer, series, expiry_date, quantity, revizor) in enumerate(items_iter, 1):
+            yield [i, name, manufacturer, series, expiry_date, quantity, revizor]
 
-    return response
+    return export_response(request, f'unaccounted_{revision.revision_number}', rows(), 'Hisobda yo\'q')
 
 
 # ==================== REVIZOR VIEWS ====================
@@ -892,25 +757,49 @@ def revizor_search_products(request):
     if len(query) < 1:
         return JsonResponse({'products': []})
 
-    search_queries = [query]
-    if is_latin(query):
-        search_queries.append(transliterate_to_cyrillic(query))
+    # Reviziya paytida - avval shu omborning 1C qoldig'idagi tovarlar
+    # (lotin/kirill yozilish variantlarini har bir qidiruv o'zi hisobga oladi)
+    revision_id = request.GET.get('revision', '')
+    if revision_id.isdigit():
+        warehouse_id = RevisionAssignment.objects.filter(
+            revision_id=revision_id,
+            revizor=request.user
+        ).values_list('revision__warehouse_id', flat=True).first()
 
-    q_filter = Q()
-    for q in search_queries:
-        q_filter |= Q(name__icontains=q)
-        q_filter |= Q(code__icontains=q)
+        if warehouse_id:
+            products = get_warehouse_candidates(warehouse_id).search(query, limit=30)
+            if products:
+                return JsonResponse({'products': products, 'scope': 'warehouse'})
 
-    products = Product.objects.filter(q_filter).order_by('name')[:30]
+    # FTS5 yoki xotiradagi indeks (settings.PRODUCT_SEARCH), tayyor bo'lmasa - LIKE
+    products = search_products(query, limit=30)
+    return JsonResponse({'products': products, 'scope': 'catalog'})
 
-    result = [{
-        'id': p.id,
-        'code': p.code,
-        'name': p.name,
-        'manufacturer': p.manufacturer or '',
-    } for p in products]
 
-    return JsonResponse({'products': result})
+@login_required
+def revizor_catalog_bundle(request, revision_pk):
+    """Ombor tovarlari (oflayn qidiruv uchun, gzip, ETag)"""
+    warehouse_id = RevisionAssignment.objects.filter(
+        revision_id=revision_pk,
+        revizor=request.user
+    ).values_list('revision__warehouse_id', flat=True).first()
+
+    if not warehouse_id:
+        return JsonResponse({'error': 'Siz bu reviziyaga tayinlanmagansiz!'}, status=403)
+
+    etag, data = catalog_bundle(warehouse_id)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(data, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(data), content_type='application/json')
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Vary'] = 'Accept-Encoding'
+    return response
 
 
 @login_required
@@ -961,30 +850,37 @@ def revizor_add_item(request):
         except:
             return JsonResponse({'error': 'Noto\'g\'ri miqdor!'}, status=400)
 
-        # Mavjud yozuvni tekshirish (bir xil partiya = qo'shiladi)
-        existing = RevisionItem.objects.filter(
-            revision=revision,
-            revizor=request.user,
-            product=product,
-            series=series,
-            expiry_date=expiry_date
-        ).first()
-
-        if existing:
-            existing.quantity += qty
-            existing.save()
-            item = existing
-            message = f'{product.name} yangilandi. Jami: {existing.quantity}'
-        else:
-            item = RevisionItem.objects.create(
+        with transaction.atomic():
+            # Mavjud yozuvni tekshirish (bir xil partiya = qo'shiladi).
+            # SQLite da select_for_update() hech narsa qilmaydi - qatorni
+            # settings dagi transaction_mode IMMEDIATE himoya qiladi (tranzaksiya
+            # yozish qulfi bilan boshlanadi), boshqa bazalarda - qator qulfi
+            existing = RevisionItem.objects.select_for_update().filter(
                 revision=revision,
                 revizor=request.user,
                 product=product,
                 series=series,
-                expiry_date=expiry_date,
-                quantity=qty
-            )
-            message = f'{product.name} qo\'shildi!'
+                expiry_date=expiry_date
+            ).first()
+
+            if existing:
+                existing.quantity += qty
+                existing.save()
+                item = existing
+                message = f'{product.name} yangilandi. Jami: {existing.quantity}'
+            else:
+                item = RevisionItem.objects.create(
+                    revision=revision,
+                    revizor=request.user,
+                    product=product,
+                    series=series,
+                    expiry_date=expiry_date,
+                    quantity=qty
+                )
+                message = f'{product.name} qo\'shildi!'
+
+            # Tovar bo'yicha jamini yangilash
+            apply_count_delta(revision.pk, product.pk, qty)
 
         return JsonResponse({
             'success': True,
@@ -1055,8 +951,17 @@ def revizor_update_item(request, pk):
         if quantity <= 0:
             return JsonResponse({'error': 'Miqdor 0 dan katta bo\'lishi kerak!'}, status=400)
 
-        item.quantity = quantity
-        item.save()
+        with transaction.atomic():
+            # Qator qayta o'qiladi - parallel tahrirda eski miqdor ishlatilmasin
+            # (SQLite da qulf - transaction_mode IMMEDIATE, yuqoriga qarang)
+            item = RevisionItem.objects.select_for_update().filter(pk=item.pk).first()
+            if item is None:
+                return JsonResponse({'error': 'Tovar topilmadi!'}, status=404)
+
+            delta = quantity - item.quantity
+            item.quantity = quantity
+            item.save()
+            apply_count_delta(item.revision_id, item.product_id, delta)
 
         return JsonResponse({'success': True, 'quantity': float(item.quantity)})
 
@@ -1076,7 +981,16 @@ def revizor_delete_item(request, pk):
     if item.revision.status != 'in_progress':
         return JsonResponse({'error': 'Reviziya tugagan!'}, status=400)
 
-    item.delete()
+    with transaction.atomic():
+        # SQLite da qulf - transaction_mode IMMEDIATE (revizor_add_item ga qarang)
+        item = RevisionItem.objects.select_for_update().filter(pk=item.pk).first()
+        if item is None:
+            return JsonResponse({'success': True})
+
+        # Ikki marta bosilganda ikkinchisi hech narsa o'chirmaydi - jami o'zgarmaydi
+        deleted, _ = RevisionItem.objects.filter(pk=item.pk).delete()
+        if deleted:
+            apply_count_delta(item.revision_id, item.product_id, -item.quantity)
     return JsonResponse({'success': True})
 
 
@@ -1109,7 +1023,7 @@ def revizor_complete(request, assignment_pk):
         revision.status = 'completed'
         revision.completed_at = timezone.now()
         revision.save()
-        calculate_revision_results(revision)
+        enqueue_reconciliation(revision, request.user)
 
     messages.success(request, 'Reviziya tugallandi!')
     return redirect('revizor_dashboard')
@@ -1125,149 +1039,16 @@ def revizor_export(request, revision_pk):
     items = RevisionItem.objects.filter(
         revision=revision,
         revizor=request.user
-    ).select_related('product')
-
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response['Content-Disposition'] = f'attachment; filename="my_revision_{revision.revision_number}.csv"'
-
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(['№', 'Tovar nomi', 'Ishlab chiqaruvchi', 'Seriya', 'Srok', 'Soni'])
-
-    for i, item in enumerate(items, 1):
-        writer.writerow([
-            i,
-            item.product.name,
-            item.product.manufacturer,
-            item.series,
-            item.expiry_date.strftime('%d.%m.%Y') if item.expiry_date else '',
-            item.quantity
-        ])
-
-    return response
-
-
-# ==================== HELPER FUNCTIONS ====================
-# ============================================
-# YANGILANGAN calculate_revision_results
-# views.py dagi eskisini shu bilan almashtiring
-# ============================================
-
-def calculate_revision_results(revision):
-    """
-    Reviziya natijalarini hisoblash - TZ bo'yicha
-
-    MUHIM: Revizor partiyalarni ajratmaydi!
-    - 1C da bir tovar bir nechta partiyada bo'lishi mumkin
-    - Revizor umumiy sonni kiritadi
-    - Tizim TOVAR BO'YICHA JAMI solishtiriladi
-    - Farq birinchi partiyaga yoziladi
-    """
-
-    # Avvalgi natijalarni tozalash
-    RevisionResult.objects.filter(revision=revision).delete()
-    UnaccountedItem.objects.filter(revision=revision).delete()
-
-    warehouse = revision.warehouse
-
-    # 1. 1C dagi tovarlar - TOVAR BO'YICHA GURUHLAB
-    inventory_by_product = {}
-    inventory_items = Inventory.objects.filter(warehouse=warehouse).select_related('product')
-
-    for inv in inventory_items:
-        product_id = inv.product_id
-        if product_id not in inventory_by_product:
-            inventory_by_product[product_id] = {
-                'product': inv.product,
-                'total_qty': Decimal('0'),
-                'items': []  # Har bir partiya
-            }
-        inventory_by_product[product_id]['total_qty'] += inv.quantity
-        inventory_by_product[product_id]['items'].append({
-            'series': inv.series,
-            'expiry_date': inv.expiry_date,
-            'quantity': inv.quantity
-        })
-
-    # 2. Revizorlar kiritgan tovarlar - TOVAR BO'YICHA JAMI
-    revision_items = RevisionItem.objects.filter(revision=revision).select_related('product', 'revizor')
-
-    revizor_by_product = {}
-    revizor_names_by_product = {}
-
-    for item in revision_items:
-        product_id = item.product_id
-        if product_id not in revizor_by_product:
-            revizor_by_product[product_id] = Decimal('0')
-            revizor_names_by_product[product_id] = set()
-        revizor_by_product[product_id] += item.quantity
-        revizor_names_by_product[product_id].add(item.revizor)
-
-    # 3. Har bir 1C tovar uchun natija yaratish
-    for product_id, inv_data in inventory_by_product.items():
-        product = inv_data['product']
-        expected_total = inv_data['total_qty']  # 1C jami
-        actual_total = revizor_by_product.get(product_id, Decimal('0'))  # Revizor jami
-
-        difference = actual_total - expected_total
-
-        # Status aniqlash
-        if difference == 0:
-            status = 'correct'
-        elif difference < 0:
-            status = 'shortage'
-        else:
-            status = 'excess'
-
-        # Har bir partiya uchun natija yozish
-        # Farq BIRINCHI partiyaga yoziladi (TZ bo'yicha)
-        items = inv_data['items']
-
-        for i, item in enumerate(items):
-            if i == 0:
-                # Birinchi partiyaga farq yoziladi
-                item_difference = difference
-                item_status = status
-            else:
-                # Boshqa partiyalar "to'g'ri" bo'ladi
-                item_difference = Decimal('0')
-                item_status = 'correct'
-
-            result = RevisionResult.objects.create(
-                revision=revision,
-                product=product,
-                series=item['series'],
-                expiry_date=item['expiry_date'],
-                expected_quantity=item['quantity'],
-                actual_quantity=item['quantity'] + item_difference if i == 0 else item['quantity'],
-                difference=item_difference,
-                status=item_status
-            )
-
-            # Revizorlarni qo'shish
-            if product_id in revizor_names_by_product:
-                result.revizors.set(revizor_names_by_product[product_id])
+    ).values_list('product__name', 'product__manufacturer', 'series', 'expiry_date', 'quantity')
 
-    # 4. Hisobda yo'q tovarlar (1C da yo'q, lekin revizor kiritgan)
-    for product_id, actual_qty in revizor_by_product.items():
-        if product_id not in inventory_by_product:
-            # 1C da yo'q tovar
-            product = Product.objects.get(pk=product_id)
+    def rows():
+        yield ['№', 'Tovar nomi', 'Ishlab chiqaruvchi', 'Seriya', 'Srok', 'Soni']
 
-            # Revizor ma'lumotlarini olish
-            items = RevisionItem.objects.filter(
-                revision=revision,
-                product_id=product_id
-            )
+        items_iter = items.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        for i, (name, manufacturer, series, expiry_date, quantity) in enumerate(items_iter, 1):
+            yield [i, name, manufacturer, series, expiry_date, quantity]
 
-            for item in items:
-                UnaccountedItem.objects.create(
-                    revision=revision,
-                    product=product,
-                    series=item.series,
-                    expiry_date=item.expiry_date,
-                    quantity=item.quantity,
-                    revizor=item.revizor
-                )
+    return export_response(request, f'my_revision_{revision.revision_number}', rows())
 
 
 # ============================================
@@ -1302,7 +1083,7 @@ def admin_warehouse_combined_results(request, warehouse_pk):
 
     # Barcha revizorlar ro'yxati (filter uchun)
     all_revizors = User.objects.filter(
-        revision_items__revision__in=revisions
+        combined_counts__warehouse=warehouse
     ).distinct()
 
     # Filterlar
@@ -1310,153 +1091,33 @@ def admin_warehouse_combined_results(request, warehouse_pk):
     revizor_filter = request.GET.get('revizor', '')
     search = request.GET.get('search', '')
 
-    # 1C qoldiqlari - BARCHA MA'LUMOTLAR BILAN
-    inventory_items = Inventory.objects.filter(
-        warehouse=warehouse
-    ).select_related('product').order_by('product__name', 'expiry_date')
-
-    # BARCHA reviziyalardagi tovarlarni olish
-    revision_items_qs = RevisionItem.objects.filter(
-        revision__in=revisions
-    ).select_related('product', 'revizor')
-
-    # Revizor filter
+    revizor_name = None
     if revizor_filter:
-        revision_items_qs = revision_items_qs.filter(revizor_id=revizor_filter)
-
-    # Revizor ma'lumotlarini TOVAR BO'YICHA guruhlab olish
-    # Key: product_id
-    revizor_by_product = {}  # {product_id: total_qty}
-    revizor_names_by_product = {}  # {product_id: set of revizor names}
-    revizor_details_by_product = {}  # {product_id: [{revizor, qty, series, expiry}]}
-
-    for item in revision_items_qs:
-        product_id = item.product_id
-        if product_id not in revizor_by_product:
-            revizor_by_product[product_id] = Decimal('0')
-            revizor_names_by_product[product_id] = set()
-            revizor_details_by_product[product_id] = []
-
-        revizor_by_product[product_id] += item.quantity
-        revizor_names_by_product[product_id].add(
-            item.revizor.full_name or item.revizor.username
-        )
-        revizor_details_by_product[product_id].append({
-            'revizor': item.revizor.full_name or item.revizor.username,
-            'quantity': item.quantity,
-            'series': item.series or '',
-            'expiry_date': item.expiry_date,
-        })
-
-    # Natijalar ro'yxatini tuzish
-    results = []
-    stats = {
-        'total': 0,
-        'correct': 0,
-        'shortage': 0,
-        'excess': 0,
-        'not_counted': 0,
-    }
-
-    # Tovarlarni guruhlab olish (bir xil tovar bir nechta qatorda bo'lmasligi uchun)
-    inventory_by_product = {}
-    for inv in inventory_items:
-        product_id = inv.product_id
-        if product_id not in inventory_by_product:
-            inventory_by_product[product_id] = {
-                'product': inv.product,
-                'total_qty': Decimal('0'),
-                'items': []  # Har bir partiya
-            }
-        inventory_by_product[product_id]['total_qty'] += inv.quantity
-        inventory_by_product[product_id]['items'].append({
-            'series': inv.series or '',
-            'expiry_date': inv.expiry_date,
-            'quantity': inv.quantity
-        })
+        revizor = User.objects.filter(pk=revizor_filter).first()
+        revizor_name = (revizor.full_name or revizor.username) if revizor else ''
 
-    # Har bir tovar uchun natija
-    for product_id, inv_data in inventory_by_product.items():
-        product = inv_data['product']
-        expected_total = inv_data['total_qty']
-        actual_total = revizor_by_product.get(product_id, Decimal('0'))
-
-        difference = actual_total - expected_total
-
-        # Status aniqlash
-        if actual_total == 0:
-            status = 'not_counted'
-        elif difference == 0:
-            status = 'correct'
-        elif difference < 0:
-            status = 'shortage'
-        else:
-            status = 'excess'
-
-        # Filter: status
-        if status_filter and status != status_filter:
-            continue
-
-        # Filter: search
-        if search:
-            search_lower = search.lower()
-            if (search_lower not in product.name.lower() and
-                    search_lower not in (product.code or '').lower() and
-                    search_lower not in (product.manufacturer or '').lower()):
-                continue
-
-        stats['total'] += 1
-        stats[status] += 1
-
-        # Revizorlar ro'yxati
-        revizors_set = revizor_names_by_product.get(product_id, set())
-        revizors = ', '.join(revizors_set) if revizors_set else ''
-
-        # Partiyalar ro'yxati (srok bo'yicha saralangan)
-        inventory_items_sorted = sorted(
-            inv_data['items'],
-            key=lambda x: x['expiry_date'] or datetime(2099, 1, 1).date()
-        )
+    # Filtr, qidiruv, tartib va sahifalash - SQL da (CombinedResult jadvali)
+    queryset = combined_queryset(warehouse, revizor_filter, status_filter, search)
+    # Butun ombor bo'yicha - sahifalashda keshdan
+    stats = cached_dataset(
+        warehouse, 'stats', (revizor_filter, status_filter, search), lambda: combined_stats(queryset)
+    )
 
-        results.append({
-            'product': product,
-            'expected_quantity': expected_total,
-            'actual_quantity': actual_total,
-            'difference': difference,
-            'status': status,
-            'revizors': revizors,
-            'inventory_items': inventory_items_sorted,  # Partiyalar
-            'revizor_details': revizor_details_by_product.get(product_id, []),
-        })
+    paginator = Paginator(queryset, 100)
+    page = paginator.get_page(request.GET.get('page'))
+    results = combined_rows(page.object_list, revizor_name)
 
-    # Hisobda yo'q tovarlar (1C da yo'q, lekin revizor sanagan)
-    unaccounted = []
-    for product_id, actual_qty in revizor_by_product.items():
-        if product_id not in inventory_by_product:
-            product = Product.objects.get(pk=product_id)
-            revizors_set = revizor_names_by_product.get(product_id, set())
-            revizors = ', '.join(revizors_set) if revizors_set else ''
-            details = revizor_details_by_product.get(product_id, [])
-            unaccounted.append({
-                'product': product,
-                'quantity': actual_qty,
-                'revizors': revizors,
-                'details': details,
-            })
-
-    # Saralash - avval kamlar, keyin ortiqlar, keyin sanalmagan, oxirida to'g'ri
-    results.sort(key=lambda x: (
-        0 if x['status'] == 'shortage' else
-        1 if x['status'] == 'excess' else
-        2 if x['status'] == 'not_counted' else 3,
-        x['product'].name
-    ))
+    unaccounted = cached_dataset(
+        warehouse, 'unaccounted', (revizor_filter,),
+        lambda: combined_unaccounted(warehouse, revizor_filter, revizor_name)
+    )
 
     context = {
         'warehouse': warehouse,
         'revisions': revisions,
         'revisions_count': revisions.count(),
         'results': results,
+        'page': page,
         'stats': stats,
         'unaccounted': unaccounted,
         'status_filter': status_filter,
@@ -1483,188 +1144,95 @@ def admin_warehouse_combined_export(request, warehouse_pk):
     status_filter = request.GET.get('status', '')
     revizor_filter = request.GET.get('revizor', '')
 
-    revisions = Revision.objects.filter(warehouse=warehouse, status='completed')
-    inventory_items = Inventory.objects.filter(warehouse=warehouse).select_related('product')
-
-    # 1C ma'lumotlari - partiyalar bilan
-    inventory_by_product = {}
-    for inv in inventory_items:
-        product_id = inv.product_id
-        if product_id not in inventory_by_product:
-            inventory_by_product[product_id] = {
-                'product': inv.product,
-                'total_qty': Decimal('0'),
-                'items': []
-            }
-        inventory_by_product[product_id]['total_qty'] += inv.quantity
-        inventory_by_product[product_id]['items'].append({
-            'series': inv.series or '',
-            'expiry_date': inv.expiry_date,
-            'quantity': inv.quantity
-        })
-
-    # Revizor ma'lumotlari
-    revision_items_qs = RevisionItem.objects.filter(revision__in=revisions).select_related('product', 'revizor')
-
-    if revizor_filter:
-        revision_items_qs = revision_items_qs.filter(revizor_id=revizor_filter)
-
-    revizor_by_product = {}
-    revizor_names_by_product = {}
-
-    for item in revision_items_qs:
-        product_id = item.product_id
-        if product_id not in revizor_by_product:
-            revizor_by_product[product_id] = Decimal('0')
-            revizor_names_by_product[product_id] = set()
-        revizor_by_product[product_id] += item.quantity
-        revizor_names_by_product[product_id].add(item.revizor.full_name or item.revizor.username)
-
-    # CSV yaratish
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
+    revizor_name = None
     filename = f"{warehouse.name}_natijalar"
     if revizor_filter:
         revizor = User.objects.filter(pk=revizor_filter).first()
+        revizor_name = (revizor.full_name or revizor.username) if revizor else ''
         if revizor:
             filename += f"_{revizor.username}"
     if status_filter:
         filename += f"_{status_filter}"
-    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-
-    writer = csv.writer(response, delimiter=';')
-
-    # TZ bo'yicha sarlavhalar
-    writer.writerow([
-        '№',
-        'Наименование',
-        'Производитель',
-        'Серия',
-        'Годность',
-        'Количество (1C)',
-        'Саналди',
-        'Тугри',
-        'Плюс',
-        'Минус',
-        'Ревизор'
-    ])
-
-    row_num = 1
-
-    # Saralash
-    sorted_products = sorted(
-        inventory_by_product.items(),
-        key=lambda x: (
-            0 if (revizor_by_product.get(x[0], 0) - x[1]['total_qty']) < 0 else
-            1 if (revizor_by_product.get(x[0], 0) - x[1]['total_qty']) > 0 else
-            2 if revizor_by_product.get(x[0], 0) == 0 else 3,
-            x[1]['product'].name
-        )
-    )
-
-    for product_id, inv_data in sorted_products:
-        product = inv_data['product']
-        expected = inv_data['total_qty']
-        actual = revizor_by_product.get(product_id, Decimal('0'))
-        difference = actual - expected
-
-        if actual == 0:
-            status = 'not_counted'
-        elif difference == 0:
-            status = 'correct'
-        elif difference < 0:
-            status = 'shortage'
-        else:
-            status = 'excess'
-
-        # Status filter
-        if status_filter and status != status_filter:
-            continue
 
-        revizors = ', '.join(revizor_names_by_product.get(product_id, []))
-
-        # TZ formatidagi ustunlar
-        tugri = '✓' if status == 'correct' else ''
-        plus_val = f'+{int(difference)}' if status == 'excess' else ''
-        minus_val = str(int(difference)) if status == 'shortage' else ''
+    # Tayyor umumiy natijalar (CombinedResult jadvalidan, SQL da filtrlangan va saralangan)
+    queryset = combined_queryset(warehouse, revizor_filter, status_filter)
+
+    def rows():
+        # TZ bo'yicha sarlavhalar
+        yield [
+            '№',
+            'Наименование',
+            'Производитель',
+            'Серия',
+            'Годность',
+            'Количество (1C)',
+            'Саналди',
+            'Тугри',
+            'Плюс',
+            'Минус',
+            'Ревизор'
+        ]
 
-        # Partiyalarni ko'rsatish
-        items = inv_data['items']
-        if items:
-            # Birinchi partiya asosiy qatorda
-            first_item = items[0]
-            writer.writerow([
+        row_num = 1
+
+        for row in queryset.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            result = combined_row(row, revizor_name)
+            product = result['product']
+            expected = result['expected_quantity']
+            actual = result['actual_quantity']
+            difference = result['difference']
+            status = result['status']
+            revizors = result['revizors']
+
+            # TZ formatidagi ustunlar
+            tugri = '✓' if status == 'correct' else ''
+            plus_val = SignedNumber(difference) if status == 'excess' else ''
+            minus_val = int(difference) if status == 'shortage' else ''
+
+            # Birinchi partiya (1C tartibida) asosiy qatorda
+            batches = result['batches']
+            first_item = batches[0] if batches else {'series': '', 'expiry_date': None}
+            yield [
                 row_num,
                 product.name,
                 product.manufacturer or '',
                 first_item['series'],
-                first_item['expiry_date'].strftime('%d.%m.%Y') if first_item['expiry_date'] else '',
+                first_item['expiry_date'],
                 int(expected),
                 int(actual) if actual > 0 else '',
                 tugri,
                 plus_val,
                 minus_val,
                 revizors
-            ])
+            ]
             row_num += 1
 
-            # Qo'shimcha partiyalar (agar mavjud bo'lsa)
-            # for item in items[1:]:
-            #     writer.writerow([
-            #         '',  # № bo'sh
-            #         f'  └─ {product.name}',
-            #         '',
-            #         item['series'],
-            #         item['expiry_date'].strftime('%d.%m.%Y') if item['expiry_date'] else '',
-            #         int(item['quantity']),
-            #         '',
-            #         '',
-            #         '',
-            #         '',
-            #         ''
-            #     ])
-        else:
-            writer.writerow([
-                row_num,
-                product.name,
-                product.manufacturer or '',
-                '',
-                '',
-                int(expected),
-                int(actual) if actual > 0 else '',
-                tugri,
-                plus_val,
-                minus_val,
-                revizors
-            ])
-            row_num += 1
-
-    # Hisobda yo'q tovarlar
-    if not status_filter or status_filter == 'unaccounted':
-        unaccounted_products = [
-            (pid, qty) for pid, qty in revizor_by_product.items()
-            if pid not in inventory_by_product
-        ]
-
-        if unaccounted_products:
-            writer.writerow([])  # Bo'sh qator
-            writer.writerow(['', 'HISOBDA YO\'Q TOVARLAR (1C da yo\'q)', '', '', '', '', '', '', '', '', ''])
-
-            for product_id, qty in unaccounted_products:
-                product = Product.objects.get(pk=product_id)
-                revizors = ', '.join(revizor_names_by_product.get(product_id, []))
-                writer.writerow([
-                    row_num,
-                    product.name,
-                    product.manufacturer or '',
-                    '',
-                    '',
-                    0,
-                    int(qty),
-                    '',
-                    f'+{int(qty)}',
-                    '',
-                    revizors
-                ])
-                row_num += 1
-
-    return response
\ No newline at end of file
+        # Hisobda yo'q tovarlar
+        if not status_filter or status_filter == 'unaccounted':
+            unaccounted = cached_dataset(
+                warehouse, 'unaccounted', (revizor_filter,),
+                lambda: combined_unaccounted(warehouse, revizor_filter, revizor_name or '')
+            )
+            if unaccounted:
+                yield []  # Bo'sh qator
+                yield ['', 'HISOBDA YO\'Q TOVARLAR (1C da yo\'q)', '', '', '', '', '', '', '', '', '']
+
+                for item in unaccounted:
+                    product = item['product']
+                    qty = item['quantity']
+                    yield [
+                        row_num,
+                        product.name,
+                        product.manufacturer or '',
+                        '',
+                        '',
+                        0,
+                        int(qty),
+                        '',
+                        SignedNumber(qty),
+                        '',
+                        item['revizors']
+                    ]
+                    row_num += 1
+
+    return export_response(request, filename, rows())